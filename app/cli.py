@@ -0,0 +1,54 @@
+"""Comandos de mantenimiento: python -m app.cli <comando> --help"""
+import argparse
+import json
+import logging
+
+from app.services.pokeapi_service import poke_service
+
+logger = logging.getLogger("pokedex_cli")
+
+
+def _catalog_import(args) -> dict:
+    return poke_service.import_catalog(args.path, sprites_dir=args.sprites_dir)
+
+
+def _catalog_refresh(args) -> dict:
+    return poke_service.refresh_catalog(kind=args.kind, concurrency=args.concurrency)
+
+
+def _cache_invalidate(args) -> dict:
+    poke_service.invalidate_cache(args.resource, args.identifier)
+    return {"invalidated": args.resource or "todo", "identifier": args.identifier}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Mantenimiento de la Pokeapi")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    catalog_import = commands.add_parser("catalog-import", help="Importa un volcado local de la PokeAPI")
+    catalog_import.add_argument("path", help="Directorio api-data, fichero .json o .jsonl")
+    catalog_import.add_argument("--sprites-dir", default=None,
+                                help="Copia local del repositorio PokeAPI/sprites")
+    catalog_import.set_defaults(func=_catalog_import)
+
+    catalog_refresh = commands.add_parser("catalog-refresh", help="Vuelve a pedir solo lo que ha cambiado")
+    catalog_refresh.add_argument("--kind", choices=["pokemon", "species", "type", "evolution"], default=None)
+    catalog_refresh.add_argument("--concurrency", type=int, default=8)
+    catalog_refresh.set_defaults(func=_catalog_refresh)
+
+    cache_invalidate = commands.add_parser("cache-invalidate", help="Invalida la caché compartida")
+    cache_invalidate.add_argument("--resource", choices=["pokemon", "species", "type", "evolution"], default=None)
+    cache_invalidate.add_argument("--identifier", default=None)
+    cache_invalidate.set_defaults(func=_cache_invalidate)
+
+    return parser
+
+
+def main(argv=None) -> None:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = build_parser().parse_args(argv)
+    print(json.dumps(args.func(args), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
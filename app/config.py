@@ -1,3 +1,4 @@
+from pathlib import Path
 from pydantic_settings import BaseSettings
 
 
@@ -9,6 +10,93 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 1440  # 24 horas
 
+    # PokeAPI real o el servidor falso local (http://127.0.0.1:8900/api/v2)
+    POKEAPI_BASE_URL: str = "https://pokeapi.co/api/v2"
+
+    # Cliente HTTP de la PokeAPI (pool de conexiones con keep-alive)
+    POKEAPI_TIMEOUT: float = 10.0
+    POKEAPI_MAX_CONNECTIONS: int = 100
+    POKEAPI_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    POKEAPI_MAX_CONNECTIONS_PER_HOST: int = 50
+    POKEAPI_KEEPALIVE_EXPIRY: float = 30.0
+
+    # Reintentos (backoff exponencial con jitter) y cortocircuito
+    POKEAPI_RETRIES: int = 2
+    POKEAPI_RETRY_BACKOFF: float = 0.2
+    POKEAPI_RETRY_BACKOFF_MAX: float = 2.0
+    POKEAPI_BREAKER_FAILURES: int = 5
+    POKEAPI_BREAKER_RESET_SECONDS: float = 30.0
+
+    # Planificador de peticiones salientes (token bucket + concurrencia adaptativa)
+    POKEAPI_RATE_LIMIT: float = 50.0
+    POKEAPI_RATE_BURST: int = 50
+    POKEAPI_MIN_CONCURRENCY: int = 4
+    POKEAPI_MAX_CONCURRENCY: int = 64
+    # Parte del límite que pueden ocupar precalentado, refrescos y sprites
+    POKEAPI_BACKGROUND_SHARE: float = 0.5
+    POKEAPI_QUEUE_TIMEOUT: float = 30.0
+    # Segundos tras caducar en los que se sirve lo cacheado y se revalida en segundo plano
+    POKEAPI_STALE_WHILE_REVALIDATE: int = 3600
+
+    # Caché de respuestas de la PokeAPI ("" en la ruta = solo memoria)
+    POKEAPI_CACHE_PATH: str = str(Path(__file__).resolve().parent / "pokeapi_cache.db")
+    # Entradas en memoria por worker (~0.3 KB cada pokemon en formato compacto)
+    POKEAPI_MEMORY_CACHE_SIZE: int = 4096
+    # Cada cuánto mira un worker si otro ha invalidado la caché compartida
+    POKEAPI_CACHE_SYNC_INTERVAL: float = 1.0
+
+    # Catálogo offline importado con `python -m app.cli catalog-import`
+    POKEAPI_CATALOG_PATH: str = str(Path(__file__).resolve().parent / "pokeapi_catalog.db")
+
+    # TTL por recurso en segundos (los datos de la PokeAPI casi no cambian)
+    POKEAPI_TTL_POKEMON: int = 7 * 24 * 3600
+    POKEAPI_TTL_SPECIES: int = 7 * 24 * 3600
+    POKEAPI_TTL_TYPE: int = 24 * 3600
+    POKEAPI_TTL_EVOLUTION: int = 30 * 24 * 3600
+
+    # Precalentado al arrancar: los más guardados en Pokédex + los de WARMUP_FILE
+    WARMUP_ENABLED: bool = True
+    WARMUP_TOP_POKEMON: int = 100
+    WARMUP_FILE: str = ""
+    WARMUP_CONCURRENCY: int = 8
+
+    # Sprites de los PDF: imágenes decodificadas en memoria y ficheros en disco ("" = solo memoria)
+    SPRITE_CACHE_DIR: str = str(Path(__file__).resolve().parent / "sprite_cache")
+    SPRITE_MEMORY_CACHE_SIZE: int = 256
+    SPRITE_TIMEOUT: float = 5.0
+    # Tope del disco para todos los workers juntos (se borran los menos usados) y
+    # segundos sin reintentar un sprite que falló
+    SPRITE_CACHE_MAX_MB: int = 128
+    SPRITE_NEGATIVE_TTL: float = 60.0
+    # Equipos: los sprites se piden a la vez y se espera como mucho este tiempo (segundos)
+    SPRITE_PREFETCH_DEADLINE: float = 3.0
+    SPRITE_PREFETCH_WORKERS: int = 8
+
+    # PDFs en un pool de procesos (0 = en el propio worker web); más en cola -> 503
+    PDF_RENDER_WORKERS: int = 2
+    PDF_RENDER_MAX_QUEUE: int = 32
+    # Zip de /pokemon/cards: fichas generándose a la vez por petición (por debajo de la cola)
+    PDF_CARDS_ZIP_CONCURRENCY: int = 4
+    # PDFs ya generados (fichas y equipos) por hash de sus datos ("" = sin caché)
+    PDF_CACHE_DIR: str = str(Path(__file__).resolve().parent / "pdf_cache")
+    PDF_CACHE_MAX_MB: int = 256
+    # Perfil "compact" (?profile=compact): sprites reducidos a esta resolución de impresión
+    PDF_COMPACT_DPI: int = 150
+    # Exportación de la Pokédex con ?stream=true: filas leídas de la BD por tandas
+    PDF_STREAM_CHUNK_SIZE: int = 200
+    # Exportaciones en segundo plano (/api/v1/exports): hilos, tope de la cola y caducidad (segundos)
+    EXPORT_JOB_DIR: str = str(Path(__file__).resolve().parent / "exports")
+    EXPORT_JOB_WORKERS: int = 2
+    EXPORT_JOB_MAX_PENDING: int = 100
+    EXPORT_JOB_TTL: int = 3600
+    # Cada worker marca sus trabajos cada EXPORT_JOB_HEARTBEAT segundos; sin latido durante
+    # EXPORT_JOB_STALE_AFTER se dan por perdidos (el worker murió o se reinició)
+    EXPORT_JOB_HEARTBEAT: float = 15.0
+    EXPORT_JOB_STALE_AFTER: float = 60.0
+
+    # Máximo de pokemon por petición en /pokemon/batch
+    POKEMON_BATCH_MAX: int = 50
+
     class Config:
         env_file = ".env"
 
@@ -0,0 +1,242 @@
+"""PokeAPI falsa para tests y benchmarks sin salir a internet.
+
+Reproduce respuestas grabadas (por defecto fixtures.json; también vale un
+directorio api-data o un .jsonl, los mismos formatos que `catalog-import`)
+de pokemon, especies, tipos, cadenas evolutivas y sprites, con latencia,
+errores y limitación de peticiones configurables.
+
+    python -m app.fake_pokeapi --port 8900 --latency lognormal:40:0.5 --error-rate 0.01
+    POKEAPI_BASE_URL=http://127.0.0.1:8900/api/v2 uvicorn app.main:app
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import FastAPI, Request, Response, Query
+
+from app.services.aliases import RESOURCE_KINDS
+from app.services.catalog import iter_dump
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures.json")
+SPRITES_PREFIX = "https://raw.githubusercontent.com/PokeAPI/sprites/master/"
+_RESOURCE_PATHS = {kind: path for path, kind in RESOURCE_KINDS.items()}
+
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Distribución de latencia en ms -> función que devuelve segundos.
+
+    "none", "fixed:50", "uniform:20:80", "normal:50:10", "lognormal:50:0.5"
+    (mediana en ms y sigma).
+    """
+    name, *params = (spec or "none").split(":")
+    values = [float(p) for p in params]
+    if name == "none":
+        return lambda: 0.0
+    if name == "fixed":
+        return lambda: values[0] / 1000
+    if name == "uniform":
+        return lambda: random.uniform(values[0], values[1]) / 1000
+    if name == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1])) / 1000
+    if name == "lognormal":
+        return lambda: random.lognormvariate(math.log(values[0]), values[1]) / 1000
+    raise ValueError(f"Distribución de latencia desconocida: {spec}")
+
+
+class FakePokeAPIConfig:
+    """Comportamiento del servidor falso (se puede cambiar en caliente en app.state.config)."""
+
+    def __init__(self, data_path: str = DEFAULT_FIXTURES, latency: str = "none",
+                 error_rate: float = 0.0, error_status: int = 503,
+                 rate_limit: float = 0.0, burst: int = 0, sprites_dir: Optional[str] = None):
+        self.data_path = data_path
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        # Peticiones por segundo (0 = sin límite); pasado el límite responde 429
+        self.rate_limit = rate_limit
+        self.burst = burst or max(1, int(rate_limit))
+        self.sprites_dir = sprites_dir
+
+    @classmethod
+    def from_env(cls) -> "FakePokeAPIConfig":
+        return cls(
+            data_path=os.getenv("FAKE_POKEAPI_DATA", DEFAULT_FIXTURES),
+            latency=os.getenv("FAKE_POKEAPI_LATENCY", "none"),
+            error_rate=float(os.getenv("FAKE_POKEAPI_ERROR_RATE", "0")),
+            error_status=int(os.getenv("FAKE_POKEAPI_ERROR_STATUS", "503")),
+            rate_limit=float(os.getenv("FAKE_POKEAPI_RATE_LIMIT", "0")),
+            burst=int(os.getenv("FAKE_POKEAPI_BURST", "0")),
+            sprites_dir=os.getenv("FAKE_POKEAPI_SPRITES_DIR") or None
+        )
+
+
+class _Dataset:
+    """Respuestas grabadas ya serializadas, indexadas por ID y por nombre."""
+
+    def __init__(self, path: str):
+        self.bodies: Dict[Tuple[str, int], bytes] = {}
+        self.names: Dict[Tuple[str, str], int] = {}
+        for kind, raw_data in iter_dump(path):
+            resource = _RESOURCE_PATHS.get(kind, kind)
+            self.bodies[(resource, raw_data["id"])] = json.dumps(raw_data).encode()
+            if raw_data.get("name"):
+                self.names[(resource, raw_data["name"])] = raw_data["id"]
+
+    def find(self, resource: str, identifier: str) -> Optional[bytes]:
+        ident = identifier.strip().lower()
+        resource_id = int(ident) if ident.isdigit() else self.names.get((resource, ident))
+        return self.bodies.get((resource, resource_id)) if resource_id is not None else None
+
+    def listing(self, resource: str):
+        return sorted(
+            (resource_id, name) for (res, name), resource_id in self.names.items() if res == resource
+        )
+
+
+def _placeholder_png(seed: str, size: int = 16) -> bytes:
+    # PNG RGBA de un color sacado del nombre del fichero (sin Pillow)
+    r, g, b = hashlib.md5(seed.encode()).digest()[:3]
+    row = b"\x00" + bytes((r, g, b, 255)) * size
+    raw = row * size
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", size, size, 8, 6, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def create_app(config: Optional[FakePokeAPIConfig] = None) -> FastAPI:
+    config = config or FakePokeAPIConfig.from_env()
+    app = FastAPI(title="PokeAPI falsa", docs_url=None, redoc_url=None)
+    app.state.config = config
+    app.state.dataset = _Dataset(config.data_path)
+    app.state.stats = {"requests": 0, "errors": 0, "throttled": 0, "not_modified": 0}
+    bucket = {"config": None, "tokens": 0.0, "at": time.monotonic()}
+    lock = threading.Lock()
+
+    def throttled() -> bool:
+        cfg = app.state.config
+        if cfg.rate_limit <= 0:
+            return False
+        with lock:
+            now = time.monotonic()
+            if bucket["config"] is not cfg:
+                # Configuración nueva: el bucket empieza lleno
+                bucket.update(config=cfg, tokens=float(cfg.burst), at=now)
+            bucket["tokens"] = min(cfg.burst, bucket["tokens"] + (now - bucket["at"]) * cfg.rate_limit)
+            bucket["at"] = now
+            if bucket["tokens"] < 1:
+                return True
+            bucket["tokens"] -= 1
+            return False
+
+    @app.middleware("http")
+    async def simulate_upstream(request: Request, call_next):
+        if request.url.path.startswith("/_fake"):
+            return await call_next(request)
+        cfg = app.state.config
+        app.state.stats["requests"] += 1
+        delay = parse_latency(cfg.latency)()
+        if delay:
+            await asyncio.sleep(delay)
+        if throttled():
+            app.state.stats["throttled"] += 1
+            return Response("Too Many Requests", status_code=429, headers={"Retry-After": "1"})
+        if cfg.error_rate and random.random() < cfg.error_rate:
+            app.state.stats["errors"] += 1
+            return Response("Simulated upstream error", status_code=cfg.error_status)
+        return await call_next(request)
+
+    def json_response(request: Request, body: bytes) -> Response:
+        # ETag estable como el de la PokeAPI; 304 si el cliente ya lo tiene
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if request.headers.get("if-none-match") == etag:
+            app.state.stats["not_modified"] += 1
+            return Response(status_code=304, headers={"ETag": etag})
+        # Los sprites apuntan a este mismo servidor
+        body = body.replace(SPRITES_PREFIX.encode(), f"{str(request.base_url)}sprites-repo/".encode())
+        return Response(body, media_type="application/json", headers={"ETag": etag})
+
+    @app.get("/api/v2/{resource}/")
+    def list_resource(request: Request, resource: str, limit: int = Query(20, ge=0), offset: int = Query(0, ge=0)):
+        items = app.state.dataset.listing(resource)
+        base = f"{str(request.base_url)}api/v2/{resource}/"
+        page = items[offset:offset + limit]
+        body = {
+            "count": len(items),
+            "next": f"{base}?offset={offset + limit}&limit={limit}" if offset + limit < len(items) else None,
+            "previous": f"{base}?offset={max(0, offset - limit)}&limit={limit}" if offset > 0 else None,
+            "results": [{"name": name, "url": f"{base}{resource_id}/"} for resource_id, name in page]
+        }
+        return body
+
+    @app.get("/api/v2/{resource}/{identifier}")
+    @app.get("/api/v2/{resource}/{identifier}/")
+    def get_resource(request: Request, resource: str, identifier: str):
+        body = app.state.dataset.find(resource, identifier)
+        if body is None:
+            return Response("Not Found", status_code=404)
+        return json_response(request, body)
+
+    @app.get("/sprites-repo/{path:path}")
+    def get_sprite(path: str):
+        sprites_dir = app.state.config.sprites_dir
+        if sprites_dir:
+            candidate = os.path.join(sprites_dir, path)
+            if os.path.isfile(candidate):
+                with open(candidate, "rb") as f:
+                    return Response(f.read(), media_type="image/png")
+        if not path.endswith(".png"):
+            return Response("Not Found", status_code=404)
+        return Response(_placeholder_png(path), media_type="image/png")
+
+    @app.get("/_fake/stats")
+    def fake_stats():
+        return app.state.stats
+
+    return app
+
+
+class FakePokeAPIServer:
+    """Levanta la PokeAPI falsa con uvicorn en un hilo (tests y benchmarks)."""
+
+    def __init__(self, config: Optional[FakePokeAPIConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        import uvicorn
+
+        self.app = create_app(config)
+        self._server = uvicorn.Server(uvicorn.Config(self.app, host=host, port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, name="fake-pokeapi", daemon=True)
+        self.host = host
+        self.port = port
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/api/v2"
+
+    def start(self, timeout: float = 10.0) -> "FakePokeAPIServer":
+        self._thread.start()
+        deadline = time.monotonic() + timeout
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("No se pudo arrancar la PokeAPI falsa")
+            time.sleep(0.01)
+        # Puerto real si se pidió el 0
+        self.port = self._server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
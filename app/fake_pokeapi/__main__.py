@@ -0,0 +1,34 @@
+import argparse
+
+import uvicorn
+
+from app.fake_pokeapi import DEFAULT_FIXTURES, FakePokeAPIConfig, create_app
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.fake_pokeapi", description="PokeAPI falsa local")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--data", default=DEFAULT_FIXTURES, help="fixtures .json/.jsonl o directorio api-data")
+    parser.add_argument("--sprites-dir", default=None, help="Copia local de PokeAPI/sprites")
+    parser.add_argument("--latency", default="none", help="none | fixed:50 | uniform:20:80 | lognormal:50:0.5 (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="peticiones/s antes de responder 429")
+    parser.add_argument("--burst", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    config = FakePokeAPIConfig(
+        data_path=args.data,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        rate_limit=args.rate_limit,
+        burst=args.burst,
+        sprites_dir=args.sprites_dir
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 from fastapi import FastAPI, Request, Response, status, APIRouter, Depends, HTTPException
 import uvicorn
 import logging
-from app.routers import pokemon, auth, pokedex, teams
-from app.database import create_db_and_tables
+from app.routers import pokemon, auth, pokedex, teams, exports
+from app.database import create_db_and_tables, engine
 
+import asyncio
 import time
 from typing import Annotated
 from app.auth import get_current_user
@@ -14,7 +15,14 @@ from app.dependencies import limiter
 
 from slowapi.errors import RateLimitExceeded
 from fastapi.middleware.cors import CORSMiddleware
-from app.services.pokeapi_service import PokeAPIService
+from app.services.pokeapi_service import async_poke_service as poke_service, track_stale_responses
+from app.services.metrics import registry as metrics_registry
+from app.services.pdf_render import pdf_renderer
+from app.services.export_jobs import export_queue
+from app.services.warmup import warmup_state, warm_up, popular_pokemon_ids, load_warmup_file
+from app.config import settings
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,7 +33,6 @@ logging.basicConfig(
     ]
 )
 logger = logging.getLogger("pokedex_api")
-poke_service = PokeAPIService()
 
 
 def rate_limit_exceeded_logger(request: Request, exc: RateLimitExceeded):
@@ -71,11 +78,58 @@ async def log_requests(request: Request, call_next):
     return response
 
 
+# Marca las respuestas que usan datos caducados de la PokeAPI
+@app.middleware("http")
+async def mark_stale_responses(request: Request, call_next):
+    stale_keys = track_stale_responses()
+    response = await call_next(request)
+    if stale_keys:
+        response.headers["X-Cache-Status"] = "stale"
+        response.headers["Warning"] = '110 - "Response is Stale"'
+    return response
+
+
+def _warmup_identifiers() -> list:
+    identifiers = load_warmup_file(settings.WARMUP_FILE)
+    with Session(engine) as session:
+        identifiers += [str(i) for i in popular_pokemon_ids(session, settings.WARMUP_TOP_POKEMON)]
+    return identifiers
+
+
+async def _run_warmup():
+    try:
+        identifiers = await run_in_threadpool(_warmup_identifiers)
+        await warm_up(poke_service, identifiers, concurrency=settings.WARMUP_CONCURRENCY)
+    except Exception as e:
+        # Un fallo aquí no debe dejar el worker fuera para siempre
+        logger.error(f"Error en el precalentado de cachés: {e}", exc_info=True)
+        warmup_state.ready = True
+
+
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
     create_db_and_tables()
     logger.info("Database iniciada con exito.")
 
+    # Exportaciones que se quedaron a medias en un worker que ya no está
+    with Session(engine) as session:
+        export_queue.recover(session)
+    export_queue.start(engine)
+
+    # Precalentamos en segundo plano; /ready responde 503 hasta que acabe
+    if settings.WARMUP_ENABLED:
+        app.state.warmup_task = asyncio.create_task(_run_warmup())
+    else:
+        warmup_state.ready = True
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Cerramos los pools de conexiones hacia la PokeAPI, el de PDFs y el de exportaciones
+    await poke_service.aclose()
+    export_queue.shutdown()
+    pdf_renderer.shutdown()
+
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_logger)
 
@@ -97,10 +151,25 @@ app.add_middleware(
 def read_root():
     return {"message": "Bienvenido a la pokeapi"}
 
+
+# Para el balanceador: no mandar tráfico a workers con la caché fría
+@app.get("/ready", summary="Worker listo para recibir tráfico")
+def readiness(response: Response):
+    if not warmup_state.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return warmup_state.as_dict()
+
+
+# Métricas del worker en formato Prometheus (llamadas a la PokeAPI, cachés, planificador)
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 app.include_router(pokemon.router, prefix="/api/v1")
 app.include_router(auth.router)
 app.include_router(pokedex.router)
 app.include_router(teams.router)
+app.include_router(exports.router)
 
 v2_router = APIRouter(
     prefix="/api/v2",
@@ -108,23 +177,13 @@ v2_router = APIRouter(
 )
 
 @v2_router.get("/pokemon/{id_or_name}", response_model=dict, summary="Pokemon con evolucion(v2)")
-def get_pokemon_v2_with_evolution(
+async def get_pokemon_v2_with_evolution(
         id_or_name: str,
         current_user: Annotated[User, Depends(get_current_user)]
 ):
     try:
-        pokemon_data = poke_service.get_pokemon(id_or_name)
-        species_data = poke_service.get_pokemon_species(id_or_name)
-        evolution_url = species_data.get("evolution_chain_url")
-
-        evolution_data = {"chain": []}
-        if evolution_url:
-            evolution_data = poke_service.get_evolution_chain(evolution_url)
-        return {
-            "pokemon": pokemon_data,
-            "species": species_data,
-            "evolution": evolution_data
-        }
+        # Pokemon y especie en paralelo; la cadena también si ya conocemos su ID
+        return await poke_service.get_pokemon_with_evolution(id_or_name)
     except HTTPException as e:
         raise e
     except Exception as e:
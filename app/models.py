@@ -1,5 +1,6 @@
 from sqlmodel import SQLModel, Field, Relationship
-from typing import Optional, List
+from sqlalchemy import Index, text
+from typing import Optional, List, Literal
 from datetime import datetime
 from pydantic import validator
 import re
@@ -67,6 +68,35 @@ class TeamMember(SQLModel, table=True):
     # Relaciones
     team: Team = Relationship(back_populates="members")
 
+
+class ExportJob(SQLModel, table=True):
+    # Exportación a PDF en segundo plano (pending -> running -> done/failed)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    owner_id: int = Field(foreign_key="user.id", index=True)
+    kind: str = Field(max_length=20)
+    # Parámetros en JSON canónico: dos trabajos iguales tienen el mismo texto
+    params: str
+    status: str = Field(default="pending", index=True)
+    error: Optional[str] = None
+    path: Optional[str] = None
+    filename: Optional[str] = None
+    size: Optional[int] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    # Proceso que lo genera y su último latido: solo se dan por perdidos los que dejan de latir
+    worker_id: Optional[str] = Field(default=None, max_length=64)
+    heartbeat_at: Optional[datetime] = None
+
+    # Un solo trabajo activo por (usuario, tipo, parámetros), aunque lo pidan dos workers a la vez
+    __table_args__ = (
+        Index(
+            "ix_exportjob_active_unique", "owner_id", "kind", "params", unique=True,
+            sqlite_where=text("status IN ('pending', 'running')"),
+            postgresql_where=text("status IN ('pending', 'running')")
+        ),
+    )
+
 # Esquemas usuario
 
 class UserBase(SQLModel):
@@ -181,4 +211,26 @@ class TeamRead(TeamBase):
 class TeamUpdate(SQLModel):
     name: Optional[str] = Field(default=None, max_length=100)
     description: Optional[str] = None
-    pokedex_entry_ids: Optional[List[int]] = None
\ No newline at end of file
+    pokedex_entry_ids: Optional[List[int]] = None
+
+# --- Schemas de exportaciones ---
+
+class ExportJobCreate(SQLModel):
+    """(Schema Create) Qué exportar: la Pokédex (con filtros) o un equipo"""
+    kind: Literal["pokedex", "team"]
+    team_id: Optional[int] = None
+    captured: Optional[bool] = None
+    favorite: Optional[bool] = None
+    profile: Literal["standard", "compact"] = "standard"
+
+class ExportJobRead(SQLModel):
+    """(Schema Read) Estado de una exportación"""
+    id: int
+    kind: str
+    status: str
+    error: Optional[str]
+    size: Optional[int]
+    created_at: datetime
+    finished_at: Optional[datetime]
+    expires_at: Optional[datetime]
+    download_url: Optional[str] = None
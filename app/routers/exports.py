@@ -0,0 +1,99 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.responses import FileResponse
+from sqlmodel import Session
+from typing import Annotated
+from datetime import datetime
+
+from app.auth import get_current_user
+from app.database import get_session
+from app.models import User, Team, ExportJob, ExportJobCreate, ExportJobRead
+from app.services.export_jobs import export_queue
+
+from app.dependencies import limiter
+
+
+router = APIRouter(
+    prefix="/api/v1/exports",
+    tags=["Exportaciones"],
+    dependencies=[Depends(get_current_user)]
+)
+
+
+def _job_read(job: ExportJob) -> ExportJobRead:
+    job_read = ExportJobRead.model_validate(job)
+    if job.status == "done":
+        job_read.download_url = router.url_path_for("download_export", job_id=job.id)
+    return job_read
+
+
+def _get_own_job(session: Session, job_id: int, user: User) -> ExportJob:
+    job = session.get(ExportJob, job_id)
+    # Caducados o de otro usuario: como si no existieran
+    if not job or job.owner_id != user.id or (job.expires_at and job.expires_at < datetime.utcnow()):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Exportación no encontrada o caducada."
+        )
+    return job
+
+
+# Pedir una exportación
+@router.post("/", response_model=ExportJobRead, status_code=status.HTTP_202_ACCEPTED,
+             summary="Pedir una exportación a PDF (Pokédex o equipo)")
+@limiter.limit("10/minute")
+def create_export(
+        request: Request,
+        job_create: ExportJobCreate,
+        current_user: Annotated[User, Depends(get_current_user)],
+        session: Annotated[Session, Depends(get_session)]
+):
+    if job_create.kind == "team":
+        if job_create.team_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Falta team_id para exportar un equipo."
+            )
+        db_team = session.get(Team, job_create.team_id)
+        if not db_team:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "Equipo no encontrado.")
+        if db_team.trainer_id != current_user.id:
+            raise HTTPException(status.HTTP_403_FORBIDDEN, "No tienes permiso para exportar este equipo.")
+
+    job = export_queue.submit(session, current_user.id, job_create)
+    return _job_read(job)
+
+
+# Consultar el estado
+@router.get("/{job_id}", response_model=ExportJobRead, summary="Estado de una exportación")
+@limiter.limit("120/minute")
+def get_export(
+        request: Request,
+        job_id: int,
+        current_user: Annotated[User, Depends(get_current_user)],
+        session: Annotated[Session, Depends(get_session)]
+):
+    return _job_read(_get_own_job(session, job_id, current_user))
+
+
+# Descargar el PDF
+@router.get("/{job_id}/download", summary="Descargar el PDF de una exportación terminada")
+@limiter.limit("30/minute")
+def download_export(
+        request: Request,
+        job_id: int,
+        current_user: Annotated[User, Depends(get_current_user)],
+        session: Annotated[Session, Depends(get_session)]
+):
+    job = _get_own_job(session, job_id, current_user)
+    if job.status == "failed":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"La exportación falló: {job.error}"
+        )
+    if job.status != "done":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La exportación todavía no está lista."
+        )
+
+    return FileResponse(job.path, media_type="application/pdf", filename=job.filename)
@@ -7,11 +7,8 @@ from datetime import datetime, timedelta
 import io
 
 from fastapi.responses import StreamingResponse
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import cm
 
-from sqlalchemy import func, distinct
+from sqlalchemy import func, distinct, and_, or_
 from collections import Counter
 
 
@@ -24,7 +21,11 @@ from app.models import (
     PokedexEntryRead,
     PokedexEntryUpdate
 )
-from app.services.pokeapi_service import PokeAPIService
+from app.services.pokeapi_service import poke_service
+from app.config import settings
+from app.services.pdf_documents import ENTRY_FIELDS, PdfProfile, entry_fields
+from app.services.pdf_render import pdf_renderer
+from app.services.pdf_stream import stream_pokedex_pdf
 
 from app.dependencies import limiter
 
@@ -36,54 +37,6 @@ router = APIRouter(
     dependencies=[Depends(get_current_user)]
 )
 
-poke_service = PokeAPIService()
-
-# Funcion que hace el PDF
-def _create_pokedex_pdf(entries: List[PokedexEntry], user: User) -> io.BytesIO:
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    # Coordenadas
-    x = 2 * cm
-    y = height - 3 * cm
-
-    # Título
-    c.setFont("Helvetica-Bold", 18)
-    c.drawString(x, y, f"Pokédex de {user.username}")
-    y -= 1.5 * cm
-
-    # Cabecera de la tabla
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(x, y, "ID")
-    c.drawString(x + 2 * cm, y, "Nombre")
-    c.drawString(x + 6 * cm, y, "Nickname")
-    c.drawString(x + 10 * cm, y, "Capturado")
-    c.drawString(x + 13 * cm, y, "Favorito")
-    y -= 0.6 * cm
-    c.line(x, y, width - x, y)
-    y -= 0.2 * cm
-
-    # Contenido de la tabla
-    c.setFont("Helvetica", 9)
-    for entry in entries:
-        y -= 0.6 * cm
-        if y < 3 * cm:  # Salto de página
-            c.showPage()
-            c.setFont("Helvetica", 9)
-            y = height - 3 * cm
-
-        c.drawString(x, y, str(entry.pokemon_id))
-        c.drawString(x + 2 * cm, y, entry.pokemon_name)
-        c.drawString(x + 6 * cm, y, entry.nickname or "-")
-        c.drawString(x + 10 * cm, y, "Sí" if entry.is_captured else "No")
-        c.drawString(x + 13 * cm, y, "★" if entry.favorite else "-")
-
-    c.showPage()
-    c.save()
-    buffer.seek(0)
-    return buffer
-
 
 # Añadir pokemon
 @router.post("/", response_model=PokedexEntryRead, summary="Añadir un pokemon a mi pokedex")
@@ -275,30 +228,63 @@ def export_user_pokedex_pdf(
         session: Annotated[Session, Depends(get_session)],
 
         captured: Optional[bool] = Query(None, description="Filtrar por capturados"),
-        favorite: Optional[bool] = Query(None, description="Filtrar por favoritos")
+        favorite: Optional[bool] = Query(None, description="Filtrar por favoritos"),
+        stream: bool = Query(False, description="Enviar el PDF página a página (Pokédex muy grandes)"),
+        profile: PdfProfile = Query("standard", description="PDF normal o \"compact\" (sprites a tamaño de impresión, más ligero)")
 ):
     # Filtramos
-    statement = select(PokedexEntry).where(PokedexEntry.owner_id == current_user.id)
+    filters = [PokedexEntry.owner_id == current_user.id]
     if captured is not None:
-        statement = statement.where(PokedexEntry.is_captured == captured)
+        filters.append(PokedexEntry.is_captured == captured)
     if favorite is not None:
-        statement = statement.where(PokedexEntry.favorite == favorite)
-
-    entries = session.exec(statement.order_by(PokedexEntry.pokemon_id)).all()
+        filters.append(PokedexEntry.favorite == favorite)
 
-    # Generamos el PDF
-    buffer = _create_pokedex_pdf(entries, current_user)
     media_type = "application/pdf"
     filename = f"pokedex_{current_user.username}.pdf"
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+
+    if stream:
+        # Sin Content-Length (chunked): la primera página sale antes de leer toda la BD
+        rows = _iter_entry_fields(session, filters, settings.PDF_STREAM_CHUNK_SIZE)
+        return StreamingResponse(
+            stream_pokedex_pdf(current_user.username, rows), media_type=media_type, headers=headers
+        )
+
+    statement = select(PokedexEntry).where(*filters)
+    entries = session.exec(statement.order_by(PokedexEntry.pokemon_id)).all()
+
+    # Generamos el PDF en el pool de procesos
+    content = pdf_renderer.render(
+        "pokedex", username=current_user.username, entries=[entry_fields(entry) for entry in entries],
+        profile=profile
+    )
+    buffer = io.BytesIO(content)
 
     return StreamingResponse(
         buffer,
         media_type=media_type,
-        headers={
-            "Content-Disposition": f"attachment; filename={filename}"
-        }
+        headers=headers
     )
 
+
+def _iter_entry_fields(session: Session, filters: list, chunk_size: int):
+    # Paginación por clave (pokemon_id, id): solo las columnas del PDF y como mucho chunk_size filas en memoria
+    columns = [getattr(PokedexEntry, field) for field in ENTRY_FIELDS]
+    last = None
+    while True:
+        statement = select(*columns, PokedexEntry.id).where(*filters)
+        if last is not None:
+            statement = statement.where(or_(
+                PokedexEntry.pokemon_id > last[0],
+                and_(PokedexEntry.pokemon_id == last[0], PokedexEntry.id > last[1])
+            ))
+        rows = session.exec(statement.order_by(PokedexEntry.pokemon_id, PokedexEntry.id).limit(chunk_size)).all()
+        for row in rows:
+            yield dict(zip(ENTRY_FIELDS, row))
+        if len(rows) < chunk_size:
+            return
+        last = (rows[-1][0], rows[-1][-1])
+
 # Estadísticas
 @router.get("/stats", response_model=dict)
 @limiter.limit("60/minute")
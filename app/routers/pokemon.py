@@ -1,25 +1,26 @@
-from fastapi import APIRouter, Query, Path, HTTPException, status, Request
-from typing import Dict, Any, List, Annotated
-from app.services.pokeapi_service import PokeAPIService
+from fastapi import APIRouter, Query, Path, HTTPException, status, Request, Response
+from typing import Dict, Any, List, Annotated, Literal, Optional, Tuple
+from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
+from app.services.pokeapi_service import async_poke_service as poke_service
+from app.services.pdf_cache import pdf_response
+from app.services.pdf_documents import PdfProfile
+from app.services.pdf_render import pdf_renderer
 
 from fastapi import Depends
 from app.auth import get_current_user
-from app.models import User
+from app.database import get_session
+from app.models import User, Team, TeamMember, PokedexEntry
 import logging
 
 # Para el PDF de la carta
+import asyncio
 import io
-import requests
-from fastapi.responses import StreamingResponse
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import cm
-from reportlab.lib.colors import black, lightgrey, grey
-from reportlab.lib.utils import ImageReader
-import textwrap
+import zipfile
 
 
 from app.dependencies import limiter
+from app.config import settings
 logger = logging.getLogger(__name__)
 
 
@@ -28,167 +29,169 @@ router = APIRouter(
     tags=["Pokémon (PokeAPI)"]
 )
 
-poke_service = PokeAPIService()
-
-#Funcion para crear el PDF
-def _create_pokemon_card_pdf(pokemon_data: dict, species_data: dict) -> io.BytesIO:
-
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-
-    card_width = 8.8 * cm
-    card_height = 14.0 * cm
-
-
-    card_margin_x = (width - card_width) / 2
-    card_margin_y = (height - card_height) / 2
-
-    # Borde y Fondo
-    c.setFillColor(lightgrey)
-    c.roundRect(card_margin_x, card_margin_y, card_width, card_height, 0.5 * cm, fill=1)
-    c.setStrokeColor(black)
-    c.setLineWidth(2)
-    c.roundRect(card_margin_x, card_margin_y, card_width, card_height, 0.5 * cm, fill=0)
-
-    # Posiciones internas
-    inner_x = card_margin_x + 0.7 * cm
-    current_y = card_margin_y + card_height - 1.0 * cm
-
-    # Nombre y HP
-    c.setFont("Helvetica-Bold", 18)
-    c.setFillColor(black)
-    pokemon_name = pokemon_data.get('name', 'N/A').capitalize()
-    c.drawString(inner_x, current_y, pokemon_name)
-
-    hp = pokemon_data.get('stats', {}).get('hp', '??')
-    c.setFont("Helvetica-Bold", 16)
-    c.drawRightString(card_margin_x + card_width - 0.7 * cm, current_y, f"HP {hp}")
-
-    current_y -= 1.0 * cm
-
-    # Imagen
-    sprite_box_height = 5.0 * cm
-    sprite_box_y = current_y - sprite_box_height
-    c.setStrokeColor(grey)
-    c.rect(card_margin_x + 0.5 * cm, sprite_box_y, card_width - 1 * cm, sprite_box_height, fill=0)
-
-    sprite_url = pokemon_data.get("sprite")
-    if sprite_url:
-        try:
-            response = requests.get(sprite_url)
-            response.raise_for_status()
-            sprite_image_data = io.BytesIO(response.content)
-            image_for_pdf = ImageReader(sprite_image_data)
-
-            img_x = card_margin_x + 0.5 * cm + (card_width - 1 * cm - 4 * cm) / 2
-            img_y = sprite_box_y + (sprite_box_height - 4 * cm) / 2
-            c.drawImage(image_for_pdf, img_x, img_y, width=4 * cm, height=4 * cm, preserveAspectRatio=True, mask='auto')
-        except Exception as e:
-            c.setFont("Helvetica", 10)
-            c.drawString(inner_x, sprite_box_y + sprite_box_height / 2, f"No sprite: {e}")
-
-    current_y = sprite_box_y - 0.5 * cm
-
-    # Estadísticas
-    stats_box_height = 2.0 * cm
-    stats_box_y = current_y - stats_box_height
-    c.setStrokeColor(grey)
-    c.rect(card_margin_x + 0.5 * cm, stats_box_y, card_width - 1 * cm, stats_box_height, fill=0)
-
-    stats_y = current_y - 0.5 * cm
-    c.setFont("Helvetica-Bold", 12)
-    c.drawString(inner_x, stats_y, "Estadísticas:")
-    stats_y -= 0.6 * cm
-
-    c.setFont("Helvetica", 10)
-    stats_data = pokemon_data.get("stats", {})
-    stats_to_display = {'attack': 'Ataque', 'defense': 'Defensa', 'speed': 'Velocidad'}
-    stat_line = [f"{label}: {stats_data.get(key, 'N/A')}" for key, label in stats_to_display.items()]
-    c.drawString(inner_x, stats_y, "   ".join(stat_line))
-
-    current_y = stats_box_y - 0.2 * cm
-
-    # Tipos y habilidades
-    types_abilities_box_height = 1.2 * cm
-    types_abilities_box_y = current_y - types_abilities_box_height
-    c.setStrokeColor(grey)
-    c.rect(card_margin_x + 0.5 * cm, types_abilities_box_y, card_width - 1 * cm, types_abilities_box_height, fill=0)
-
-    ta_y = current_y - 0.5 * cm
-    c.setFont("Helvetica", 10)
-    types = pokemon_data.get("types", [])
-    c.drawString(inner_x, ta_y, f"Tipos: {', '.join(types).capitalize()}")
-
-    abilities = pokemon_data.get("abilities", [])
-    c.drawRightString(card_margin_x + card_width - 0.7 * cm, ta_y,
-                      f"Habilidades: {abilities[0].capitalize() if abilities else 'N/A'}")
-
-    current_y = types_abilities_box_y - 0.2 * cm
 
+# ENDPOINT de listar pokemon (o buscar por nombre con q, sin salir a la PokeAPI)
+@router.get("/search", response_model=Dict[str, Any], summary="Listar o buscar pokemon por nombre")
+@limiter.limit("30/minute")
+async def call_search_pokemon(
+    request: Request,
+    current_user: Annotated[User, Depends(get_current_user)],
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    q: Optional[str] = Query(default=None, min_length=1, max_length=50, description="Prefijo o parte del nombre")
+):
 
-    desc_box_top_y = current_y
-    desc_box_bottom_y = card_margin_y + 0.5 * cm
-    desc_box_height = desc_box_top_y - desc_box_bottom_y
-    c.setStrokeColor(grey)
-    c.rect(card_margin_x + 0.5 * cm, desc_box_bottom_y, card_width - 1 * cm, desc_box_height, fill=0)
+    try:
+        results = await poke_service.search_pokemon(limit=limit, offset=offset, query=q)
+        return results
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal server error: {e}"
+        )
 
-    # Descripción
-    desc_title_y = desc_box_top_y - 0.5 * cm
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(inner_x, desc_title_y, "Descripción:")
+def _parse_identifiers(ids: str) -> List[str]:
+    # Sin duplicados y respetando el orden
+    identifiers = list(dict.fromkeys(i.strip().lower() for i in ids.split(",") if i.strip()))
+    if not identifiers:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Indica al menos un ID o nombre en 'ids'."
+        )
+    if len(identifiers) > settings.POKEMON_BATCH_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Como máximo {settings.POKEMON_BATCH_MAX} pokemon por petición."
+        )
+    return identifiers
 
-    description = species_data.get("description_es", "No se encontró descripción.")
-    c.setFont("Helvetica", 9)
-
-    text_y = desc_title_y - (0.6 * cm)
-
-    lines = textwrap.wrap(description, width=55)
-
-    for line in lines:
-        c.drawString(inner_x, text_y, line)
-        text_y -= 0.4 * cm
-        if text_y < (desc_box_bottom_y + 0.2 * cm):
-            break
 
-    c.showPage()
-    c.save()
-
-    buffer.seek(0)
-    return buffer
+# ENDPOINT varios pokemon en una sola petición (antes de /{id_or_name})
+@router.get("/batch", response_model=Dict[str, Any], summary="Buscar varios pokemon a la vez")
+@limiter.limit("30/minute")
+async def call_get_pokemon_batch(
+    request: Request,
+    current_user: Annotated[User, Depends(get_current_user)],
+    ids: str = Query(..., description="IDs o nombres separados por comas (ej: 1,4,7,pikachu)")
+):
+    identifiers = _parse_identifiers(ids)
 
+    try:
+        results = await poke_service.get_pokemon_batch(identifiers)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal server error: {e}"
+        )
 
-# ENDPOINT de listar pokemon
-@router.get("/search", response_model=Dict[str, Any], summary="Listar pokemon")
-@limiter.limit("30/minute")
-def call_search_pokemon(
+    return {
+        "count": len(results),
+        "errors": sum(1 for r in results if "error" in r),
+        "results": results
+    }
+
+
+def _team_card_identifiers(session: Session, team_id: int, user: User) -> Tuple[List[str], str]:
+    # Equipo y pokemon de sus miembros en una sola consulta, en el orden de las posiciones
+    rows = session.exec(
+        select(Team, PokedexEntry.pokemon_id)
+        .outerjoin(TeamMember, TeamMember.team_id == Team.id)
+        .outerjoin(PokedexEntry, PokedexEntry.id == TeamMember.pokedex_entry_id)
+        .where(Team.id == team_id)
+        .order_by(TeamMember.position)
+    ).all()
+    if not rows:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Equipo no encontrado.")
+    db_team = rows[0][0]
+    if db_team.trainer_id != user.id:
+        raise HTTPException(status.HTTP_403_FORBIDDEN, "No tienes permiso para exportar este equipo.")
+    identifiers = [str(pokemon_id) for _, pokemon_id in rows if pokemon_id is not None]
+    if not identifiers:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "El equipo no tiene pokemon.")
+    return identifiers, f"equipo_{db_team.name.replace(' ', '_')}"
+
+
+# ENDPOINT varias cartas en un solo PDF o en un zip (antes de /{id_or_name})
+@router.get("/cards", summary="Cartas de varios pokemon o de un equipo")
+@limiter.limit("10/minute")
+async def get_pokemon_cards(
     request: Request,
     current_user: Annotated[User, Depends(get_current_user)],
-    limit: int = Query(default=20, ge=1, le=100),
-    offset: int = Query(default=0, ge=0)
+    session: Annotated[Session, Depends(get_session)],
+    ids: Optional[str] = Query(default=None, description="IDs o nombres separados por comas (ej: 1,4,7)"),
+    team_id: Optional[int] = Query(default=None, description="O bien las cartas de uno de tus equipos"),
+    format: Literal["pdf", "zip"] = Query(default="pdf", description="Un PDF con una carta por página o un zip de PDFs"),
+    profile: PdfProfile = Query("standard", description="PDF normal o \"compact\" (sprites a tamaño de impresión, más ligero)")
 ):
+    if (ids is None) == (team_id is None):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Indica 'ids' o 'team_id' (solo uno de los dos)."
+        )
+
+    if team_id is not None:
+        # La BD es síncrona: fuera del event loop
+        identifiers, name = await run_in_threadpool(_team_card_identifiers, session, team_id, current_user)
+    else:
+        identifiers = _parse_identifiers(ids)
+        name = "cartas"
 
     try:
-        results = poke_service.search_pokemon(limit=limit, offset=offset)
-        return results
+        # Pokemon y especie de todas las cartas a la vez (lo cacheado vuelve al momento)
+        results = await asyncio.gather(*[
+            asyncio.gather(poke_service.get_pokemon(i), poke_service.get_pokemon_species(i)) for i in identifiers
+        ])
+        cards = [{"pokemon": pokemon_data, "species": species_data} for pokemon_data, species_data in results]
+
+        if format == "pdf":
+            # Un solo documento: un canvas y cada sprite incrustado una vez
+            rendered = await pdf_renderer.arender_cached(
+                "deck", if_none_match=request.headers.get("if-none-match"), cards=cards, profile=profile
+            )
+            return pdf_response(request, rendered, f"{name}.pdf")
+
+        # Zip: cada carta es la misma que /{id}/card, así que sale de la caché de PDFs si ya existe.
+        # Pocas a la vez: un lote grande no puede ocupar toda la cola de PDFs (ni llenarla y dar 503)
+        limit = asyncio.Semaphore(max(1, min(settings.PDF_CARDS_ZIP_CONCURRENCY, pdf_renderer.max_queue - 1)))
+
+        async def render_card(card: Dict[str, Any]):
+            async with limit:
+                return await pdf_renderer.arender_cached(
+                    "card", pokemon=card["pokemon"], species=card["species"], profile=profile
+                )
+
+        rendered_cards = await asyncio.gather(*[render_card(card) for card in cards])
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:  # los PDF ya van comprimidos
+            for card, rendered in zip(cards, rendered_cards):
+                archive.writestr(f"ficha_{card['pokemon'].get('name')}.pdf", rendered.read())
+        return Response(
+            buffer.getvalue(),
+            media_type="application/zip",
+            headers={"Content-Disposition": f"attachment; filename={name}.zip"}
+        )
+
     except HTTPException as e:
         raise e
     except Exception as e:
+        logger.error(f"Error al generar las cartas: {e}", exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Internal server error: {e}"
+            detail=f"Error al generar el PDF: {e}"
         )
 
 # ENDPOINT pokemon por nombre
 @router.get("/{id_or_name}", response_model=Dict[str, Any], summary="Buscar pokemon por nombre/id")
 @limiter.limit("60/minute")
-def call_get_pokemon_details(
+async def call_get_pokemon_details(
     request: Request,
     current_user: Annotated[User, Depends(get_current_user)],
     id_or_name: str = Path(..., description="ID o nombre del Pokémon (ej: 132 o 'ditto')")
 ):
     try:
-        pokemon_data = poke_service.get_pokemon(identifier=id_or_name)
+        pokemon_data = await poke_service.get_pokemon(identifier=id_or_name)
         return pokemon_data
     except HTTPException as e:
         raise e
@@ -201,13 +204,13 @@ def call_get_pokemon_details(
 #ENDPOINT pokemon por tipo
 @router.get("/type/{type_name}", response_model=List[Dict[str, Any]], summary="Buscar pokemon por tipo")
 @limiter.limit("60/minute")
-def call_get_pokemon_by_type(
+async def call_get_pokemon_by_type(
     request: Request,
     current_user: Annotated[User, Depends(get_current_user)],
     type_name: str = Path(..., description="Nombre/numero del tipo (ej: 'fire', 'water', '2'. '4')")
 ):
     try:
-        type_data = poke_service.get_pokemon_by_type(type_name=type_name)
+        type_data = await poke_service.get_pokemon_by_type(type_name=type_name)
         return type_data
     except HTTPException as e:
         raise e
@@ -220,13 +223,13 @@ def call_get_pokemon_by_type(
 # ENDPOINT especies
 @router.get("/pokeon-species/{id_or_name}", response_model=Dict[str, Any], summary="Buscar pokemon por especie")
 @limiter.limit("60/minute")
-def call_get_pokemon_species(
+async def call_get_pokemon_species(
     request: Request,
     current_user: Annotated[User, Depends(get_current_user)],
     id_or_name: str = Path(..., description="ID o nombre del Pokémon (ej: 132 o 'ditto')")
 ):
     try:
-        species_data = poke_service.get_pokemon_species(identifier=id_or_name)
+        species_data = await poke_service.get_pokemon_species(identifier=id_or_name)
         return species_data
     except HTTPException as e:
         raise e
@@ -239,31 +242,32 @@ def call_get_pokemon_species(
 # ENDPOINT de carta
 @router.get("/{id_or_name}/card",summary="Ver carta del pokemon")
 @limiter.limit("20/minute")
-def get_pokemon_card(
+async def get_pokemon_card(
         request: Request,
         id_or_name: str,
-        current_user: Annotated[User, Depends(get_current_user)]
+        current_user: Annotated[User, Depends(get_current_user)],
+        profile: PdfProfile = Query("standard", description="PDF normal o \"compact\" (sprites a tamaño de impresión, más ligero)")
 ):
 
     try:
-        # Obtenemos los datos
-        pokemon_data = poke_service.get_pokemon(id_or_name)
-        species_data = poke_service.get_pokemon_species(id_or_name)
+        # Obtenemos los datos (las dos peticiones a la vez)
+        pokemon_data, species_data = await asyncio.gather(
+            poke_service.get_pokemon(id_or_name),
+            poke_service.get_pokemon_species(id_or_name)
+        )
 
-        # Generamos el PDF
-        pdf_buffer = _create_pokemon_card_pdf(pokemon_data, species_data)
+        # La misma ficha ya generada se sirve del disco (o con 304 si el cliente la tiene);
+        # si no, se genera en el pool de procesos (fuera del event loop y del GIL)
+        rendered = await pdf_renderer.arender_cached(
+            "card", if_none_match=request.headers.get("if-none-match"),
+            pokemon=pokemon_data, species=species_data, profile=profile
+        )
 
         # Nombre del archivo
         filename = f"ficha_{pokemon_data.get('name', id_or_name)}.pdf"
 
         # Devolvemos el archivo
-        return StreamingResponse(
-            pdf_buffer,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
-        )
+        return pdf_response(request, rendered, filename)
 
     except HTTPException as e:
         raise e
@@ -1,20 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query
 from sqlmodel import Session, select
-from typing import Annotated, List
+from typing import Annotated, List, Optional
 import logging
 
-#PDF
-import io
-import requests
-from fastapi.responses import StreamingResponse
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import cm
-from reportlab.lib.colors import grey
-from reportlab.lib.utils import ImageReader
-
 from app.auth import get_current_user
 from app.database import get_session
+from app.services.pdf_documents import PdfProfile, entry_fields
+from app.services.pdf_cache import RenderedPdf, pdf_response
+from app.services.pdf_render import pdf_renderer
 from app.models import (
     User,
     Team,
@@ -37,138 +30,19 @@ router = APIRouter(
 )
 
 
-def _draw_pokemon_mini_card(c, x, y, width, height, entry: PokedexEntry):
-    """Dibuja una mini-ficha de un Pokémon en el lienzo del PDF."""
-
-    # Borde de la mini-ficha
-    c.setStrokeColor(grey)
-    c.setLineWidth(1)
-    c.rect(x, y, width, height, fill=0)
-
-    sprite = None
-    if entry.pokemon_sprite:
-        try:
-            response = requests.get(entry.pokemon_sprite)
-            response.raise_for_status()
-            sprite_image_data = io.BytesIO(response.content)
-            sprite = ImageReader(sprite_image_data)
-            c.drawImage(sprite, x + (0.3 * cm), y + height - (3 * cm), width=2.5 * cm, height=2.5 * cm,
-                        preserveAspectRatio=True, mask='auto')
-        except requests.exceptions.RequestException:
-            pass  # No se pudo cargar el sprite
-
-    # --- Contenido de la mini-ficha ---
-    text_x = x + 3.2 * cm
-    text_y = y + height - 0.7 * cm
-
-    c.setFont("Helvetica-Bold", 10)
-    c.drawString(text_x, text_y, f"{entry.pokemon_name.capitalize()}")
-    text_y -= 0.5 * cm
-    c.setFont("Helvetica-Oblique", 9)
-    c.drawString(text_x, text_y, f"'{entry.nickname}'" if entry.nickname else "(Sin apodo)")
-    text_y -= 0.6 * cm
-
-    c.setFont("Helvetica", 9)
-    c.drawString(text_x, text_y, f"Tipos: {entry.pokemon_types or 'N/A'}")
-    text_y -= 0.5 * cm
-
-    # Estadísticas
-    c.drawString(text_x, text_y, f"HP: {entry.hp or 'N/A'} | Atk: {entry.attack or 'N/A'}")
-    text_y -= 0.5 * cm
-    c.drawString(text_x, text_y, f"Def: {entry.defense or 'N/A'} | Vel: {entry.speed or 'N/A'}")
-
-    return sprite  # Devolvemos el sprite para la fila final
-
-
-def _create_team_export_pdf(team: Team, entries: List[PokedexEntry], user: User) -> io.BytesIO:
+def _create_team_export_pdf(team: Team, entries: List[PokedexEntry], user: User,
+                            if_none_match: Optional[str] = None, profile: PdfProfile = "standard") -> RenderedPdf:
     """Función helper para generar el PDF de exportación del equipo."""
-
-    buffer = io.BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-    width, height = A4
-    x_margin = 2 * cm
-    y_margin = 2 * cm
-    current_y = height - y_margin
-
-    # --- 1. Título y Descripción del Equipo ---
-    c.setFont("Helvetica-Bold", 20)
-    c.drawString(x_margin, current_y, f"Equipo: {team.name}")
-    current_y -= 0.7 * cm
-    c.setFont("Helvetica-Oblique", 12)
-    c.drawString(x_margin, current_y, f"Entrenador: {user.username}")
-    current_y -= 0.7 * cm
-
-    # --- ¡TU PETICIÓN: Añadir descripción del equipo! ---
-    if team.description:
-        c.setFont("Helvetica", 10)
-        c.drawString(x_margin, current_y, f"Descripción: {team.description}")
-        current_y -= 1.0 * cm
-    # --------------------------------------------------
-
-    # --- 2. Fichas de los 6 Pokémon ---
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(x_margin, current_y, "Miembros del Equipo")
-    current_y -= 0.5 * cm
-
-    sprites_in_row = []  # Para la sección final
-
-    card_height = 3.5 * cm
-    card_width = (width - 2 * x_margin - 1 * cm) / 2
-    x1 = x_margin
-    x2 = x_margin + card_width + 1 * cm
-
-    for i, entry in enumerate(entries):
-        if i < 3:  # Columna 1
-            card_x = x1
-            card_y = current_y - ((i + 1) * card_height)
-        else:  # Columna 2
-            card_x = x2
-            card_y = current_y - ((i - 3 + 1) * card_height)
-
-        # Dibujamos la mini-ficha con la función helper
-        sprite = _draw_pokemon_mini_card(c, card_x, card_y, card_width, card_height, entry)
-        if sprite:
-            sprites_in_row.append(sprite)
-
-    current_y -= (3.5 * card_height)  # Mover Y debajo de las 3 filas de fichas
-
-    # --- 3. Estadísticas Conjuntas ---
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(x_margin, current_y, "Estadísticas Conjuntas")
-    current_y -= 1 * cm
-
-    # --- ¡TU PETICIÓN: Calcular stats totales! ---
-    total_hp = sum(e.hp for e in entries if e.hp)
-    total_attack = sum(e.attack for e in entries if e.attack)
-    total_defense = sum(e.defense for e in entries if e.defense)
-    total_speed = sum(e.speed for e in entries if e.speed)
-    # ---------------------------------------------
-
-    c.setFont("Helvetica", 12)
-    c.drawString(x_margin, current_y, f"HP Total: {total_hp}")
-    c.drawString(x_margin + 5 * cm, current_y, f"Ataque Total: {total_attack}")
-    current_y -= 0.7 * cm
-    c.drawString(x_margin, current_y, f"Defensa Total: {total_defense}")
-    c.drawString(x_margin + 5 * cm, current_y, f"Velocidad Total: {total_speed}")
-    current_y -= 1 * cm
-
-    # --- 4. Fila de Sprites (Nuestra alternativa) ---
-    c.setFont("Helvetica", 10)
-    c.drawString(x_margin, current_y, "Alineación del Equipo:")
-    current_y -= 2.2 * cm
-
-    sprite_x = x_margin
-    for sprite in sprites_in_row:
-        c.drawImage(sprite, sprite_x, current_y, width=2 * cm, height=2 * cm, preserveAspectRatio=True, mask='auto')
-        sprite_x += 2.2 * cm
-
-    # --- Finalizar PDF ---
-    c.showPage()
-    c.save()
-
-    buffer.seek(0)
-    return buffer
-
+    # Solo datos planos: el PDF se dibuja en el pool de procesos y, si el equipo
+    # no ha cambiado desde la última exportación, se reutiliza el de la caché
+    return pdf_renderer.render_cached(
+        "team",
+        if_none_match=if_none_match,
+        team={"name": team.name, "description": team.description},
+        username=user.username,
+        entries=[entry_fields(entry) for entry in entries],
+        profile=profile
+    )
 
 
 # ENDPOINT de crear equipo
@@ -379,7 +253,8 @@ def export_team_pdf(
         request: Request,
         team_id: int,
         current_user: Annotated[User, Depends(get_current_user)],
-        session: Annotated[Session, Depends(get_session)]
+        session: Annotated[Session, Depends(get_session)],
+        profile: PdfProfile = Query("standard", description="PDF normal o \"compact\" (sprites a tamaño de impresión, más ligero)")
 ):
     """
     Exporta un equipo en formato PDF con fichas y estadísticas.
@@ -404,16 +279,13 @@ def export_team_pdf(
             ordered_entries.append(entry)
 
     try:
-        buffer = _create_team_export_pdf(db_team, ordered_entries, current_user)
+        rendered = _create_team_export_pdf(db_team, ordered_entries, current_user,
+                                           if_none_match=request.headers.get("if-none-match"), profile=profile)
         filename = f"equipo_{db_team.name.replace(' ', '_')}.pdf"
 
-        return StreamingResponse(
-            buffer,
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
-        )
+        return pdf_response(request, rendered, filename)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error al generar el PDF del equipo: {e}", exc_info=True)
         raise HTTPException(
@@ -0,0 +1,183 @@
+import logging
+import re
+import sqlite3
+import threading
+from typing import Optional, Dict, Any, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Ruta de la PokeAPI -> tipo de recurso que usamos en las claves de caché
+RESOURCE_KINDS = {
+    "pokemon": "pokemon",
+    "pokemon-species": "species",
+    "type": "type",
+    "evolution-chain": "evolution",
+}
+
+_URL_RE = re.compile(r"/api/v2/([a-z-]+)/(\d+)/?$")
+
+
+def parse_resource_url(url: Optional[str]) -> Optional[Tuple[str, int]]:
+    # "https://pokeapi.co/api/v2/pokemon-species/25/" -> ("species", 25)
+    if not url:
+        return None
+    match = _URL_RE.search(url)
+    if not match or match.group(1) not in RESOURCE_KINDS:
+        return None
+    return RESOURCE_KINDS[match.group(1)], int(match.group(2))
+
+
+def normalize_identifier(identifier: str | int) -> str:
+    return str(identifier).strip().lower()
+
+
+class AliasIndex:
+    """Índice nombre/ID -> ID canónico para cada tipo de recurso.
+
+    Se rellena con cada respuesta de la PokeAPI (el propio recurso y los
+    recursos que referencia) y se guarda en SQLite para que esté disponible
+    antes de hacer ninguna petición.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._aliases: Dict[Tuple[str, str], int] = {}
+        # Especie -> cadena evolutiva (sale de la respuesta de especie)
+        self._evolution_of: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._loaded = False
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS resource_aliases ("
+                " kind TEXT NOT NULL,"
+                " alias TEXT NOT NULL,"
+                " canonical_id INTEGER NOT NULL,"
+                " PRIMARY KEY (kind, alias))"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _load(self) -> None:
+        # Carga perezosa de todo lo aprendido por cualquier worker
+        if self._loaded:
+            return
+        self._loaded = True
+        conn = self._connection()
+        if conn is None:
+            return
+        try:
+            for kind, alias, canonical_id in conn.execute(
+                    "SELECT kind, alias, canonical_id FROM resource_aliases"):
+                self._remember(kind, alias, canonical_id)
+        except sqlite3.Error as e:
+            logger.error(f"Error cargando el índice de alias: {e}")
+
+    def _remember(self, kind: str, alias: str, canonical_id: int) -> None:
+        if kind == "evolution-of":
+            self._evolution_of[int(alias)] = canonical_id
+        else:
+            self._aliases[(kind, alias)] = canonical_id
+
+    def resolve(self, kind: str, identifier: str | int) -> Optional[int]:
+        ident = normalize_identifier(identifier)
+        if ident.isdigit():
+            return int(ident)
+
+        with self._lock:
+            self._load()
+            canonical_id = self._aliases.get((kind, ident))
+            if canonical_id is not None:
+                return canonical_id
+
+            # Puede que otro worker lo haya aprendido ya
+            conn = self._connection()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    "SELECT canonical_id FROM resource_aliases WHERE kind = ? AND alias = ?",
+                    (kind, ident)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"Error consultando el índice de alias: {e}")
+                return None
+            if row is None:
+                return None
+            self._aliases[(kind, ident)] = row[0]
+            return row[0]
+
+    def evolution_chain_of(self, species_id: int) -> Optional[int]:
+        with self._lock:
+            self._load()
+            return self._evolution_of.get(species_id)
+
+    def add(self, rows: Iterable[Tuple[str, str, int]]) -> None:
+        new_rows = []
+        with self._lock:
+            self._load()
+            for kind, alias, canonical_id in rows:
+                alias = normalize_identifier(alias)
+                key = (kind, alias)
+                known = (self._evolution_of.get(int(alias)) if kind == "evolution-of"
+                         else self._aliases.get(key))
+                if known != canonical_id:
+                    self._remember(kind, alias, canonical_id)
+                    new_rows.append((kind, alias, canonical_id))
+
+            conn = self._connection()
+            if not new_rows or conn is None:
+                return
+            try:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO resource_aliases (kind, alias, canonical_id) VALUES (?, ?, ?)",
+                    new_rows
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error guardando el índice de alias: {e}")
+
+    def learn(self, kind: str, raw_data: Dict[str, Any]) -> None:
+        # Aprende de una respuesta cruda: el propio recurso y sus referencias
+        rows = []
+        if raw_data.get("id") is not None and raw_data.get("name"):
+            rows.append((kind, raw_data["name"], raw_data["id"]))
+
+        refs = []
+        if kind == "pokemon":
+            refs.append(raw_data.get("species"))
+            refs.extend(t.get("type") for t in raw_data.get("types", []))
+        elif kind == "species":
+            refs.extend(v.get("pokemon") for v in raw_data.get("varieties", []))
+            chain = parse_resource_url((raw_data.get("evolution_chain") or {}).get("url"))
+            if chain and raw_data.get("id") is not None:
+                rows.append(("evolution-of", str(raw_data["id"]), chain[1]))
+        elif kind == "type":
+            refs.extend(p.get("pokemon") for p in raw_data.get("pokemon", []))
+
+        for ref in refs:
+            rows.extend(self._rows_from_reference(ref))
+        self.add(rows)
+
+    def learn_listing(self, results: Iterable[Dict[str, Any]]) -> None:
+        # Para listados completos (/pokemon?limit=..., /pokemon-species?limit=...)
+        rows = []
+        for ref in results:
+            rows.extend(self._rows_from_reference(ref))
+        self.add(rows)
+
+    @staticmethod
+    def _rows_from_reference(ref: Optional[Dict[str, Any]]):
+        if not ref or not ref.get("name"):
+            return []
+        parsed = parse_resource_url(ref.get("url"))
+        if parsed is None:
+            return []
+        return [(parsed[0], ref["name"], parsed[1])]
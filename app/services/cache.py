@@ -0,0 +1,323 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Any, Dict, List
+
+from app.services.metrics import registry
+from app.services.records import compact, expand
+
+logger = logging.getLogger(__name__)
+
+cache_lookups = registry.counter(
+    "pokeapi_cache_lookups_total",
+    "Consultas a cada nivel de caché por recurso y resultado (hit, expired, miss)",
+    ("tier", "resource", "result")
+)
+
+
+def record_lookup(tier: str, key: str, entry: Optional["CacheEntry"]) -> None:
+    result = "miss" if entry is None else ("hit" if entry.is_fresh else "expired")
+    cache_lookups.inc(tier=tier, resource=key.split(":", 1)[0], result=result)
+
+
+class CacheEntry:
+    """Respuesta ya transformada de la PokeAPI junto a sus validadores HTTP."""
+
+    def __init__(self, key: str, payload: Any, expires_at: float,
+                 etag: Optional[str] = None, last_modified: Optional[str] = None):
+        self.key = key
+        self.payload = payload
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    def stale_for(self) -> float:
+        # Segundos que lleva caducada (0 si sigue fresca)
+        return max(0.0, time.time() - self.expires_at)
+
+    def conditional_headers(self) -> Dict[str, str]:
+        # Cabeceras para revalidar (la PokeAPI contesta 304 si no ha cambiado)
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class CacheBackend:
+    # Interfaz común: cualquier almacén (memoria, SQLite...) se puede enchufar al servicio
+    def get(self, key: str) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    def set(self, entry: CacheEntry) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def invalidate(self, prefix: Optional[str] = None) -> None:
+        # None = todo, "pokemon:" = todo un recurso, "pokemon:25" = solo esa clave
+        raise NotImplementedError
+
+
+def _matches(key: str, prefix: str) -> bool:
+    return key.startswith(prefix) if prefix.endswith(":") else key == prefix
+
+
+class MemoryCache(CacheBackend):
+    """LRU en memoria del proceso.
+
+    Con compact_payloads guarda pokemon, especies y tipos como registros
+    compactos (ver records.py) y devuelve siempre dicts al leer.
+    """
+
+    tier = "memory"
+
+    def __init__(self, maxsize: int = 1024, compact_payloads: bool = False):
+        self.maxsize = maxsize
+        self.compact_payloads = compact_payloads
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        record_lookup(self.tier, key, entry)
+        if entry is not None and self.compact_payloads:
+            payload = expand(entry.payload)
+            if payload is not entry.payload:
+                entry = CacheEntry(entry.key, payload, entry.expires_at, entry.etag, entry.last_modified)
+        return entry
+
+    def set(self, entry: CacheEntry) -> None:
+        if self.compact_payloads:
+            # "pokemon:25" -> se guarda como PokemonRecord
+            payload = compact(entry.key.split(":", 1)[0], entry.payload)
+            if payload is not entry.payload:
+                entry = CacheEntry(entry.key, payload, entry.expires_at, entry.etag, entry.last_modified)
+        with self._lock:
+            self._entries[entry.key] = entry
+            self._entries.move_to_end(entry.key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def invalidate(self, prefix: Optional[str] = None) -> None:
+        with self._lock:
+            if prefix is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if _matches(k, prefix)]:
+                del self._entries[key]
+
+
+class SQLiteCache(CacheBackend):
+    """Caché persistente en un fichero SQLite (sobrevive a reinicios)."""
+
+    tier = "disk"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS upstream_cache ("
+                " key TEXT PRIMARY KEY,"
+                " payload TEXT NOT NULL,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " expires_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            # Contador que sube con cada invalidación (lo leen el resto de workers)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_meta ("
+                " name TEXT PRIMARY KEY,"
+                " value INTEGER NOT NULL)"
+            )
+            conn.execute("INSERT OR IGNORE INTO cache_meta (name, value) VALUES ('generation', 0)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT payload, etag, last_modified, expires_at FROM upstream_cache WHERE key = ?",
+                    (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            # La caché nunca debe tumbar una petición
+            logger.error(f"Error leyendo la caché SQLite: {e}")
+            return None
+
+        if row is None:
+            record_lookup(self.tier, key, None)
+            return None
+        payload, etag, last_modified, expires_at = row
+        entry = CacheEntry(key, json.loads(payload), expires_at, etag, last_modified)
+        record_lookup(self.tier, key, entry)
+        return entry
+
+    def set(self, entry: CacheEntry) -> None:
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO upstream_cache"
+                    " (key, payload, etag, last_modified, expires_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (entry.key, json.dumps(entry.payload), entry.etag, entry.last_modified,
+                     entry.expires_at, time.time())
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error escribiendo en la caché SQLite: {e}")
+
+    def delete(self, key: str) -> None:
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute("DELETE FROM upstream_cache WHERE key = ?", (key,))
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error borrando de la caché SQLite: {e}")
+
+    def clear(self) -> None:
+        self.invalidate()
+
+    def invalidate(self, prefix: Optional[str] = None) -> None:
+        try:
+            with self._lock:
+                conn = self._connection()
+                if prefix is None:
+                    conn.execute("DELETE FROM upstream_cache")
+                elif not prefix.endswith(":"):
+                    conn.execute("DELETE FROM upstream_cache WHERE key = ?", (prefix,))
+                else:
+                    conn.execute(
+                        "DELETE FROM upstream_cache WHERE substr(key, 1, ?) = ?",
+                        (len(prefix), prefix)
+                    )
+                conn.execute("UPDATE cache_meta SET value = value + 1 WHERE name = 'generation'")
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error invalidando la caché SQLite: {e}")
+
+    def generation(self) -> int:
+        try:
+            with self._lock:
+                row = self._connection().execute(
+                    "SELECT value FROM cache_meta WHERE name = 'generation'"
+                ).fetchone()
+            return row[0] if row else 0
+        except sqlite3.Error as e:
+            logger.error(f"Error leyendo la generación de la caché: {e}")
+            return 0
+
+
+class TieredCache(CacheBackend):
+    """Varias capas en orden (la más rápida primero). Un acierto abajo rellena las de arriba."""
+
+    def __init__(self, tiers: List[CacheBackend]):
+        self.tiers = tiers
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        # Una entrada caducada arriba no tapa una fresca más abajo (otro worker
+        # puede haberla renovado); si ninguna está fresca, la que caduca más tarde
+        stale: Optional[CacheEntry] = None
+        missed: List[CacheBackend] = []
+        for i, tier in enumerate(self.tiers):
+            entry = tier.get(key)
+            if entry is None:
+                missed.append(tier)
+                continue
+            if entry.is_fresh:
+                for upper in self.tiers[:i]:
+                    upper.set(entry)
+                return entry
+            if stale is None or entry.expires_at > stale.expires_at:
+                stale = entry
+        if stale is not None:
+            for tier in missed:
+                tier.set(stale)
+        return stale
+
+    def set(self, entry: CacheEntry) -> None:
+        for tier in self.tiers:
+            tier.set(entry)
+
+    def delete(self, key: str) -> None:
+        for tier in self.tiers:
+            tier.delete(key)
+
+    def clear(self) -> None:
+        for tier in self.tiers:
+            tier.clear()
+
+    def invalidate(self, prefix: Optional[str] = None) -> None:
+        for tier in self.tiers:
+            tier.invalidate(prefix)
+
+
+class SharedCache(TieredCache):
+    """Memoria del worker delante de un SQLite compartido por todos los workers del host.
+
+    Las invalidaciones se hacen siempre sobre el SQLite y suben su generación;
+    cada worker la consulta como mucho una vez por sync_interval y, si ha
+    cambiado, vacía su memoria local.
+    """
+
+    def __init__(self, memory: MemoryCache, shared: SQLiteCache, sync_interval: float = 1.0):
+        super().__init__([memory, shared])
+        self.memory = memory
+        self.shared = shared
+        self.sync_interval = sync_interval
+        self._generation: Optional[int] = None
+        self._checked_at = 0.0
+
+    def _sync(self) -> None:
+        now = time.monotonic()
+        if self._generation is not None and now - self._checked_at < self.sync_interval:
+            return
+        self._checked_at = now
+        generation = self.shared.generation()
+        if self._generation is not None and generation != self._generation:
+            self.memory.clear()
+        self._generation = generation
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        self._sync()
+        return super().get(key)
+
+    def invalidate(self, prefix: Optional[str] = None) -> None:
+        super().invalidate(prefix)
+        self._generation = self.shared.generation()
+        self._checked_at = time.monotonic()
@@ -0,0 +1,194 @@
+import glob
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Any, Dict, Iterator, Iterable, Tuple, List
+
+from app.services.aliases import RESOURCE_KINDS
+from app.services.records import compact, expand
+
+logger = logging.getLogger(__name__)
+
+
+class Catalog:
+    """Copia local del dataset de la PokeAPI (pokemon, especies, tipos, cadenas y sprites).
+
+    Se rellena con `python -m app.cli catalog-import` y el servicio lo consulta
+    antes de salir a la red. Guarda los datos ya transformados.
+    """
+
+    def __init__(self, path: Optional[str], memo_size: int = 2048):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._memo: "OrderedDict[Tuple[str, int], Any]" = OrderedDict()
+        self._memo_size = memo_size
+
+    @property
+    def available(self) -> bool:
+        # Sin fichero no hay catálogo (no lo creamos solo por consultarlo)
+        return bool(self.path) and (self._conn is not None or os.path.exists(self.path))
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS catalog_resources ("
+                " kind TEXT NOT NULL,"
+                " id INTEGER NOT NULL,"
+                " name TEXT,"
+                " payload TEXT NOT NULL,"
+                " etag TEXT,"
+                " last_modified TEXT,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (kind, id))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS catalog_sprites ("
+                " url TEXT PRIMARY KEY,"
+                " content BLOB NOT NULL)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, kind: str, resource_id: int) -> Optional[Any]:
+        if not self.available:
+            return None
+        with self._lock:
+            memo_key = (kind, resource_id)
+            if memo_key in self._memo:
+                self._memo.move_to_end(memo_key)
+                return expand(self._memo[memo_key])
+            try:
+                row = self._connection().execute(
+                    "SELECT payload FROM catalog_resources WHERE kind = ? AND id = ?",
+                    (kind, resource_id)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.error(f"Error leyendo el catálogo: {e}")
+                return None
+            if row is None:
+                return None
+            payload = json.loads(row[0])
+            self._memo[memo_key] = compact(kind, payload)
+            if len(self._memo) > self._memo_size:
+                self._memo.popitem(last=False)
+            return payload
+
+    def put_many(self, rows: Iterable[Tuple[str, int, Optional[str], Any, Optional[str], Optional[str]]]) -> int:
+        # rows: (kind, id, name, payload, etag, last_modified)
+        now = time.time()
+        values = [
+            (kind, resource_id, name, json.dumps(payload), etag, last_modified, now)
+            for kind, resource_id, name, payload, etag, last_modified in rows
+        ]
+        with self._lock:
+            conn = self._connection()
+            conn.executemany(
+                "INSERT OR REPLACE INTO catalog_resources"
+                " (kind, id, name, payload, etag, last_modified, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                values
+            )
+            conn.commit()
+            for kind, resource_id, *_ in values:
+                self._memo.pop((kind, resource_id), None)
+        return len(values)
+
+    def entries(self, kind: Optional[str] = None) -> List[Tuple[str, int, Optional[str], Optional[str]]]:
+        # (kind, id, etag, last_modified) para el refresco incremental
+        if not self.available:
+            return []
+        query = "SELECT kind, id, etag, last_modified FROM catalog_resources"
+        params: Tuple = ()
+        if kind:
+            query += " WHERE kind = ?"
+            params = (kind,)
+        with self._lock:
+            return self._connection().execute(query + " ORDER BY kind, id", params).fetchall()
+
+    def touch(self, kind: str, resource_id: int) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "UPDATE catalog_resources SET updated_at = ? WHERE kind = ? AND id = ?",
+                (time.time(), kind, resource_id)
+            )
+            conn.commit()
+
+    def count(self, kind: str) -> int:
+        if not self.available:
+            return 0
+        with self._lock:
+            return self._connection().execute(
+                "SELECT COUNT(*) FROM catalog_resources WHERE kind = ?", (kind,)
+            ).fetchone()[0]
+
+    def names(self, kind: str) -> List[Tuple[int, str]]:
+        if not self.available:
+            return []
+        with self._lock:
+            return self._connection().execute(
+                "SELECT id, name FROM catalog_resources WHERE kind = ? AND name IS NOT NULL ORDER BY id",
+                (kind,)
+            ).fetchall()
+
+    def get_sprite(self, url: str) -> Optional[bytes]:
+        if not self.available:
+            return None
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT content FROM catalog_sprites WHERE url = ?", (url,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put_sprite(self, url: str, content: bytes) -> None:
+        with self._lock:
+            conn = self._connection()
+            conn.execute("INSERT OR REPLACE INTO catalog_sprites (url, content) VALUES (?, ?)", (url, content))
+            conn.commit()
+
+
+def iter_dump(path: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Recorre un volcado de la PokeAPI y devuelve (tipo, datos crudos).
+
+    Formatos admitidos:
+      - directorio con la estructura de PokeAPI/api-data (.../api/v2/pokemon/25/index.json)
+      - fichero .jsonl con líneas {"resource": "pokemon", "data": {...}}
+      - fichero .json con {"pokemon": [...], "pokemon-species": [...], ...}
+    """
+    if os.path.isdir(path):
+        for resource, kind in RESOURCE_KINDS.items():
+            pattern = os.path.join(path, "**", resource, "*", "index.json")
+            for index_file in sorted(glob.glob(pattern, recursive=True)):
+                with open(index_file, encoding="utf-8") as f:
+                    yield kind, json.load(f)
+        return
+
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield RESOURCE_KINDS.get(record["resource"], record["resource"]), record["data"]
+            return
+
+        for resource, items in json.load(f).items():
+            kind = RESOURCE_KINDS.get(resource, resource)
+            for raw_data in items:
+                yield kind, raw_data
+
+
+def sprite_file_for(url: str, sprites_dir: str) -> Optional[str]:
+    # https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/25.png
+    #   -> <sprites_dir>/sprites/pokemon/25.png
+    if not url or "/master/" not in url:
+        return None
+    candidate = os.path.join(sprites_dir, url.split("/master/", 1)[1])
+    return candidate if os.path.isfile(candidate) else None
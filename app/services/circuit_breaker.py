@@ -0,0 +1,85 @@
+import random
+import threading
+import time
+from typing import Optional, Tuple
+
+
+class CircuitBreaker:
+    """Cortocircuito para la PokeAPI.
+
+    closed: las peticiones pasan. Tras failure_threshold fallos seguidos pasa a
+    open y se falla al momento durante reset_timeout segundos. Después deja
+    pasar una única petición de prueba (half-open): si va bien se cierra, si
+    falla vuelve a abrirse. Si la prueba se abandona sin respuesta (planificador
+    saturado, petición cancelada) release_probe() con el número que devolvió
+    acquire() deja pasar la siguiente.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._opened_at = 0.0
+            self._probe_in_flight = False
+            self._probe = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        return self.acquire()[0]
+
+    def acquire(self) -> Tuple[bool, Optional[int]]:
+        # (se deja pasar, número de la prueba si esta petición es la del half-open)
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True, None
+            if self._state == self.OPEN and time.monotonic() - self._opened_at < self.reset_timeout:
+                return False, None
+            # Half-open: solo una petición de prueba a la vez
+            if self._probe_in_flight:
+                return False, None
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = True
+            self._probe += 1
+            return True, self._probe
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def release_probe(self, probe: int) -> None:
+        # La prueba no llegó a dar veredicto: sigue en half-open y puede salir otra.
+        # Solo la suelta quien la tiene (no la de otra petición posterior)
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probe_in_flight and self._probe == probe:
+                self._probe_in_flight = False
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    # Backoff exponencial con "full jitter": aleatorio entre 0 y base * 2^(intento-1)
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
@@ -0,0 +1,301 @@
+"""Exportaciones a PDF en segundo plano.
+
+POST crea el trabajo y responde enseguida; un pool de hilos acotado lo genera
+(el dibujo en sí va al pool de procesos de pdf_render) y deja el fichero en
+EXPORT_JOB_DIR hasta que caduca. Si se pide lo mismo mientras el primero sigue
+pendiente, se devuelve ese mismo trabajo (un índice único parcial en la BD lo
+garantiza entre workers). Cada worker marca con un latido los trabajos que tiene
+en marcha; los que dejan de latir (worker caído) se dan por fallidos. Con
+EXPORT_JOB_WORKERS=0 se genera dentro de la petición (tests).
+"""
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.config import settings
+from app.models import ExportJob, ExportJobCreate, PokedexEntry, Team, User
+from app.services.metrics import registry
+from app.services.pdf_documents import entry_fields
+from app.services.pdf_render import pdf_renderer
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("pending", "running")
+
+export_jobs_finished = registry.counter(
+    "pdf_export_jobs_total", "Exportaciones en segundo plano terminadas (done, failed)", ("kind", "result")
+)
+export_jobs_deduplicated = registry.counter(
+    "pdf_export_jobs_deduplicated_total", "Peticiones resueltas con un trabajo igual ya pendiente", ("kind",)
+)
+
+
+def job_params(job_create: ExportJobCreate) -> str:
+    # Solo lo que cambia el PDF, en JSON canónico para comparar en la BD
+    if job_create.kind == "team":
+        params = {"team_id": job_create.team_id}
+    else:
+        params = {"captured": job_create.captured, "favorite": job_create.favorite}
+    params["profile"] = job_create.profile
+    return json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+
+def _team_entries(session: Session, team: Team) -> List[PokedexEntry]:
+    # En el orden de las posiciones del equipo
+    entries = []
+    for member in sorted(team.members, key=lambda m: m.position):
+        entry = session.get(PokedexEntry, member.pokedex_entry_id)
+        if entry:
+            entries.append(entry)
+    return entries
+
+
+class ExportJobQueue:
+    """Cola de exportaciones: trabajos en la BD y ficheros en disco hasta que caducan."""
+
+    def __init__(self, directory: str, workers: int = 2, max_pending: int = 100, ttl: int = 3600,
+                 heartbeat: float = 15.0, stale_after: float = 60.0):
+        self.directory = directory
+        self.workers = workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.heartbeat = heartbeat
+        self.stale_after = stale_after
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._worker_id: Optional[Tuple[int, str]] = None
+        self._stop = threading.Event()
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        registry.gauge_collector(
+            "pdf_export_jobs_pending", "Exportaciones en cola o generándose", lambda: [({}, self._pending)]
+        )
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pdf-export")
+        return self._executor
+
+    @property
+    def worker_id(self) -> str:
+        # Distinto en cada proceso (también en los hijos de un fork) y en cada arranque
+        pid = os.getpid()
+        if self._worker_id is None or self._worker_id[0] != pid:
+            self._worker_id = (pid, f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}")
+        return self._worker_id[1]
+
+    @staticmethod
+    def _find_active(session: Session, owner_id: int, kind: str, params: str) -> Optional[ExportJob]:
+        return session.exec(select(ExportJob).where(
+            ExportJob.owner_id == owner_id,
+            ExportJob.kind == kind,
+            ExportJob.params == params,
+            ExportJob.status.in_(ACTIVE_STATUSES)
+        )).first()
+
+    def submit(self, session: Session, owner_id: int, job_create: ExportJobCreate) -> ExportJob:
+        """Crea el trabajo (o devuelve el igual que ya está pendiente) y lo encola."""
+        self.purge_expired(session)
+        self.fail_orphaned(session)
+        params = job_params(job_create)
+        existing = self._find_active(session, owner_id, job_create.kind, params)
+        if existing is None:
+            with self._lock:
+                if self._pending >= self.max_pending:
+                    logger.warning(f"Cola de exportaciones llena ({self._pending})")
+                    raise HTTPException(
+                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        detail="Demasiadas exportaciones en cola, inténtalo en unos minutos."
+                    )
+                self._pending += 1
+            job = ExportJob(owner_id=owner_id, kind=job_create.kind, params=params,
+                            worker_id=self.worker_id, heartbeat_at=datetime.utcnow())
+            session.add(job)
+            try:
+                session.commit()
+            except IntegrityError:
+                # Otro worker lo ha creado a la vez: el índice único deja solo uno
+                session.rollback()
+                with self._lock:
+                    self._pending -= 1
+                existing = self._find_active(session, owner_id, job_create.kind, params)
+                if existing is None:
+                    raise
+        if existing is not None:
+            export_jobs_deduplicated.inc(kind=job_create.kind)
+            return existing
+        session.refresh(job)
+
+        if self.workers <= 0:
+            self._execute(session, job.id)
+            session.refresh(job)
+        else:
+            # El hilo abre su propia sesión contra la misma BD
+            self.executor.submit(self._run_in_thread, session.get_bind(), job.id)
+        return job
+
+    def _run_in_thread(self, bind, job_id: int) -> None:
+        with Session(bind) as session:
+            self._execute(session, job_id)
+
+    def _execute(self, session: Session, job_id: int) -> None:
+        job = session.get(ExportJob, job_id)
+        try:
+            job.status = "running"
+            job.heartbeat_at = datetime.utcnow()
+            session.add(job)
+            session.commit()
+            try:
+                content, filename = self._render(session, job)
+                job.path = self._write(job.id, content)
+                job.size = len(content)
+                job.filename = filename
+                job.status = "done"
+            except Exception as e:
+                logger.error(f"Error en la exportación {job.id} ({job.kind}): {e}", exc_info=True)
+                job.status = "failed"
+                job.error = e.detail if isinstance(e, HTTPException) else str(e)
+            job.finished_at = datetime.utcnow()
+            job.expires_at = job.finished_at + timedelta(seconds=self.ttl)
+            session.add(job)
+            session.commit()
+            export_jobs_finished.inc(kind=job.kind, result=job.status)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _render(self, session: Session, job: ExportJob) -> Tuple[bytes, str]:
+        params = json.loads(job.params)
+        user = session.get(User, job.owner_id)
+
+        if job.kind == "team":
+            team = session.get(Team, params["team_id"])
+            if team is None or team.trainer_id != job.owner_id:
+                raise ValueError("Equipo no encontrado.")
+            rendered = pdf_renderer.render_cached(
+                "team",
+                team={"name": team.name, "description": team.description},
+                username=user.username,
+                entries=[entry_fields(entry) for entry in _team_entries(session, team)],
+                profile=params["profile"]
+            )
+            return rendered.read(), f"equipo_{team.name.replace(' ', '_')}.pdf"
+
+        statement = select(PokedexEntry).where(PokedexEntry.owner_id == job.owner_id)
+        if params["captured"] is not None:
+            statement = statement.where(PokedexEntry.is_captured == params["captured"])
+        if params["favorite"] is not None:
+            statement = statement.where(PokedexEntry.favorite == params["favorite"])
+        entries = session.exec(statement.order_by(PokedexEntry.pokemon_id)).all()
+        content = pdf_renderer.render(
+            "pokedex", username=user.username, entries=[entry_fields(entry) for entry in entries],
+            profile=params["profile"]
+        )
+        return content, f"pokedex_{user.username}.pdf"
+
+    def _write(self, job_id: int, content: bytes) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{job_id}.pdf")
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        return path
+
+    def purge_expired(self, session: Session) -> int:
+        """Borra los trabajos caducados y sus ficheros."""
+        expired = session.exec(select(ExportJob).where(ExportJob.expires_at < datetime.utcnow())).all()
+        for job in expired:
+            if job.path:
+                try:
+                    os.unlink(job.path)
+                except OSError:
+                    pass
+            session.delete(job)
+        if expired:
+            session.commit()
+            logger.info(f"Exportaciones caducadas borradas: {len(expired)}")
+        return len(expired)
+
+    def fail_orphaned(self, session: Session) -> int:
+        """Da por fallidos los trabajos activos cuyo worker dejó de latir."""
+        now = datetime.utcnow()
+        orphaned = session.exec(select(ExportJob).where(
+            ExportJob.status.in_(ACTIVE_STATUSES),
+            ExportJob.worker_id != self.worker_id,
+            ExportJob.heartbeat_at < now - timedelta(seconds=self.stale_after)
+        )).all()
+        for job in orphaned:
+            job.status = "failed"
+            job.error = "Exportación interrumpida: el servidor que la generaba se detuvo."
+            job.finished_at = now
+            job.expires_at = now + timedelta(seconds=self.ttl)
+            session.add(job)
+        if orphaned:
+            session.commit()
+            logger.warning(f"Exportaciones huérfanas marcadas como fallidas: {len(orphaned)}")
+        return len(orphaned)
+
+    def recover(self, session: Session) -> None:
+        # Al arrancar: solo lo que dejó a medias un worker que ya no late; los trabajos
+        # de los demás workers vivos siguen su curso
+        self.fail_orphaned(session)
+        self.purge_expired(session)
+
+    def beat(self, session: Session) -> None:
+        # Latido de los trabajos de este worker y limpieza de los de workers caídos
+        session.execute(update(ExportJob).where(
+            ExportJob.worker_id == self.worker_id,
+            ExportJob.status.in_(ACTIVE_STATUSES)
+        ).values(heartbeat_at=datetime.utcnow()))
+        session.commit()
+        self.fail_orphaned(session)
+
+    def start(self, bind) -> None:
+        """Arranca el hilo del latido (solo con pool de hilos)."""
+        if self.workers <= 0 or self.heartbeat <= 0 or self._heartbeat_thread is not None:
+            return
+        self._stop.clear()
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop, args=(bind,), name="pdf-export-heartbeat", daemon=True
+        )
+        self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self, bind) -> None:
+        while not self._stop.wait(self.heartbeat):
+            try:
+                with Session(bind) as session:
+                    self.beat(session)
+            except Exception as e:
+                logger.error(f"Error en el latido de las exportaciones: {e}", exc_info=True)
+
+    def shutdown(self) -> None:
+        self._stop.set()
+        self._heartbeat_thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Instancia compartida por toda la app
+export_queue = ExportJobQueue(
+    settings.EXPORT_JOB_DIR,
+    workers=settings.EXPORT_JOB_WORKERS,
+    max_pending=settings.EXPORT_JOB_MAX_PENDING,
+    ttl=settings.EXPORT_JOB_TTL,
+    heartbeat=settings.EXPORT_JOB_HEARTBEAT,
+    stale_after=settings.EXPORT_JOB_STALE_AFTER
+)
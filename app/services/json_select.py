@@ -0,0 +1,23 @@
+import json
+from typing import Any, Dict, Optional, Union
+
+# Campo -> None (se queda entero) o un dict con los subcampos que queremos
+FieldSpec = Dict[str, Optional["FieldSpec"]]
+
+
+def select_fields(body: Union[bytes, str], spec: FieldSpec) -> Any:
+    """Decodifica un documento JSON y se queda solo con los campos de `spec`.
+
+    Decodificamos con json.loads (en C) y proyectamos después: un escáner en
+    Python que saltara los `moves` sin decodificarlos usaba ~4x más CPU en una
+    respuesta de pokemon de ~150 KB. Lo que no está en `spec` se suelta al
+    acabar, así que no llega a la caché. Si la raíz no es un objeto se
+    devuelve entera.
+    """
+    return _project(json.loads(body), spec)
+
+
+def _project(value: Any, spec: Optional[FieldSpec]) -> Any:
+    if spec is None or not isinstance(value, dict):
+        return value
+    return {key: _project(value[key], subspec) for key, subspec in spec.items() if key in value}
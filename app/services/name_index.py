@@ -0,0 +1,105 @@
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from app.services.aliases import normalize_identifier, parse_resource_url
+
+
+def _trigrams(text: str) -> set:
+    # Con relleno para que los extremos cuenten ("^^c", "^ch", ..., "r$$")
+    padded = f"^^{text}$$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """Índice local de nombres de pokemon para buscar sin salir a la PokeAPI.
+
+    - Prefijo (autocompletado): búsqueda binaria sobre los nombres ordenados.
+    - Subcadena y "quizás quisiste decir": índice de trigramas con similitud de Dice.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[int, str]]):
+        by_name: Dict[str, int] = {}
+        for resource_id, name in entries:
+            by_name.setdefault(normalize_identifier(name), int(resource_id))
+        self.names: List[str] = sorted(by_name)
+        self.ids = array("I", (by_name[name] for name in self.names))
+        # Posiciones en orden de ID (para el listado normal con limit/offset)
+        self.by_id = array("I", sorted(range(len(self.names)), key=lambda i: self.ids[i]))
+        self._trigram_index: Dict[str, array] = defaultdict(lambda: array("I"))
+        for position, name in enumerate(self.names):
+            for gram in _trigrams(name):
+                self._trigram_index[gram].append(position)
+        self._trigram_index = dict(self._trigram_index)
+        self.built_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def entry(self, position: int) -> Tuple[int, str]:
+        return self.ids[position], self.names[position]
+
+    def listing(self, limit: int, offset: int) -> List[Tuple[int, str]]:
+        return [self.entry(position) for position in self.by_id[offset:offset + limit]]
+
+    def prefix(self, query: str) -> range:
+        # Rango de posiciones cuyos nombres empiezan por query
+        start = bisect_left(self.names, query)
+        end = bisect_left(self.names, query + "\uffff", lo=start)
+        return range(start, end)
+
+    def _scored(self, query: str) -> List[Tuple[float, int]]:
+        grams = _trigrams(query)
+        shared: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for position in self._trigram_index.get(gram, ()):
+                shared[position] += 1
+        scored = []
+        for position, count in shared.items():
+            score = 2 * count / (len(grams) + len(self.names[position]) + 2)
+            scored.append((score, position))
+        scored.sort(key=lambda item: (-item[0], self.names[item[1]]))
+        return scored
+
+    def search(self, query: str) -> List[int]:
+        """Posiciones que casan con query: primero por prefijo, luego por subcadena."""
+        query = normalize_identifier(query)
+        if not query:
+            return []
+        matches = list(self.prefix(query))
+        seen = set(matches)
+        if len(query) >= 3:
+            # Subcadenas: candidatas por trigramas internos y comprobadas a mano
+            inner = [query[i:i + 3] for i in range(len(query) - 2)]
+            candidates = None
+            for gram in inner:
+                positions = set(self._trigram_index.get(gram, ()))
+                candidates = positions if candidates is None else candidates & positions
+                if not candidates:
+                    break
+            for position in sorted(candidates or ()):
+                if position not in seen and query in self.names[position]:
+                    matches.append(position)
+        return matches
+
+    def suggest(self, query: str, limit: int = 5, min_score: float = 0.3) -> List[str]:
+        # "¿Quizás quisiste decir...?" para nombres mal escritos
+        query = normalize_identifier(query)
+        if not query:
+            return []
+        return [self.names[position] for score, position in self._scored(query)[:limit] if score >= min_score]
+
+    def is_stale(self, max_age: float) -> bool:
+        return time.time() - self.built_at > max_age
+
+
+def build_from_listing(results: Iterable[Dict]) -> NameIndex:
+    # results: [{"name": ..., "url": ".../pokemon-species/25/"}, ...]
+    entries = []
+    for item in results:
+        parsed = parse_resource_url(item.get("url"))
+        if parsed is not None and item.get("name"):
+            entries.append((parsed[1], item["name"]))
+    return NameIndex(entries)
@@ -0,0 +1,206 @@
+"""Caché en disco de PDFs ya generados.
+
+La clave es un hash de las entradas del documento y de la versión del diseño
+(pdf_documents.LAYOUT_VERSION): mismas entradas -> mismo PDF (ReportLab en
+modo invariant), así que la clave sirve como ETag fuerte.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+
+from app.services.metrics import registry
+from app.services.pdf_documents import LAYOUT_VERSION
+
+logger = logging.getLogger(__name__)
+
+pdf_cache_lookups = registry.counter(
+    "pdf_cache_lookups_total", "PDFs servidos desde la caché de disco, generados o resueltos con 304",
+    ("document", "result")
+)
+
+
+class RenderedPdf:
+    """PDF listo para responder: enlace propio al fichero de la caché, bytes en memoria o solo un 304."""
+
+    __slots__ = ("etag", "path", "content", "not_modified")
+
+    def __init__(self, etag: Optional[str], path: Optional[str] = None, content: Optional[bytes] = None,
+                 not_modified: bool = False):
+        self.etag = etag
+        self.path = path
+        self.content = content
+        self.not_modified = not_modified
+
+    def read(self) -> bytes:
+        # Los bytes del PDF, de memoria o del enlace de la caché (que se borra después)
+        if self.content is not None:
+            return self.content
+        try:
+            with open(self.path, "rb") as f:
+                return f.read()
+        finally:
+            _unlink_quietly(self.path)
+
+
+def _unlink_quietly(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+class PdfCache:
+    """Ficheros <hash>.pdf en un directorio, con tope de tamaño (se borran los menos usados).
+
+    Cada respuesta se sirve desde un enlace duro propio en .serving/: si el recorte
+    borra el PDF mientras se envía, el enlace mantiene el fichero hasta terminar.
+    """
+
+    SERVING_DIR = ".serving"
+    # Enlaces que quedaron de respuestas que no terminaron (worker caído)
+    SERVING_MAX_AGE = 3600
+
+    def __init__(self, directory: Optional[str], max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    @staticmethod
+    def key(document: str, inputs: Dict[str, Any]) -> str:
+        canonical = json.dumps(
+            {"document": document, "layout": LAYOUT_VERSION, "inputs": inputs},
+            sort_keys=True, separators=(",", ":"), default=str, ensure_ascii=False
+        )
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    @staticmethod
+    def etag(key: str) -> str:
+        return f'"{key}"'
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.pdf")
+
+    def get(self, key: str) -> Optional[str]:
+        """Ruta de un enlace duro al PDF solo para esta respuesta (quien lo usa lo borra)."""
+        if not self.enabled:
+            return None
+        path = self.path_for(key)
+        serving_dir = os.path.join(self.directory, self.SERVING_DIR)
+        link = os.path.join(serving_dir, f"{key}-{uuid.uuid4().hex}.pdf")
+        try:
+            os.makedirs(serving_dir, exist_ok=True)
+            os.link(path, link)
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"No se pudo enlazar el PDF {key} para servirlo: {e}")
+            return None
+        try:
+            # La fecha de modificación hace de "último uso" para el recorte
+            os.utime(path)
+        except OSError:
+            pass
+        return link
+
+    def put(self, key: str, content: bytes) -> Optional[str]:
+        if not self.enabled:
+            return None
+        path = self.path_for(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el PDF {key} en la caché: {e}")
+            return None
+        self._grow(len(content))
+        return path
+
+    def _grow(self, added: int) -> None:
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._files())
+            else:
+                self._size += added
+            if self._size <= self.max_bytes:
+                return
+            # Borramos los menos usados hasta quedar en el 90% del tope
+            for mtime, size, path in sorted(self._files()):
+                if self._size <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.unlink(path)
+                    self._size -= size
+                except OSError:
+                    pass
+            self._purge_serving()
+
+    def _purge_serving(self) -> None:
+        serving_dir = os.path.join(self.directory, self.SERVING_DIR)
+        try:
+            names = os.listdir(serving_dir)
+        except OSError:
+            return
+        limit = time.time() - self.SERVING_MAX_AGE
+        for name in names:
+            path = os.path.join(serving_dir, name)
+            try:
+                if os.lstat(path).st_ctime < limit:
+                    os.unlink(path)
+            except OSError:
+                pass
+
+    def _files(self):
+        for root, dirs, files in os.walk(self.directory):
+            # Los enlaces de .serving no cuentan: son los mismos ficheros
+            dirs[:] = [d for d in dirs if d != self.SERVING_DIR]
+            for name in files:
+                if name.endswith(".pdf"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match: "a", W/"b" o *
+    if not if_none_match:
+        return False
+    candidates = [value.strip().removeprefix("W/") for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def pdf_response(request: Request, rendered: RenderedPdf, filename: str) -> Response:
+    # 304 si el cliente ya lo tiene; si no, el fichero tal cual (sendfile) o los bytes
+    headers = {"Cache-Control": "private, no-cache"}
+    if rendered.etag is not None:
+        headers["ETag"] = rendered.etag
+        if rendered.not_modified or etag_matches(request.headers.get("if-none-match"), rendered.etag):
+            if rendered.path is not None:
+                _unlink_quietly(rendered.path)
+            return Response(status_code=304, headers=headers)
+    headers["Content-Disposition"] = f"attachment; filename={filename}"
+    if rendered.content is None and rendered.path is not None:
+        # El enlace de esta respuesta se borra cuando termina de enviarse
+        return FileResponse(rendered.path, media_type="application/pdf", headers=headers,
+                            background=BackgroundTask(_unlink_quietly, rendered.path))
+    return Response(rendered.content, media_type="application/pdf", headers=headers)
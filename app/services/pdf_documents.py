@@ -0,0 +1,482 @@
+"""Documentos PDF de la app (ficha, mazo de fichas, Pokédex y equipo).
+
+Reciben solo datos planos (dicts, listas, strings) y devuelven los bytes del
+PDF, así se pueden generar en otro proceso (ver pdf_render.py). Se generan en
+modo invariant (sin fecha ni ID aleatorio): mismas entradas, mismos bytes.
+
+Perfiles: "standard" incrusta los sprites tal cual llegan; "compact" los
+reduce al tamaño al que se imprimen (PDF_COMPACT_DPI). Los dos comprimen las
+páginas, así que solo se diferencian en los sprites. Las fuentes son las
+estándar de PDF (no se incrustan).
+"""
+import io
+import math
+import textwrap
+import threading
+import weakref
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Literal, Tuple
+
+from PIL import Image
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm, inch
+from reportlab.lib.colors import black, lightgrey, grey
+from reportlab.lib.utils import ImageReader
+
+from app.config import settings
+from app.services.sprites import get_sprite_store, placeholder_image
+
+# Forma parte de la clave de la caché de PDFs: súbelo al cambiar cómo se dibujan
+LAYOUT_VERSION = 2
+
+# Plantillas (form XObjects) con la parte fija de la ficha y de la mini-ficha
+CARD_FORM = "pokemonCard"
+MINI_CARD_FORM = "pokemonMiniCard"
+
+# Tamaño al que se imprimen los sprites (puntos)
+CARD_SPRITE_SIZE = 4 * cm
+MINI_CARD_SPRITE_SIZE = 2.5 * cm
+
+PdfProfile = Literal["standard", "compact"]
+
+# Campos de PokedexEntry que usan los documentos
+ENTRY_FIELDS = (
+    "pokemon_id", "pokemon_name", "pokemon_sprite", "pokemon_types", "nickname",
+    "is_captured", "favorite", "hp", "attack", "defense", "speed"
+)
+
+
+# Un PDF con sprites que faltan no se guarda en la caché (ver pdf_render.py)
+_render_state = threading.local()
+
+
+def _mark_degraded() -> None:
+    _render_state.degraded = True
+
+
+def take_degraded() -> bool:
+    # Devuelve si el último PDF de este hilo salió incompleto y reinicia la marca
+    degraded = getattr(_render_state, "degraded", False)
+    _render_state.degraded = False
+    return degraded
+
+
+def _add_bytes_saved(saved: int) -> None:
+    _render_state.bytes_saved = getattr(_render_state, "bytes_saved", 0) + saved
+
+
+def take_bytes_saved() -> int:
+    # Bytes de imagen que se ahorró el último PDF compacto de este hilo (y reinicia la cuenta)
+    saved = getattr(_render_state, "bytes_saved", 0)
+    _render_state.bytes_saved = 0
+    return saved
+
+
+def _new_canvas(buffer) -> canvas.Canvas:
+    # Compresión explícita (no depende de rl_config) e igual en los dos perfiles
+    return canvas.Canvas(buffer, pagesize=A4, invariant=1, pageCompression=1)
+
+
+# Sprites ya reducidos, por imagen original y tamaño (se liberan con el ImageReader)
+_compact_sprites: "weakref.WeakKeyDictionary[ImageReader, Dict[int, Any]]" = weakref.WeakKeyDictionary()
+_compact_lock = threading.Lock()
+
+
+def _encoded_size(image: ImageReader) -> int:
+    # Aproximadamente lo que ocupa la imagen en el PDF (ReportLab guarda píxeles y alfa con Flate)
+    size = len(zlib.compress(image.getRGBData()))
+    alpha = getattr(image, "_dataA", None)
+    if alpha is not None:
+        size += len(zlib.compress(alpha.getRGBData()))
+    return size
+
+
+def _resample(image: ImageReader, pixels: int):
+    original = getattr(image, "_image", None)
+    if original is None or max(image.getSize()) <= pixels:
+        return image, 0
+    if original.mode not in ("RGB", "RGBA"):
+        original = original.convert("RGBA")
+    small = original.copy()
+    small.thumbnail((pixels, pixels), Image.LANCZOS)
+    resized = ImageReader(small)
+    return resized, max(0, _encoded_size(image) - _encoded_size(resized))
+
+
+def _sprite_for_profile(sprite, size: float, profile: PdfProfile):
+    """Perfil compacto: el sprite con los píxeles justos para imprimirlo a size puntos."""
+    if sprite is None or profile != "compact":
+        return sprite
+    pixels = max(1, math.ceil(size / inch * settings.PDF_COMPACT_DPI))
+    with _compact_lock:
+        cached = _compact_sprites.get(sprite, {}).get(pixels)
+    if cached is None:
+        cached = _resample(sprite, pixels)
+        with _compact_lock:
+            _compact_sprites.setdefault(sprite, {})[pixels] = cached
+    resized, saved = cached
+    _add_bytes_saved(saved)
+    return resized
+
+
+def entry_fields(entry) -> Dict[str, Any]:
+    # PokedexEntry (ORM) -> dict serializable
+    return {field: getattr(entry, field) for field in ENTRY_FIELDS}
+
+
+def render_pokemon_card(pokemon: Dict[str, Any], species: Dict[str, Any],
+                        profile: PdfProfile = "standard") -> bytes:
+    buffer = io.BytesIO()
+    c = _new_canvas(buffer)
+
+    # Caché de sprites compartida (sin red ni decodificar si ya se usó)
+    sprite = get_sprite_store().get_image(pokemon.get("sprite"))
+    if pokemon.get("sprite") and sprite is None:
+        _mark_degraded()
+    _draw_pokemon_card(c, pokemon, species, _sprite_for_profile(sprite, CARD_SPRITE_SIZE, profile))
+
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def render_card_deck(cards: List[Dict[str, Any]], profile: PdfProfile = "standard") -> bytes:
+    """Varias fichas en un solo PDF (una por página) con un único canvas.
+
+    Los sprites se piden todos a la vez antes de dibujar y ReportLab incrusta
+    una sola vez cada imagen repetida.
+    """
+    buffer = io.BytesIO()
+    c = _new_canvas(buffer)
+
+    sprites = get_sprite_store().prefetch(
+        [card["pokemon"].get("sprite") for card in cards], deadline=settings.SPRITE_PREFETCH_DEADLINE
+    )
+    if any(sprite is placeholder_image() for sprite in sprites.values()):
+        _mark_degraded()
+    sprites = {url: _sprite_for_profile(sprite, CARD_SPRITE_SIZE, profile) for url, sprite in sprites.items()}
+
+    for card in cards:
+        _draw_pokemon_card(c, card["pokemon"], card["species"], sprites.get(card["pokemon"].get("sprite")))
+        c.showPage()
+
+    c.save()
+    return buffer.getvalue()
+
+
+class _CardLayout:
+    """Coordenadas de la ficha (siempre centrada en A4)."""
+    width, height = A4
+    card_width = 8.8 * cm
+    card_height = 14.0 * cm
+    x = (width - card_width) / 2
+    y = (height - card_height) / 2
+
+    inner_x = x + 0.7 * cm
+    right_x = x + card_width - 0.7 * cm
+    box_x = x + 0.5 * cm
+    box_width = card_width - 1 * cm
+
+    name_y = y + card_height - 1.0 * cm
+    sprite_box_height = 5.0 * cm
+    sprite_box_y = name_y - 1.0 * cm - sprite_box_height
+    stats_top = sprite_box_y - 0.5 * cm
+    stats_box_height = 2.0 * cm
+    stats_box_y = stats_top - stats_box_height
+    types_top = stats_box_y - 0.2 * cm
+    types_box_height = 1.2 * cm
+    types_box_y = types_top - types_box_height
+    desc_top = types_box_y - 0.2 * cm
+    desc_bottom = y + 0.5 * cm
+
+
+def _define_card_chrome(c) -> None:
+    # Fondo, bordes, cajas y títulos fijos: un form XObject por documento que cada ficha reutiliza
+    if c.hasForm(CARD_FORM):
+        return
+    L = _CardLayout
+    c.beginForm(CARD_FORM)
+
+    # Borde y Fondo
+    c.setFillColor(lightgrey)
+    c.roundRect(L.x, L.y, L.card_width, L.card_height, 0.5 * cm, fill=1)
+    c.setStrokeColor(black)
+    c.setLineWidth(2)
+    c.roundRect(L.x, L.y, L.card_width, L.card_height, 0.5 * cm, fill=0)
+
+    # Cajas de imagen, estadísticas, tipos y descripción
+    c.setStrokeColor(grey)
+    c.rect(L.box_x, L.sprite_box_y, L.box_width, L.sprite_box_height, fill=0)
+    c.rect(L.box_x, L.stats_box_y, L.box_width, L.stats_box_height, fill=0)
+    c.rect(L.box_x, L.types_box_y, L.box_width, L.types_box_height, fill=0)
+    c.rect(L.box_x, L.desc_bottom, L.box_width, L.desc_top - L.desc_bottom, fill=0)
+
+    c.setFillColor(black)
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(L.inner_x, L.stats_top - 0.5 * cm, "Estadísticas:")
+    c.setFont("Helvetica-Bold", 11)
+    c.drawString(L.inner_x, L.desc_top - 0.5 * cm, "Descripción:")
+
+    c.endForm()
+
+
+def _draw_pokemon_card(c, pokemon: Dict[str, Any], species: Dict[str, Any], sprite=None):
+    """Dibuja la ficha de un Pokémon centrada en la página actual."""
+    L = _CardLayout
+    _define_card_chrome(c)
+    c.doForm(CARD_FORM)
+
+    # Nombre y HP
+    c.setFont("Helvetica-Bold", 18)
+    c.setFillColor(black)
+    pokemon_name = pokemon.get('name', 'N/A').capitalize()
+    c.drawString(L.inner_x, L.name_y, pokemon_name)
+
+    hp = pokemon.get('stats', {}).get('hp', '??')
+    c.setFont("Helvetica-Bold", 16)
+    c.drawRightString(L.right_x, L.name_y, f"HP {hp}")
+
+    # Imagen
+    if pokemon.get("sprite"):
+        if sprite is not None:
+            img_x = L.box_x + (L.box_width - CARD_SPRITE_SIZE) / 2
+            img_y = L.sprite_box_y + (L.sprite_box_height - CARD_SPRITE_SIZE) / 2
+            c.drawImage(sprite, img_x, img_y, width=CARD_SPRITE_SIZE, height=CARD_SPRITE_SIZE,
+                        preserveAspectRatio=True, mask='auto')
+        else:
+            _mark_degraded()
+            c.setFont("Helvetica", 10)
+            c.drawString(L.inner_x, L.sprite_box_y + L.sprite_box_height / 2, "No sprite")
+
+    # Estadísticas
+    c.setFont("Helvetica", 10)
+    stats_data = pokemon.get("stats", {})
+    stats_to_display = {'attack': 'Ataque', 'defense': 'Defensa', 'speed': 'Velocidad'}
+    stat_line = [f"{label}: {stats_data.get(key, 'N/A')}" for key, label in stats_to_display.items()]
+    c.drawString(L.inner_x, L.stats_top - 1.1 * cm, "   ".join(stat_line))
+
+    # Tipos y habilidades
+    ta_y = L.types_top - 0.5 * cm
+    types = pokemon.get("types", [])
+    c.drawString(L.inner_x, ta_y, f"Tipos: {', '.join(types).capitalize()}")
+
+    abilities = pokemon.get("abilities", [])
+    c.drawRightString(L.right_x, ta_y, f"Habilidades: {abilities[0].capitalize() if abilities else 'N/A'}")
+
+    # Descripción
+    description = species.get("description_es", "No se encontró descripción.")
+    c.setFont("Helvetica", 9)
+
+    text_y = L.desc_top - 0.5 * cm - 0.6 * cm
+
+    lines = textwrap.wrap(description, width=55)
+
+    for line in lines:
+        c.drawString(L.inner_x, text_y, line)
+        text_y -= 0.4 * cm
+        if text_y < (L.desc_bottom + 0.2 * cm):
+            break
+
+
+def pokedex_layout(username: str, entries: Iterable[Dict[str, Any]]) -> Iterator[Tuple]:
+    """Diseño de la Pokédex como operaciones de dibujo, para ReportLab y para pdf_stream.
+
+    Emite ("text", fuente, tamaño, x, y, texto), ("line", x1, y1, x2, y2) y
+    ("page",) al saltar de página; recorre entries sin guardarlas.
+    """
+    width, height = A4
+
+    # Coordenadas
+    x = 2 * cm
+    y = height - 3 * cm
+
+    # Título
+    yield ("text", "Helvetica-Bold", 18, x, y, f"Pokédex de {username}")
+    y -= 1.5 * cm
+
+    # Cabecera de la tabla
+    for offset, title in ((0, "ID"), (2, "Nombre"), (6, "Nickname"), (10, "Capturado"), (13, "Favorito")):
+        yield ("text", "Helvetica-Bold", 10, x + offset * cm, y, title)
+    y -= 0.6 * cm
+    yield ("line", x, y, width - x, y)
+    y -= 0.2 * cm
+
+    # Contenido de la tabla
+    for entry in entries:
+        y -= 0.6 * cm
+        if y < 3 * cm:  # Salto de página
+            yield ("page",)
+            y = height - 3 * cm
+
+        cells = (
+            str(entry["pokemon_id"]),
+            entry["pokemon_name"],
+            entry["nickname"] or "-",
+            "Sí" if entry["is_captured"] else "No",
+            "★" if entry["favorite"] else "-",
+        )
+        for offset, text in zip((0, 2, 6, 10, 13), cells):
+            yield ("text", "Helvetica", 9, x + offset * cm, y, text)
+
+
+def render_pokedex(username: str, entries: List[Dict[str, Any]], profile: PdfProfile = "standard") -> bytes:
+    # Sin sprites, los dos perfiles dan el mismo PDF (profile se acepta como en el resto)
+    buffer = io.BytesIO()
+    c = _new_canvas(buffer)
+
+    font = None  # Solo cambiamos de fuente cuando hace falta (showPage la resetea)
+    for op in pokedex_layout(username, entries):
+        if op[0] == "text":
+            _, name, size, x, y, text = op
+            if (name, size) != font:
+                c.setFont(name, size)
+                font = (name, size)
+            c.drawString(x, y, text)
+        elif op[0] == "line":
+            c.line(*op[1:])
+        else:
+            c.showPage()
+            font = None
+
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _draw_pokemon_mini_card(c, x, y, width, height, entry: Dict[str, Any], sprite=None):
+    """Dibuja una mini-ficha de un Pokémon en el lienzo del PDF."""
+
+    # Borde de la mini-ficha (form XObject compartido por todas)
+    form_name = f"{MINI_CARD_FORM}{width:.0f}x{height:.0f}"
+    if not c.hasForm(form_name):
+        # Con margen para que no se recorte la mitad exterior del trazo
+        c.beginForm(form_name, -1, -1, width + 1, height + 1)
+        c.setStrokeColor(grey)
+        c.setLineWidth(1)
+        c.rect(0, 0, width, height, fill=0)
+        c.endForm()
+    c.saveState()
+    c.translate(x, y)
+    c.doForm(form_name)
+    c.restoreState()
+
+    if sprite is not None:
+        c.drawImage(sprite, x + (0.3 * cm), y + height - (3 * cm), width=MINI_CARD_SPRITE_SIZE,
+                    height=MINI_CARD_SPRITE_SIZE,
+                    preserveAspectRatio=True, mask='auto')
+
+    # --- Contenido de la mini-ficha ---
+    text_x = x + 3.2 * cm
+    text_y = y + height - 0.7 * cm
+
+    c.setFont("Helvetica-Bold", 10)
+    c.drawString(text_x, text_y, f"{entry['pokemon_name'].capitalize()}")
+    text_y -= 0.5 * cm
+    c.setFont("Helvetica-Oblique", 9)
+    c.drawString(text_x, text_y, f"'{entry['nickname']}'" if entry["nickname"] else "(Sin apodo)")
+    text_y -= 0.6 * cm
+
+    c.setFont("Helvetica", 9)
+    c.drawString(text_x, text_y, f"Tipos: {entry['pokemon_types'] or 'N/A'}")
+    text_y -= 0.5 * cm
+
+    # Estadísticas
+    c.drawString(text_x, text_y, f"HP: {entry['hp'] or 'N/A'} | Atk: {entry['attack'] or 'N/A'}")
+    text_y -= 0.5 * cm
+    c.drawString(text_x, text_y, f"Def: {entry['defense'] or 'N/A'} | Vel: {entry['speed'] or 'N/A'}")
+
+    return sprite  # Devolvemos el sprite para la fila final
+
+
+def render_team(team: Dict[str, Any], username: str, entries: List[Dict[str, Any]],
+                profile: PdfProfile = "standard") -> bytes:
+    buffer = io.BytesIO()
+    c = _new_canvas(buffer)
+    width, height = A4
+    x_margin = 2 * cm
+    y_margin = 2 * cm
+    current_y = height - y_margin
+
+    # --- 1. Título y Descripción del Equipo ---
+    c.setFont("Helvetica-Bold", 20)
+    c.drawString(x_margin, current_y, f"Equipo: {team['name']}")
+    current_y -= 0.7 * cm
+    c.setFont("Helvetica-Oblique", 12)
+    c.drawString(x_margin, current_y, f"Entrenador: {username}")
+    current_y -= 0.7 * cm
+
+    if team.get("description"):
+        c.setFont("Helvetica", 10)
+        c.drawString(x_margin, current_y, f"Descripción: {team['description']}")
+        current_y -= 1.0 * cm
+
+    # --- 2. Fichas de los 6 Pokémon ---
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(x_margin, current_y, "Miembros del Equipo")
+    current_y -= 0.5 * cm
+
+    sprites_in_row = []  # Para la sección final
+
+    # Todos los sprites a la vez antes de dibujar (lo que no llegue, placeholder)
+    sprites = get_sprite_store().prefetch(
+        [entry["pokemon_sprite"] for entry in entries], deadline=settings.SPRITE_PREFETCH_DEADLINE
+    )
+    if any(sprite is placeholder_image() for sprite in sprites.values()):
+        _mark_degraded()
+    # El mismo sprite va en la mini-ficha y en la alineación (más pequeño): se reduce al mayor
+    sprites = {url: _sprite_for_profile(sprite, MINI_CARD_SPRITE_SIZE, profile) for url, sprite in sprites.items()}
+
+    card_height = 3.5 * cm
+    card_width = (width - 2 * x_margin - 1 * cm) / 2
+    x1 = x_margin
+    x2 = x_margin + card_width + 1 * cm
+
+    for i, entry in enumerate(entries):
+        if i < 3:  # Columna 1
+            card_x = x1
+            card_y = current_y - ((i + 1) * card_height)
+        else:  # Columna 2
+            card_x = x2
+            card_y = current_y - ((i - 3 + 1) * card_height)
+
+        # Dibujamos la mini-ficha con la función helper
+        sprite = _draw_pokemon_mini_card(c, card_x, card_y, card_width, card_height, entry,
+                                         sprites.get(entry["pokemon_sprite"]))
+        if sprite:
+            sprites_in_row.append(sprite)
+
+    current_y -= (3.5 * card_height)  # Mover Y debajo de las 3 filas de fichas
+
+    # --- 3. Estadísticas Conjuntas ---
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(x_margin, current_y, "Estadísticas Conjuntas")
+    current_y -= 1 * cm
+
+    total_hp = sum(e["hp"] for e in entries if e["hp"])
+    total_attack = sum(e["attack"] for e in entries if e["attack"])
+    total_defense = sum(e["defense"] for e in entries if e["defense"])
+    total_speed = sum(e["speed"] for e in entries if e["speed"])
+
+    c.setFont("Helvetica", 12)
+    c.drawString(x_margin, current_y, f"HP Total: {total_hp}")
+    c.drawString(x_margin + 5 * cm, current_y, f"Ataque Total: {total_attack}")
+    current_y -= 0.7 * cm
+    c.drawString(x_margin, current_y, f"Defensa Total: {total_defense}")
+    c.drawString(x_margin + 5 * cm, current_y, f"Velocidad Total: {total_speed}")
+    current_y -= 1 * cm
+
+    # --- 4. Fila de Sprites (Nuestra alternativa) ---
+    c.setFont("Helvetica", 10)
+    c.drawString(x_margin, current_y, "Alineación del Equipo:")
+    current_y -= 2.2 * cm
+
+    sprite_x = x_margin
+    for sprite in sprites_in_row:
+        c.drawImage(sprite, sprite_x, current_y, width=2 * cm, height=2 * cm, preserveAspectRatio=True, mask='auto')
+        sprite_x += 2.2 * cm
+
+    # --- Finalizar PDF ---
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
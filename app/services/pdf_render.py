@@ -0,0 +1,229 @@
+"""Generación de PDFs fuera del hilo de la petición.
+
+ReportLab es Python puro y mantiene el GIL mientras dibuja: en un pool de
+procesos las ráfagas de PDFs no frenan al resto de la API y usan todos los
+núcleos. Con PDF_RENDER_WORKERS=0 se genera en el mismo proceso (tests).
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.services import pdf_documents
+from app.services.metrics import registry
+from app.services.pdf_cache import PdfCache, RenderedPdf, etag_matches, pdf_cache_lookups
+from app.services.singleflight import SingleFlight, AsyncSingleFlight
+from app.services.sprites import get_sprite_store, use_offline_sprites
+
+logger = logging.getLogger(__name__)
+
+# Documentos que se pueden generar (nombre -> función con argumentos planos)
+RENDERERS: Dict[str, Callable[..., bytes]] = {
+    "card": pdf_documents.render_pokemon_card,
+    "deck": pdf_documents.render_card_deck,
+    "pokedex": pdf_documents.render_pokedex,
+    "team": pdf_documents.render_team,
+}
+
+render_seconds = registry.histogram(
+    "pdf_render_seconds", "Tiempo dibujando cada PDF (sin la espera en cola)", ("document",)
+)
+render_wait_seconds = registry.histogram(
+    "pdf_render_wait_seconds", "Tiempo en cola antes de empezar a dibujar el PDF (sin bajar sprites)", ("document",)
+)
+render_bytes = registry.counter("pdf_render_bytes_total", "Bytes de PDF generados", ("document", "profile"))
+render_bytes_saved = registry.counter(
+    "pdf_render_bytes_saved_total", "Bytes de imagen ahorrados por el perfil compacto (estimados)", ("document",)
+)
+render_rejected = registry.counter(
+    "pdf_render_rejected_total", "PDFs rechazados por tener la cola llena", ("document",)
+)
+
+
+def _sprite_urls(document: str, kwargs: Dict[str, Any]) -> List[Optional[str]]:
+    # Sprites que va a dibujar cada documento
+    if document == "card":
+        return [kwargs["pokemon"].get("sprite")]
+    if document == "deck":
+        return [card["pokemon"].get("sprite") for card in kwargs["cards"]]
+    if document == "team":
+        return [entry["pokemon_sprite"] for entry in kwargs["entries"]]
+    return []
+
+
+def _render(document: str, kwargs: Dict[str, Any],
+            sprites: Optional[Dict[str, Optional[bytes]]] = None) -> Tuple[bytes, float, bool, int]:
+    # Se ejecuta en el proceso del pool: bytes, cuánto tardó en dibujar, si salió incompleto
+    # y cuánto se ahorró el perfil compacto (las métricas se apuntan en el proceso web)
+    if sprites:
+        get_sprite_store().preload(sprites)
+    pdf_documents.take_degraded()
+    pdf_documents.take_bytes_saved()
+    started = time.perf_counter()
+    content = RENDERERS[document](**kwargs)
+    elapsed = time.perf_counter() - started
+    return content, elapsed, pdf_documents.take_degraded(), pdf_documents.take_bytes_saved()
+
+
+class PdfRenderer:
+    """Pool de procesos acotado para los PDFs (entradas serializables, salida en bytes)."""
+
+    def __init__(self, workers: int = 0, max_queue: int = 32, cache: Optional[PdfCache] = None):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.cache = cache if cache is not None else PdfCache(None)
+        self._inflight = SingleFlight()
+        self._ainflight = AsyncSingleFlight()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        registry.gauge_collector(
+            "pdf_render_queue_depth", "PDFs en cola o dibujándose", lambda: [({}, self._pending)]
+        )
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: no heredamos hilos ni conexiones abiertas del worker web
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=use_offline_sprites
+            )
+        return self._executor
+
+    def _acquire(self, document: str) -> None:
+        with self._lock:
+            if self._pending >= self.max_queue:
+                render_rejected.inc(document=document)
+                logger.warning(f"Cola de PDFs llena ({self._pending}), se rechaza {document}")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Demasiados PDFs en cola, inténtalo en unos segundos."
+                )
+            self._pending += 1
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _finish(self, document: str, kwargs: Dict[str, Any], submitted: float,
+                result: Tuple[bytes, float, bool, int]) -> Tuple[bytes, bool]:
+        content, elapsed, degraded, saved = result
+        render_seconds.observe(elapsed, document=document)
+        render_wait_seconds.observe(max(0.0, time.perf_counter() - submitted - elapsed), document=document)
+        render_bytes.inc(len(content), document=document, profile=kwargs.get("profile", "standard"))
+        if saved:
+            render_bytes_saved.inc(saved, document=document)
+        return content, degraded
+
+    def _submit(self, document: str, kwargs: Dict[str, Any],
+                sprites: Dict[str, Optional[bytes]]) -> Future:
+        return self.executor.submit(_render, document, kwargs, sprites)
+
+    @staticmethod
+    def _fetch_sprites(document: str, kwargs: Dict[str, Any]) -> Dict[str, Optional[bytes]]:
+        # Los sprites se consiguen aquí, con el planificador compartido y las métricas
+        # del proceso web; el pool solo recibe los bytes
+        urls = _sprite_urls(document, kwargs)
+        if not any(urls):
+            return {}
+        return get_sprite_store().fetch_many(urls, deadline=settings.SPRITE_PREFETCH_DEADLINE)
+
+    def _run(self, document: str, kwargs: Dict[str, Any]) -> Tuple[bytes, bool]:
+        self._acquire(document)
+        try:
+            if self.workers <= 0:
+                submitted = time.perf_counter()
+                result = _render(document, kwargs)
+            else:
+                sprites = self._fetch_sprites(document, kwargs)
+                # La espera en cola cuenta desde que los sprites ya están descargados
+                submitted = time.perf_counter()
+                result = self._submit(document, kwargs, sprites).result()
+        finally:
+            self._release()
+        return self._finish(document, kwargs, submitted, result)
+
+    async def _arun(self, document: str, kwargs: Dict[str, Any]) -> Tuple[bytes, bool]:
+        self._acquire(document)
+        try:
+            if self.workers <= 0:
+                submitted = time.perf_counter()
+                result = await run_in_threadpool(_render, document, kwargs)
+            else:
+                sprites = await run_in_threadpool(self._fetch_sprites, document, kwargs)
+                submitted = time.perf_counter()
+                result = await asyncio.wrap_future(self._submit(document, kwargs, sprites))
+        finally:
+            self._release()
+        return self._finish(document, kwargs, submitted, result)
+
+    def render(self, document: str, **kwargs: Any) -> bytes:
+        """Genera el PDF desde código síncrono (bloquea el hilo, no el GIL)."""
+        return self._run(document, kwargs)[0]
+
+    async def arender(self, document: str, **kwargs: Any) -> bytes:
+        """Genera el PDF desde un endpoint async sin bloquear el event loop."""
+        return (await self._arun(document, kwargs))[0]
+
+    def _cached(self, document: str, kwargs: Dict[str, Any],
+                if_none_match: Optional[str]) -> Tuple[str, Optional[RenderedPdf]]:
+        key = PdfCache.key(document, kwargs)
+        etag = PdfCache.etag(key)
+        if etag_matches(if_none_match, etag):
+            # El cliente ya lo tiene: ni lo generamos ni lo leemos
+            pdf_cache_lookups.inc(document=document, result="not_modified")
+            return key, RenderedPdf(etag, not_modified=True)
+        path = self.cache.get(key)
+        if path is not None:
+            pdf_cache_lookups.inc(document=document, result="hit")
+            return key, RenderedPdf(etag, path=path)
+        pdf_cache_lookups.inc(document=document, result="miss")
+        return key, None
+
+    def _store(self, key: str, result: Tuple[bytes, bool]) -> RenderedPdf:
+        content, degraded = result
+        if degraded:
+            # Con sprites de relleno: se sirve, pero ni se guarda ni lleva ETag
+            return RenderedPdf(None, content=content)
+        self.cache.put(key, content)
+        return RenderedPdf(PdfCache.etag(key), content=content)
+
+    def render_cached(self, document: str, if_none_match: Optional[str] = None, **kwargs: Any) -> RenderedPdf:
+        """Como render, pero reutiliza el PDF ya generado con las mismas entradas."""
+        key, rendered = self._cached(document, kwargs, if_none_match)
+        if rendered is not None:
+            return rendered
+        # Peticiones simultáneas del mismo PDF lo generan una sola vez
+        return self._inflight.do(key, lambda: self._store(key, self._run(document, kwargs)))
+
+    async def arender_cached(self, document: str, if_none_match: Optional[str] = None,
+                             **kwargs: Any) -> RenderedPdf:
+        key, rendered = self._cached(document, kwargs, if_none_match)
+        if rendered is not None:
+            return rendered
+
+        async def render() -> RenderedPdf:
+            return self._store(key, await self._arun(document, kwargs))
+
+        return await self._ainflight.do(key, render)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Instancia compartida por toda la app
+pdf_renderer = PdfRenderer(
+    settings.PDF_RENDER_WORKERS,
+    settings.PDF_RENDER_MAX_QUEUE,
+    cache=PdfCache(settings.PDF_CACHE_DIR or None, settings.PDF_CACHE_MAX_MB * 1024 * 1024)
+)
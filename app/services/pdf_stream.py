@@ -0,0 +1,145 @@
+"""PDF que se escribe y se envía a trozos, página a página.
+
+ReportLab guarda el documento entero hasta save(); para exportar Pokédex muy
+grandes con memoria constante escribimos el PDF directamente: cada página sale
+en cuanto se termina y solo se recuerdan los offsets de los objetos (enteros).
+Solo texto y líneas con las fuentes estándar (no hay nada que incrustar).
+"""
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+
+from app.services.pdf_documents import pokedex_layout
+
+# Fuentes estándar de PDF: no se incrustan. Symbol y ZapfDingbats son las de
+# sustitución de Helvetica en ReportLab (lo que no cabe en WinAnsi va a ellas)
+FONTS = {"F1": "Helvetica", "F2": "Helvetica-Bold", "F3": "Symbol", "F4": "ZapfDingbats"}
+_FONT_NAMES = {name: key for key, name in FONTS.items()}
+_SYMBOLIC = {"Symbol", "ZapfDingbats"}
+
+
+def _escape(text: bytes) -> bytes:
+    return text.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _number(value: float) -> str:
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+class PageContent:
+    """Operadores de una página (el equivalente mínimo a un canvas)."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def text(self, font: str, size: float, x: float, y: float, text: str) -> None:
+        # Mismo reparto en tramos por fuente que hace ReportLab en drawString
+        base = pdfmetrics.getFont(font)
+        parts = [f"BT {_number(x)} {_number(y)} Td ".encode()]
+        for run_font, encoded in pdfmetrics.unicode2T1(text, [base] + base.substitutionFonts):
+            parts.append(f"/{_FONT_NAMES[run_font.fontName]} {_number(size)} Tf (".encode() + _escape(encoded) + b") Tj ")
+        parts.append(b"ET\n")
+        self._parts.append(b"".join(parts))
+
+    def line(self, x1: float, y1: float, x2: float, y2: float) -> None:
+        self._parts.append(f"{_number(x1)} {_number(y1)} m {_number(x2)} {_number(y2)} l S\n".encode())
+
+    def getvalue(self) -> bytes:
+        return b"".join(self._parts)
+
+
+class StreamingPdfWriter:
+    """Escribe el PDF objeto a objeto; begin(), page() y finish() devuelven los bytes a enviar."""
+
+    CATALOG_ID = 1
+    PAGES_ID = 2
+
+    def __init__(self, pagesize=A4, compress: bool = True):
+        self.width, self.height = pagesize
+        self.compress = compress
+        self._offsets: Dict[int, int] = {}
+        self._position = 0
+        self._next_id = 3
+        self._font_ids: Dict[str, int] = {}
+        self._page_ids: List[int] = []
+
+    def _new_id(self) -> int:
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _emit(self, data: bytes) -> bytes:
+        self._position += len(data)
+        return data
+
+    def _object(self, obj_id: int, body: bytes) -> bytes:
+        self._offsets[obj_id] = self._position
+        return self._emit(f"{obj_id} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def begin(self) -> bytes:
+        chunks = [self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")]
+        for key, name in FONTS.items():
+            font_id = self._new_id()
+            self._font_ids[key] = font_id
+            encoding = "" if name in _SYMBOLIC else " /Encoding /WinAnsiEncoding"
+            chunks.append(self._object(
+                font_id, f"<< /Type /Font /Subtype /Type1 /BaseFont /{name}{encoding} >>".encode()
+            ))
+        return b"".join(chunks)
+
+    def page(self, content: PageContent) -> bytes:
+        stream = content.getvalue()
+        filters = ""
+        if self.compress:
+            stream = zlib.compress(stream)
+            filters = " /Filter /FlateDecode"
+        stream_id = self._new_id()
+        page_id = self._new_id()
+        self._page_ids.append(page_id)
+        fonts = " ".join(f"/{key} {font_id} 0 R" for key, font_id in self._font_ids.items())
+        return b"".join([
+            self._object(
+                stream_id,
+                f"<< /Length {len(stream)}{filters} >>\nstream\n".encode() + stream + b"\nendstream"
+            ),
+            self._object(page_id, (
+                f"<< /Type /Page /Parent {self.PAGES_ID} 0 R "
+                f"/MediaBox [0 0 {_number(self.width)} {_number(self.height)}] "
+                f"/Resources << /Font << {fonts} >> >> /Contents {stream_id} 0 R >>"
+            ).encode()),
+        ])
+
+    def finish(self) -> bytes:
+        kids = " ".join(f"{page_id} 0 R" for page_id in self._page_ids)
+        chunks = [
+            self._object(self.PAGES_ID, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>".encode()),
+            self._object(self.CATALOG_ID, f"<< /Type /Catalog /Pages {self.PAGES_ID} 0 R >>".encode()),
+        ]
+        xref_offset = self._position
+        size = self._next_id
+        xref = [f"xref\n0 {size}\n".encode(), b"0000000000 65535 f \n"]
+        xref += [f"{self._offsets[obj_id]:010d} 00000 n \n".encode() for obj_id in range(1, size)]
+        xref.append(f"trailer\n<< /Size {size} /Root {self.CATALOG_ID} 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+        chunks.append(self._emit(b"".join(xref)))
+        return b"".join(chunks)
+
+
+def stream_pokedex_pdf(username: str, entries: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """El diseño de pdf_documents.pokedex_layout (el de render_pokedex), enviado página a página."""
+    writer = StreamingPdfWriter(A4)
+    yield writer.begin()
+
+    page = PageContent()
+    for op in pokedex_layout(username, entries):
+        if op[0] == "text":
+            page.text(*op[1:])
+        elif op[0] == "line":
+            page.line(*op[1:])
+        else:  # Salto de página: la terminada sale ya
+            yield writer.page(page)
+            page = PageContent()
+
+    yield writer.page(page)
+    yield writer.finish()
@@ -1,9 +1,27 @@
+import asyncio
 import requests
+import httpx
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException, Timeout, HTTPError
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Tuple
 from fastapi import HTTPException, status
 import logging
-from functools import lru_cache
+import time
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+
+from app.config import settings
+from app.services.cache import CacheBackend, CacheEntry, MemoryCache, SQLiteCache, SharedCache
+from app.services.singleflight import SingleFlight, AsyncSingleFlight
+from app.services.aliases import RESOURCE_KINDS, AliasIndex, normalize_identifier, parse_resource_url
+from app.services.cache import cache_lookups
+from app.services.catalog import Catalog, iter_dump, sprite_file_for
+from app.services.circuit_breaker import CircuitBreaker, backoff_delay
+from app.services.json_select import FieldSpec, select_fields
+from app.services.metrics import registry
+from app.services.name_index import NameIndex, build_from_listing
+from app.services.scheduler import OutboundScheduler, Priority, SchedulerTimeout, request_priority
 
 # Logger
 logger = logging.getLogger(__name__)
@@ -78,13 +96,437 @@ def _parse_evolution_chain(chain_link: dict) -> List[str]:
 
     return evolutions
 
-class PokeAPIService:
-    BASE_URL = "https://pokeapi.co/api/v2"
 
-    def _make_request(self, url: str, params: Optional[Dict] = None) -> Dict[str, Any]:
-        # Lo convierto en una funcion porque se repite en todos
+def _transform_evolution_data(evolution_data: Dict[str, Any]) -> Dict[str, Any]:
+    if not evolution_data.get('chain'):
+        return {"chain": []}
+
+    try:
+        chain_list = _parse_evolution_chain(evolution_data['chain'])
+        return {"chain": chain_list}
+    except Exception as e:
+        logger.error(f"Error al parsear cadena de evolución: {e}", exc_info=True)
+        return {"chain": []}
+
+
+def _chain_id(chain_url: str) -> str:
+    # ".../evolution-chain/10/" -> "10"
+    parsed = parse_resource_url(chain_url)
+    if parsed is not None:
+        return str(parsed[1])
+    return chain_url.rstrip("/").rsplit("/", 1)[-1]
+
+
+# TTL de cada tipo de recurso en la caché
+def _resource_ttl(kind: str) -> int:
+    return {
+        "pokemon": settings.POKEAPI_TTL_POKEMON,
+        "species": settings.POKEAPI_TTL_SPECIES,
+        "type": settings.POKEAPI_TTL_TYPE,
+        "evolution": settings.POKEAPI_TTL_EVOLUTION,
+    }[kind]
+
+
+# Ruta de cada recurso en la PokeAPI
+_RESOURCE_PATHS = {
+    "pokemon": "pokemon",
+    "species": "pokemon-species",
+    "type": "type",
+    "evolution": "evolution-chain",
+}
+
+_TRANSFORMS: Dict[str, Callable[[Dict], Any]] = {
+    "pokemon": _transform_pokemon_data,
+    "species": _transform_species_data,
+    "type": _transform_type_data,
+    "evolution": _transform_evolution_data,
+}
+
+# Campos de cada respuesta que usan las transformaciones y el índice de alias;
+# el resto (moves, game_indices, damage_relations...) se descarta tras decodificar
+_FIELDS: Dict[str, FieldSpec] = {
+    "pokemon": {
+        "id": None, "name": None, "sprites": {"front_default": None},
+        "types": None, "stats": None, "abilities": None, "species": None
+    },
+    "species": {
+        "id": None, "name": None, "is_legendary": None, "is_mythical": None,
+        "flavor_text_entries": None, "evolution_chain": None, "varieties": None
+    },
+    "type": {"id": None, "name": None, "pokemon": None},
+    "evolution": {"id": None, "chain": None},
+}
+
+
+def _parse_body(kind: str, content: bytes) -> Dict[str, Any]:
+    return select_fields(content, _FIELDS[kind])
+
+
+# Errores de la PokeAPI que merecen reintento (y cuentan para el cortocircuito)
+_RETRYABLE_STATUS = {status.HTTP_408_REQUEST_TIMEOUT, status.HTTP_503_SERVICE_UNAVAILABLE}
+
+_shared_cache: Optional[CacheBackend] = None
+_alias_index: Optional[AliasIndex] = None
+_catalog: Optional[Catalog] = None
+_name_index: Optional[NameIndex] = None
+
+# Un único cortocircuito para la PokeAPI en todo el proceso
+circuit_breaker = CircuitBreaker(
+    failure_threshold=settings.POKEAPI_BREAKER_FAILURES,
+    reset_timeout=settings.POKEAPI_BREAKER_RESET_SECONDS
+)
+
+# Todas las peticiones salientes (PokeAPI y sprites) pasan por aquí
+outbound_scheduler = OutboundScheduler(
+    rate=settings.POKEAPI_RATE_LIMIT,
+    burst=settings.POKEAPI_RATE_BURST,
+    min_concurrency=settings.POKEAPI_MIN_CONCURRENCY,
+    max_concurrency=settings.POKEAPI_MAX_CONCURRENCY,
+    background_share=settings.POKEAPI_BACKGROUND_SHARE,
+    max_wait=settings.POKEAPI_QUEUE_TIMEOUT
+)
+
+# Métricas (GET /metrics)
+lookups_total = registry.counter(
+    "pokeapi_lookups_total",
+    "Recursos pedidos al servicio por tipo y de dónde salieron (catalog, cache, stale, upstream)",
+    ("resource", "source")
+)
+upstream_requests = registry.counter(
+    "pokeapi_upstream_requests_total", "Peticiones HTTP a la PokeAPI por recurso y estado", ("resource", "status")
+)
+upstream_latency = registry.histogram(
+    "pokeapi_upstream_request_duration_seconds", "Latencia de las peticiones a la PokeAPI", ("resource",)
+)
+upstream_errors = registry.counter(
+    "pokeapi_upstream_errors_total",
+    "Errores hacia la PokeAPI por clase (timeout, network, not_found, throttled, client_error, server_error, "
+    "circuit_open, saturated)",
+    ("resource", "error")
+)
+upstream_bytes = registry.counter(
+    "pokeapi_upstream_response_bytes_total", "Bytes recibidos de la PokeAPI", ("resource",)
+)
+registry.gauge_collector(
+    "pokeapi_scheduler", "Estado del planificador de salida (limit, in_flight, queued, tokens)",
+    lambda: [({"stat": name}, value) for name, value in outbound_scheduler.stats().items()]
+)
+registry.gauge_collector(
+    "pokeapi_circuit_breaker_open", "1 si el cortocircuito de la PokeAPI está abierto",
+    lambda: [({}, 1 if circuit_breaker.state == CircuitBreaker.OPEN else 0)]
+)
+
+
+def _upstream_resource(url: str) -> str:
+    # ".../api/v2/pokemon-species/25" -> "species"
+    path = httpx.URL(url).path
+    marker = "/api/v2/"
+    segment = path.split(marker, 1)[1] if marker in path else path.lstrip("/")
+    segment = segment.split("/", 1)[0]
+    return RESOURCE_KINDS.get(segment, segment or "other")
+
+
+def _response_size(response) -> int:
+    # Bytes en el cable (comprimidos) si el servidor los indica
+    length = str(response.headers.get("Content-Length") or "")
+    if length.isdigit():
+        return int(length)
+    content = response.content
+    return len(content) if isinstance(content, (bytes, bytearray)) else 0
+
+
+def _record_upstream(url: str, elapsed: float, response) -> None:
+    resource = _upstream_resource(url)
+    status_code = response.status_code
+    upstream_requests.inc(resource=resource, status=str(status_code))
+    upstream_latency.observe(elapsed, resource=resource)
+    upstream_bytes.inc(_response_size(response), resource=resource)
+    if status_code == status.HTTP_404_NOT_FOUND:
+        upstream_errors.inc(resource=resource, error="not_found")
+    elif status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+        upstream_errors.inc(resource=resource, error="throttled")
+    elif status_code >= 500:
+        upstream_errors.inc(resource=resource, error="server_error")
+    elif status_code >= 400:
+        upstream_errors.inc(resource=resource, error="client_error")
+
+
+def _record_upstream_error(url: str, error: str) -> None:
+    upstream_errors.inc(resource=_upstream_resource(url), error=error)
+
+
+# Claves servidas caducadas en la petición actual (el middleware añade la cabecera)
+_stale_keys: ContextVar[Optional[set]] = ContextVar("pokeapi_stale_keys", default=None)
+_revalidation_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="pokeapi-revalidate")
+
+
+def track_stale_responses() -> set:
+    stale_keys: set = set()
+    _stale_keys.set(stale_keys)
+    return stale_keys
+
+
+def _mark_stale(key: str) -> None:
+    stale_keys = _stale_keys.get()
+    if stale_keys is not None:
+        stale_keys.add(key)
+
+
+def get_shared_cache() -> CacheBackend:
+    # Una sola caché por proceso (todas las instancias del servicio la comparten)
+    # respaldada por un SQLite que comparten todos los workers del host
+    global _shared_cache
+    if _shared_cache is None:
+        memory = MemoryCache(settings.POKEAPI_MEMORY_CACHE_SIZE, compact_payloads=True)
+        if settings.POKEAPI_CACHE_PATH:
+            _shared_cache = SharedCache(
+                memory,
+                SQLiteCache(settings.POKEAPI_CACHE_PATH),
+                sync_interval=settings.POKEAPI_CACHE_SYNC_INTERVAL
+            )
+        else:
+            _shared_cache = memory
+    return _shared_cache
+
+
+def _usable_name_index() -> Optional[NameIndex]:
+    # El listado de especies casi no cambia: se reconstruye con el TTL de especies
+    if _name_index is not None and not _name_index.is_stale(settings.POKEAPI_TTL_SPECIES):
+        return _name_index
+    return None
+
+
+def _install_name_index(index: NameIndex) -> NameIndex:
+    global _name_index
+    _name_index = index
+    logger.info(f"Índice de nombres construido con {len(index)} especies")
+    return index
+
+
+def get_alias_index() -> AliasIndex:
+    # Índice nombre -> ID compartido (se guarda junto a la caché)
+    global _alias_index
+    if _alias_index is None:
+        _alias_index = AliasIndex(settings.POKEAPI_CACHE_PATH or None)
+    return _alias_index
+
+
+def get_catalog() -> Catalog:
+    global _catalog
+    if _catalog is None:
+        _catalog = Catalog(settings.POKEAPI_CATALOG_PATH or None)
+    return _catalog
+
+class _BasePokeAPIService:
+    # Se puede apuntar al servidor falso local (python -m app.fake_pokeapi)
+    BASE_URL = settings.POKEAPI_BASE_URL.rstrip("/")
+
+    def __init__(self, cache: Optional[CacheBackend] = None, aliases: Optional[AliasIndex] = None,
+                 catalog: Optional[Catalog] = None):
+        self.cache = cache if cache is not None else get_shared_cache()
+        self.aliases = aliases if aliases is not None else get_alias_index()
+        self.catalog = catalog if catalog is not None else get_catalog()
+        self.breaker = circuit_breaker
+        self.scheduler = outbound_scheduler
+
+    def invalidate_cache(self, resource: Optional[str] = None, identifier: Optional[str | int] = None) -> None:
+        # Único punto de invalidación: borra en SQLite y avisa al resto de workers
+        prefix = None
+        if resource:
+            prefix = f"{resource}:"
+            if identifier is not None:
+                key, _ = self._resolve(resource, identifier)
+                prefix = key or f"{resource}:{normalize_identifier(identifier)}"
+        logger.info(f"Invalidando caché de la PokeAPI: {prefix or 'todo'}")
+        self.cache.invalidate(prefix)
+
+        # El documento v2 compuesto depende de pokemon, especie y cadena. Se guarda
+        # por ID: si el nombre no se ha podido resolver, se borran todos
+        if resource == "pokemon":
+            ident = prefix.split(":", 1)[1]
+            self.cache.invalidate(f"v2:{ident}" if ident.isdigit() else "v2:")
+        elif resource in ("species", "evolution"):
+            self.cache.invalidate("v2:")
+
+    def _resolve(self, kind: str, identifier: str | int) -> Tuple[Optional[str], str]:
+        # Devuelve (clave canónica "pokemon:25" si ya conocemos el ID, URL a consultar)
+        ident = normalize_identifier(identifier)
+        canonical_id = self.aliases.resolve(kind, ident)
+        if canonical_id is not None:
+            ident = str(canonical_id)
+        url = f"{self.BASE_URL}/{_RESOURCE_PATHS[kind]}/{ident}"
+        return (f"{kind}:{canonical_id}" if canonical_id is not None else None), url
+
+    def _from_catalog(self, key: Optional[str]) -> Optional[Any]:
+        # Catálogo offline: si está importado, no hace falta salir a la red
+        if key is None:
+            return None
+        kind, _, resource_id = key.partition(":")
+        if not self.catalog.available:
+            return None
+        payload = self.catalog.get(kind, int(resource_id))
+        cache_lookups.inc(tier="catalog", resource=kind, result="miss" if payload is None else "hit")
+        return payload
+
+    def _cached_entry(self, key: Optional[str]) -> Optional[CacheEntry]:
+        if key is None:
+            return None
+        return self.cache.get(key)
+
+    def _store(self, kind: str, key: str, raw_data: Dict[str, Any],
+               transform: Callable[[Dict], Any], headers) -> Any:
+        # Aprendemos los alias y guardamos siempre bajo el ID canónico
+        self.aliases.learn(kind, raw_data)
+        if raw_data.get("id") is not None:
+            key = f"{kind}:{raw_data['id']}"
+        payload = transform(raw_data)
+
+        entry = CacheEntry(
+            key,
+            payload,
+            expires_at=time.time() + _resource_ttl(kind),
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified")
+        )
+        self.cache.set(entry)
+        return payload
+
+    def _name_index_from_catalog(self) -> Optional[NameIndex]:
+        names = self.catalog.names("species")
+        return NameIndex(names) if names else None
+
+    def _name_index_fallback(self, error: HTTPException) -> NameIndex:
+        # Si la PokeAPI falla seguimos con el índice anterior aunque esté caducado
+        if _name_index is None:
+            raise error
+        logger.warning(f"No se pudo reconstruir el índice de nombres: {error.detail}")
+        return _name_index
+
+    def _search_response(self, index: NameIndex, query: Optional[str], limit: int, offset: int) -> Dict[str, Any]:
+        base = f"{self.BASE_URL}/pokemon/"
+
+        def item(position: int) -> Dict[str, Any]:
+            resource_id, name = index.entry(position)
+            return {"id": resource_id, "name": name, "url": f"{base}{resource_id}/"}
+
+        if not query:
+            # Mismo formato que el listado de la PokeAPI, sin salir a la red
+            count = len(index)
+            return {
+                "count": count,
+                "next": f"{base}?offset={offset + limit}&limit={limit}" if offset + limit < count else None,
+                "previous": f"{base}?offset={max(0, offset - limit)}&limit={limit}" if offset > 0 else None,
+                "results": [item(position) for position in index.by_id[offset:offset + limit]]
+            }
+
+        matches = index.search(query)
+        return {
+            "query": query,
+            "count": len(matches),
+            "results": [item(position) for position in matches[offset:offset + limit]],
+            "suggestions": [] if matches else index.suggest(query)
+        }
+
+    def _circuit_open(self, url: str) -> HTTPException:
+        _record_upstream_error(url, "circuit_open")
+        logger.warning(f"Cortocircuito abierto, no se consulta la PokeAPI: {url}")
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="La PokeAPI no está disponible ahora mismo, inténtalo más tarde."
+        )
+
+    @staticmethod
+    def _saturated(url: str) -> HTTPException:
+        # Cola local llena: no es culpa de la PokeAPI (ni reintento ni cortocircuito)
+        _record_upstream_error(url, "saturated")
+        logger.warning(f"Sin hueco en el planificador para {url}")
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Demasiadas peticiones pendientes hacia la PokeAPI, inténtalo más tarde."
+        )
+
+    def _retry_or_raise(self, error: HTTPException, attempt: int) -> float:
+        # Devuelve cuánto esperar antes de reintentar o relanza el error
+        if error.status_code not in _RETRYABLE_STATUS:
+            # 404 y similares: la PokeAPI responde bien
+            self.breaker.record_success()
+            raise error
+        if attempt >= settings.POKEAPI_RETRIES:
+            self.breaker.record_failure()
+            raise error
+        return backoff_delay(attempt + 1, settings.POKEAPI_RETRY_BACKOFF, settings.POKEAPI_RETRY_BACKOFF_MAX)
+
+    @staticmethod
+    def _serve_stale(key: str, entry: Optional[CacheEntry], error: HTTPException) -> Tuple[Any, bool]:
+        # Si la PokeAPI falla pero teníamos el dato (aunque caducado), lo servimos
+        if entry is None or error.status_code not in _RETRYABLE_STATUS:
+            raise error
+        logger.warning(f"Sirviendo {key} caducado ({entry.stale_for():.0f}s): {error.detail}")
+        return entry.payload, True
+
+    def _revalidated(self, kind: str, entry: CacheEntry) -> Any:
+        # 304: el recurso no ha cambiado, solo renovamos el TTL
+        entry.expires_at = time.time() + _resource_ttl(kind)
+        self.cache.set(entry)
+        return entry.payload
+
+
+class PokeAPIService(_BasePokeAPIService):
+
+    def __init__(self, session: Optional[requests.Session] = None, cache: Optional[CacheBackend] = None,
+                 aliases: Optional[AliasIndex] = None, catalog: Optional[Catalog] = None):
+        super().__init__(cache, aliases, catalog)
+        self._session = session
+        self._inflight = SingleFlight()
+
+    @property
+    def session(self) -> requests.Session:
+        # Una sola sesión por servicio: reutiliza conexiones TCP/TLS (keep-alive)
+        if self._session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=settings.POKEAPI_MAX_KEEPALIVE_CONNECTIONS,
+                pool_maxsize=settings.POKEAPI_MAX_CONNECTIONS_PER_HOST
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+        return self._session
+
+    def _send(self, url: str, params: Optional[Dict] = None,
+              headers: Optional[Dict] = None) -> requests.Response:
+        # Cortocircuito + reintentos con backoff y jitter
+        allowed, probe = self.breaker.acquire()
+        if not allowed:
+            raise self._circuit_open(url)
+
+        attempt = 0
+        try:
+            while True:
+                try:
+                    response = self._send_once(url, params=params, headers=headers)
+                    self.breaker.record_success()
+                    return response
+                except SchedulerTimeout:
+                    raise self._saturated(url)
+                except HTTPException as e:
+                    delay = self._retry_or_raise(e, attempt)
+                attempt += 1
+                logger.info(f"Reintentando PokeAPI ({attempt}/{settings.POKEAPI_RETRIES}) en {delay:.2f}s: {url}")
+                time.sleep(delay)
+        finally:
+            # Si esta petición era la prueba del half-open y no hubo veredicto, no puede quedarse bloqueada
+            if probe is not None:
+                self.breaker.release_probe(probe)
+
+    def _send_once(self, url: str, params: Optional[Dict] = None,
+                   headers: Optional[Dict] = None) -> requests.Response:
         try:
-            response = requests.get(url, params=params, timeout=10.0)
+            with self.scheduler.slot() as outcome:
+                started = time.perf_counter()
+                response = self.session.get(url, params=params, headers=headers, timeout=settings.POKEAPI_TIMEOUT)
+                outcome.record_response(response.status_code, response.headers)
+            _record_upstream(url, time.perf_counter() - started, response)
             if response.status_code == status.HTTP_404_NOT_FOUND:
                 logger.warning(f"Not found in PokeAPI: {url}")
                 raise HTTPException(
@@ -92,18 +534,19 @@ class PokeAPIService:
                     detail=f"Not found in PokeAPI: {url}"
                 )
             response.raise_for_status()
-
-            ''' Si todo va bien, devuelve el JSON '''
-            return response.json()
-        except HTTPException as e:
-            raise e
+            return response
+        except (HTTPException, SchedulerTimeout):
+            raise
         except Timeout:  # Error de timeout
+            _record_upstream_error(url, "timeout")
             logger.error(f"Timeout al consultar PokeAPI: {url}")
             raise HTTPException(
                 status_code=status.HTTP_408_REQUEST_TIMEOUT,
                 detail="La petición a la PokeAPI tardó demasiado."
             )
         except (RequestException, HTTPError) as e:  # Error de red o HTTP
+            if not isinstance(e, HTTPError):  # un 4xx/5xx ya lo contó _record_upstream
+                _record_upstream_error(url, "network")
             logger.error(f"Error de red/HTTP al consultar PokeAPI: {e}")
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -116,56 +559,454 @@ class PokeAPIService:
                 detail=f"Internal Server Error al procesar tu petición: {e}"
             )
 
-    @lru_cache(maxsize=128)
+    def _make_request(self, url: str, params: Optional[Dict] = None) -> Dict[str, Any]:
+        # Lo convierto en una funcion porque se repite en todos
+        try:
+            return self._send(url, params=params).json()
+        except HTTPException as e:
+            raise e
+        except Exception as e:
+            logger.error(f"Error inesperado en PokeAPIService: {e}", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Internal Server Error al procesar tu petición: {e}"
+            )
+
+    def _get_resource(self, kind: str, identifier: str | int, transform: Callable[[Dict], Any]) -> Any:
+        # Caché (memoria -> disco) por ID canónico y, si ha caducado, revalidación condicional
+        key, url = self._resolve(kind, identifier)
+        payload = self._from_catalog(key)
+        if payload is not None:
+            lookups_total.inc(resource=kind, source="catalog")
+            return payload
+
+        entry = self._cached_entry(key)
+        if entry is not None and entry.is_fresh:
+            lookups_total.inc(resource=kind, source="cache")
+            return entry.payload
+
+        fetch = lambda: self._fetch_resource(kind, key or url, url, transform, entry)
+        if entry is not None and entry.stale_for() <= settings.POKEAPI_STALE_WHILE_REVALIDATE:
+            # Recién caducado: respondemos ya y revalidamos en segundo plano
+            _revalidation_executor.submit(self._revalidate_quietly, key, fetch)
+            _mark_stale(key)
+            lookups_total.inc(resource=kind, source="stale")
+            return entry.payload
+
+        # Peticiones simultáneas al mismo recurso comparten una sola llamada
+        payload, stale = self._inflight.do(key or url, fetch)
+        if stale:
+            _mark_stale(key)
+        lookups_total.inc(resource=kind, source="stale" if stale else "upstream")
+        return payload
+
+    def _revalidate_quietly(self, key: str, fetch: Callable[[], Tuple[Any, bool]]) -> None:
+        try:
+            with request_priority(Priority.BACKGROUND):
+                self._inflight.do(key, fetch)
+        except Exception as e:
+            logger.warning(f"No se pudo revalidar {key} en segundo plano: {e}")
+
+    def _fetch_resource(self, kind: str, key: str, url: str, transform: Callable[[Dict], Any],
+                        entry: Optional[CacheEntry]) -> Tuple[Any, bool]:
+        # Devuelve (datos, si son caducados)
+        logger.info(f"Consumiendo PokeAPI: GET {url}")
+        try:
+            response = self._send(url, headers=entry.conditional_headers() if entry else None)
+        except HTTPException as e:
+            return self._serve_stale(key, entry, e)
+        if response.status_code == status.HTTP_304_NOT_MODIFIED and entry is not None:
+            return self._revalidated(kind, entry), False
+        return self._store(kind, key, _parse_body(kind, response.content), transform, response.headers), False
+
     def get_pokemon(self, identifier: str | int) -> Dict[str, Any]:
         # Buscar pokemon por nombre/ID
-        url = f"{self.BASE_URL}/pokemon/{str(identifier)}"
-        logger.info(f"Consumiendo PokeAPI: GET {url}")
+        return self._get_resource("pokemon", identifier, _transform_pokemon_data)
+
+
+    def import_catalog(self, path: str, sprites_dir: Optional[str] = None, batch_size: int = 500) -> Dict[str, int]:
+        # Importa un volcado local de la PokeAPI al catálogo offline
+        counts: Dict[str, int] = {}
+        rows = []
+        # Sin ETag en el volcado: usamos la fecha de importación para revalidar luego
+        imported_at = formatdate(usegmt=True)
+
+        for kind, raw_data in iter_dump(path):
+            if kind not in _TRANSFORMS or raw_data.get("id") is None:
+                continue
+            self.aliases.learn(kind, raw_data)
+            payload = _TRANSFORMS[kind](raw_data)
+            rows.append((kind, raw_data["id"], raw_data.get("name"), payload, None, imported_at))
+            counts[kind] = counts.get(kind, 0) + 1
+
+            if sprites_dir and kind == "pokemon":
+                sprite_file = sprite_file_for(payload.get("sprite"), sprites_dir)
+                if sprite_file:
+                    with open(sprite_file, "rb") as f:
+                        self.catalog.put_sprite(payload["sprite"], f.read())
+                    counts["sprites"] = counts.get("sprites", 0) + 1
+
+            if len(rows) >= batch_size:
+                self.catalog.put_many(rows)
+                rows = []
+
+        if rows:
+            self.catalog.put_many(rows)
+        logger.info(f"Catálogo importado desde {path}: {counts}")
+        return counts
+
+    def refresh_catalog(self, kind: Optional[str] = None, concurrency: int = 8) -> Dict[str, int]:
+        # Refresco incremental: petición condicional por recurso, solo descarga lo que cambió
+        def refresh_one(row) -> str:
+            with request_priority(Priority.BACKGROUND):
+                return refresh_entry(row)
+
+        def refresh_entry(row) -> str:
+            entry_kind, resource_id, etag, last_modified = row
+            url = f"{self.BASE_URL}/{_RESOURCE_PATHS[entry_kind]}/{resource_id}"
+            validators = CacheEntry(url, None, 0, etag, last_modified).conditional_headers()
+            try:
+                response = self._send(url, headers=validators)
+            except HTTPException as e:
+                logger.warning(f"No se pudo refrescar {url}: {e.detail}")
+                return "failed"
+
+            if response.status_code == status.HTTP_304_NOT_MODIFIED:
+                self.catalog.touch(entry_kind, resource_id)
+                return "unchanged"
+
+            raw_data = _parse_body(entry_kind, response.content)
+            self.aliases.learn(entry_kind, raw_data)
+            self.catalog.put_many([(
+                entry_kind, resource_id, raw_data.get("name"), _TRANSFORMS[entry_kind](raw_data),
+                response.headers.get("ETag"),
+                response.headers.get("Last-Modified") or formatdate(usegmt=True)
+            )])
+            self.cache.invalidate(f"{entry_kind}:{resource_id}")
+            return "updated"
 
-        raw_data = self._make_request(url)
-        transformed_data = _transform_pokemon_data(raw_data)
-        return transformed_data
+        counts = {"unchanged": 0, "updated": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for result in executor.map(refresh_one, self.catalog.entries(kind)):
+                counts[result] += 1
+        logger.info(f"Catálogo refrescado: {counts}")
+        return counts
 
+    def search_pokemon(self, limit: int = 20, offset: int = 0, query: Optional[str] = None) -> Dict[str, Any]:
+        # Listar o buscar pokemon por nombre (índice local)
+        return self._search_response(self.get_name_index(), query, limit, offset)
 
-    @lru_cache(maxsize=32)
-    def search_pokemon(self, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
-        #Listar pokemon
-        url = f"{self.BASE_URL}/pokemon/"
-        params = {"limit": limit, "offset": offset}
-        logger.info(f"Consumiendo PokeAPI: GET {url} con params {params}")
-        return self._make_request(url, params=params)
+    def get_name_index(self) -> NameIndex:
+        index = _usable_name_index()
+        if index is None:
+            index = self._inflight.do("name-index", self._build_name_index)
+        return index
+
+    def _build_name_index(self) -> NameIndex:
+        index = self._name_index_from_catalog()
+        if index is None:
+            url = f"{self.BASE_URL}/pokemon-species/"
+            logger.info(f"Consumiendo PokeAPI: GET {url} para el índice de nombres")
+            try:
+                results = self._make_request(url, params={"limit": 100000, "offset": 0}).get("results", [])
+            except HTTPException as e:
+                return self._name_index_fallback(e)
+            self.aliases.learn_listing(results)
+            index = build_from_listing(results)
+        return _install_name_index(index)
 
-    @lru_cache(maxsize=32)
     def get_pokemon_by_type(self, type_name: str) -> List[Dict[str, Any]]:
         # Obtener pokemon por tipo
-        url = f"{self.BASE_URL}/type/{type_name.lower()}"
-        logger.info(f"Consumiendo PokeAPI (sync): GET {url}")
-        raw_data = self._make_request(url)
-        return _transform_type_data(raw_data)
+        return self._get_resource("type", type_name, _transform_type_data)
 
 
-    @lru_cache(maxsize=128)
     def get_pokemon_species(self, identifier: str | int) -> Dict[str, Any]:
         # Pokemon por especie
-        url = f"{self.BASE_URL}/pokemon-species/{str(identifier)}"
-        logger.info(f"Consumiendo PokeAPI: GET {url}")
-        raw_data = self._make_request(url)
-        return _transform_species_data(raw_data)
+        return self._get_resource("species", identifier, _transform_species_data)
 
-    @lru_cache(maxsize=64)
     def get_evolution_chain(self, chain_url: str) -> Dict[str, Any]:
         if not chain_url:
             return {"chain": []}
 
-        logger.info(f"Consumiendo PokeAPI: GET {chain_url}")
-        raw_data = self._make_request(chain_url)
+        return self._get_resource("evolution", _chain_id(chain_url), _transform_evolution_data)
 
-        if not raw_data.get('chain'):
-            return {"chain": []}
 
+class AsyncPokeAPIService(_BasePokeAPIService):
+    """Versión asíncrona del servicio: un cliente httpx con pool compartido."""
+
+    def __init__(self, transport: Optional[httpx.AsyncBaseTransport] = None,
+                 cache: Optional[CacheBackend] = None, aliases: Optional[AliasIndex] = None,
+                 catalog: Optional[Catalog] = None):
+        super().__init__(cache, aliases, catalog)
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._inflight = AsyncSingleFlight()
+        self._background: set = set()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # El cliente va ligado al event loop en el que se crea
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=settings.POKEAPI_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=settings.POKEAPI_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.POKEAPI_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=settings.POKEAPI_KEEPALIVE_EXPIRY
+                ),
+                transport=self._transport
+            )
+            self._client_loop = loop
+            self._host_limits = {}
+        return self._client
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        # Límite de conexiones simultáneas por host
+        host = httpx.URL(url).host
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(settings.POKEAPI_MAX_CONNECTIONS_PER_HOST)
+        return self._host_limits[host]
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
+
+    async def _send(self, url: str, params: Optional[Dict] = None,
+                    headers: Optional[Dict] = None) -> httpx.Response:
+        allowed, probe = self.breaker.acquire()
+        if not allowed:
+            raise self._circuit_open(url)
+
+        attempt = 0
+        try:
+            while True:
+                try:
+                    response = await self._send_once(url, params=params, headers=headers)
+                    self.breaker.record_success()
+                    return response
+                except SchedulerTimeout:
+                    raise self._saturated(url)
+                except HTTPException as e:
+                    delay = self._retry_or_raise(e, attempt)
+                attempt += 1
+                logger.info(f"Reintentando PokeAPI ({attempt}/{settings.POKEAPI_RETRIES}) en {delay:.2f}s: {url}")
+                await asyncio.sleep(delay)
+        finally:
+            # Si esta petición era la prueba del half-open y no hubo veredicto, no puede quedarse bloqueada
+            if probe is not None:
+                self.breaker.release_probe(probe)
+
+    async def _send_once(self, url: str, params: Optional[Dict] = None,
+                         headers: Optional[Dict] = None) -> httpx.Response:
+        client = self._get_client()
         try:
-            chain_list = _parse_evolution_chain(raw_data['chain'])
-            return {"chain": chain_list}
+            async with self.scheduler.aslot() as outcome, self._host_limit(url):
+                started = time.perf_counter()
+                response = await client.get(url, params=params, headers=headers)
+                outcome.record_response(response.status_code, response.headers)
+            _record_upstream(url, time.perf_counter() - started, response)
+            if response.status_code == status.HTTP_404_NOT_FOUND:
+                logger.warning(f"Not found in PokeAPI: {url}")
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Not found in PokeAPI: {url}"
+                )
+            # httpx trata el 304 como error; para nosotros es una revalidación correcta
+            if response.status_code != status.HTTP_304_NOT_MODIFIED:
+                response.raise_for_status()
+            return response
+        except (HTTPException, SchedulerTimeout):
+            raise
+        except httpx.TimeoutException:
+            _record_upstream_error(url, "timeout")
+            logger.error(f"Timeout al consultar PokeAPI: {url}")
+            raise HTTPException(
+                status_code=status.HTTP_408_REQUEST_TIMEOUT,
+                detail="La petición a la PokeAPI tardó demasiado."
+            )
+        except httpx.HTTPError as e:
+            if not isinstance(e, httpx.HTTPStatusError):  # un 4xx/5xx ya lo contó _record_upstream
+                _record_upstream_error(url, "network")
+            logger.error(f"Error de red/HTTP al consultar PokeAPI: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Error de red al conectar con la PokeAPI: {e}"
+            )
         except Exception as e:
-            logger.error(f"Error al parsear cadena de evolución: {e}", exc_info=True)
-            return {"chain": []}
\ No newline at end of file
+            logger.error(f"Error inesperado en AsyncPokeAPIService: {e}", exc_info=True)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Internal Server Error al procesar tu petición: {e}"
+            )
+
+    async def _make_request(self, url: str, params: Optional[Dict] = None) -> Dict[str, Any]:
+        response = await self._send(url, params=params)
+        return response.json()
+
+    async def _get_resource(self, kind: str, identifier: str | int, transform: Callable[[Dict], Any]) -> Any:
+        payload, _ = await self._lookup_resource(kind, identifier, transform)
+        return payload
+
+    async def _lookup_resource(self, kind: str, identifier: str | int,
+                               transform: Callable[[Dict], Any]) -> Tuple[Any, bool]:
+        # Devuelve (datos, si son caducados); no depende de estar dentro de una petición
+        key, url = self._resolve(kind, identifier)
+        payload = self._from_catalog(key)
+        if payload is not None:
+            lookups_total.inc(resource=kind, source="catalog")
+            return payload, False
+
+        entry = self._cached_entry(key)
+        if entry is not None and entry.is_fresh:
+            lookups_total.inc(resource=kind, source="cache")
+            return entry.payload, False
+
+        fetch = lambda: self._fetch_resource(kind, key or url, url, transform, entry)
+        if entry is not None and entry.stale_for() <= settings.POKEAPI_STALE_WHILE_REVALIDATE:
+            task = asyncio.ensure_future(self._revalidate_quietly(key, fetch))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            _mark_stale(key)
+            lookups_total.inc(resource=kind, source="stale")
+            return entry.payload, True
+
+        payload, stale = await self._inflight.do(key or url, fetch)
+        if stale:
+            _mark_stale(key)
+        lookups_total.inc(resource=kind, source="stale" if stale else "upstream")
+        return payload, stale
+
+    async def _revalidate_quietly(self, key: str, fetch: Callable[[], Awaitable[Tuple[Any, bool]]]) -> None:
+        try:
+            with request_priority(Priority.BACKGROUND):
+                await self._inflight.do(key, fetch)
+        except Exception as e:
+            logger.warning(f"No se pudo revalidar {key} en segundo plano: {e}")
+
+    async def _fetch_resource(self, kind: str, key: str, url: str, transform: Callable[[Dict], Any],
+                              entry: Optional[CacheEntry]) -> Tuple[Any, bool]:
+        logger.info(f"Consumiendo PokeAPI (async): GET {url}")
+        try:
+            response = await self._send(url, headers=entry.conditional_headers() if entry else None)
+        except HTTPException as e:
+            return self._serve_stale(key, entry, e)
+        if response.status_code == status.HTTP_304_NOT_MODIFIED and entry is not None:
+            return self._revalidated(kind, entry), False
+        return self._store(kind, key, _parse_body(kind, response.content), transform, response.headers), False
+
+    async def get_pokemon(self, identifier: str | int) -> Dict[str, Any]:
+        return await self._get_resource("pokemon", identifier, _transform_pokemon_data)
+
+    async def get_pokemon_batch(self, identifiers: List[str]) -> List[Dict[str, Any]]:
+        # Lo cacheado vuelve al momento y lo que falta se pide a la vez;
+        # un fallo en uno no tumba el resto
+        async def fetch_one(identifier: str) -> Dict[str, Any]:
+            try:
+                return {"identifier": identifier, "pokemon": await self.get_pokemon(identifier)}
+            except HTTPException as e:
+                return {"identifier": identifier, "error": {"status_code": e.status_code, "detail": e.detail}}
+            except Exception as e:
+                logger.error(f"Error inesperado en el lote para {identifier}: {e}")
+                return {"identifier": identifier, "error": {"status_code": 500, "detail": str(e)}}
+
+        return list(await asyncio.gather(*[fetch_one(identifier) for identifier in identifiers]))
+
+    async def preload_aliases(self) -> None:
+        # Rellena el índice con los listados completos (3 peticiones en total); lo usa el precalentado
+        listings = await asyncio.gather(*[
+            self._make_request(f"{self.BASE_URL}/{path}/", params={"limit": 100000, "offset": 0})
+            for path in ("pokemon", "pokemon-species", "type")
+        ])
+        for data in listings:
+            self.aliases.learn_listing(data.get("results", []))
+
+    async def search_pokemon(self, limit: int = 20, offset: int = 0, query: Optional[str] = None) -> Dict[str, Any]:
+        return self._search_response(await self.get_name_index(), query, limit, offset)
+
+    async def get_name_index(self) -> NameIndex:
+        index = _usable_name_index()
+        if index is None:
+            index = await self._inflight.do("name-index", self._build_name_index)
+        return index
+
+    async def _build_name_index(self) -> NameIndex:
+        index = self._name_index_from_catalog()
+        if index is None:
+            url = f"{self.BASE_URL}/pokemon-species/"
+            logger.info(f"Consumiendo PokeAPI (async): GET {url} para el índice de nombres")
+            try:
+                data = await self._make_request(url, params={"limit": 100000, "offset": 0})
+            except HTTPException as e:
+                return self._name_index_fallback(e)
+            results = data.get("results", [])
+            self.aliases.learn_listing(results)
+            index = build_from_listing(results)
+        return _install_name_index(index)
+
+    async def get_pokemon_by_type(self, type_name: str) -> List[Dict[str, Any]]:
+        return await self._get_resource("type", type_name, _transform_type_data)
+
+    async def get_pokemon_species(self, identifier: str | int) -> Dict[str, Any]:
+        return await self._get_resource("species", identifier, _transform_species_data)
+
+    async def get_evolution_chain(self, chain_url: str) -> Dict[str, Any]:
+        if not chain_url:
+            return {"chain": []}
+
+        return await self._get_resource("evolution", _chain_id(chain_url), _transform_evolution_data)
+
+    async def get_pokemon_with_evolution(self, identifier: str | int) -> Dict[str, Any]:
+        """Documento v2: pokemon + especie + cadena evolutiva, cacheado ya montado."""
+        pokemon_key, _ = self._resolve("pokemon", identifier)
+        composite_key = f"v2:{pokemon_key.split(':', 1)[1]}" if pokemon_key else None
+        entry = self._cached_entry(composite_key)
+        if entry is not None and entry.is_fresh:
+            return entry.payload
+
+        # Si ya sabemos la cadena de la especie, las tres peticiones salen a la vez
+        species_id = self.aliases.resolve("species", identifier)
+        chain_id = self.aliases.evolution_chain_of(species_id) if species_id is not None else None
+        if chain_id is not None:
+            (pokemon_data, pokemon_stale), (species_data, species_stale), (evolution_data, evolution_stale) = (
+                await asyncio.gather(
+                    self._lookup_resource("pokemon", identifier, _transform_pokemon_data),
+                    self._lookup_resource("species", identifier, _transform_species_data),
+                    self._lookup_resource("evolution", chain_id, _transform_evolution_data)
+                )
+            )
+        else:
+            (pokemon_data, pokemon_stale), (species_data, species_stale) = await asyncio.gather(
+                self._lookup_resource("pokemon", identifier, _transform_pokemon_data),
+                self._lookup_resource("species", identifier, _transform_species_data)
+            )
+            chain_url = species_data.get("evolution_chain_url")
+            evolution_data, evolution_stale = {"chain": []}, False
+            if chain_url:
+                evolution_data, evolution_stale = await self._lookup_resource(
+                    "evolution", _chain_id(chain_url), _transform_evolution_data
+                )
+
+        document = {
+            "pokemon": pokemon_data,
+            "species": species_data,
+            "evolution": evolution_data
+        }
+
+        # No guardamos documentos montados con datos caducados (tampoco en el precalentado)
+        stale = pokemon_stale or species_stale or evolution_stale
+        if pokemon_data.get("id") is not None and not stale:
+            self.cache.set(CacheEntry(
+                f"v2:{pokemon_data['id']}",
+                document,
+                expires_at=time.time() + min(_resource_ttl(kind) for kind in ("pokemon", "species", "evolution"))
+            ))
+        return document
+
+
+# Instancias compartidas por toda la app
+poke_service = PokeAPIService()
+async_poke_service = AsyncPokeAPIService()
@@ -0,0 +1,137 @@
+import re
+import sys
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+# Representación compacta de lo que guardamos en memoria (pokemon, especies y
+# listas de pokemon por tipo). Los endpoints siguen recibiendo dicts: la
+# conversión se hace al leer de la caché.
+
+STAT_NAMES = ("hp", "attack", "defense", "special-attack", "special-defense", "speed")
+_MISSING_STAT = 0xFFFF
+
+_POKEMON_KEYS = ("id", "name", "sprite", "types", "stats", "abilities")
+_SPECIES_KEYS = ("id", "name", "is_legendary", "is_mythical", "description_es", "evolution_chain_url")
+_POKEMON_URL = "https://pokeapi.co/api/v2/pokemon/{}/"
+# Casi todos los sprites siguen esta plantilla: en ese caso no guardamos la URL
+_SPRITE_URL = "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{}.png"
+_STANDARD_SPRITE = ""
+_POKEMON_URL_RE = re.compile(r"^https://pokeapi\.co/api/v2/pokemon/(\d+)/$")
+
+
+def _intern_all(names: List[Any]) -> Optional[Tuple[str, ...]]:
+    if not all(isinstance(name, str) for name in names):
+        return None
+    return tuple(sys.intern(name) for name in names)
+
+
+class PokemonRecord:
+    __slots__ = ("id", "name", "sprite", "types", "abilities", "stats")
+
+    def __init__(self, id: int, name: str, sprite: Optional[str],
+                 types: Tuple[str, ...], abilities: Tuple[str, ...], stats: array):
+        self.id = id
+        self.name = name
+        self.sprite = sprite
+        self.types = types
+        self.abilities = abilities
+        # Estadísticas base en el orden de STAT_NAMES (2 bytes cada una)
+        self.stats = stats
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> Optional["PokemonRecord"]:
+        # Solo si tiene exactamente la forma de _transform_pokemon_data
+        if tuple(payload) != _POKEMON_KEYS:
+            return None
+        stats = payload["stats"] or {}
+        if any(name not in STAT_NAMES or not isinstance(value, int) or not 0 <= value < _MISSING_STAT
+               for name, value in stats.items()):
+            return None
+        types = _intern_all(payload["types"] or [])
+        abilities = _intern_all(payload["abilities"] or [])
+        if types is None or abilities is None:
+            return None
+        return cls(
+            payload["id"],
+            sys.intern(payload["name"]) if isinstance(payload["name"], str) else payload["name"],
+            _STANDARD_SPRITE if payload["sprite"] == _SPRITE_URL.format(payload["id"]) else payload["sprite"],
+            types,
+            abilities,
+            array("H", (stats.get(name, _MISSING_STAT) for name in STAT_NAMES))
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "sprite": _SPRITE_URL.format(self.id) if self.sprite == _STANDARD_SPRITE else self.sprite,
+            "types": list(self.types),
+            "stats": {name: value for name, value in zip(STAT_NAMES, self.stats) if value != _MISSING_STAT},
+            "abilities": list(self.abilities)
+        }
+
+
+class SpeciesRecord:
+    __slots__ = _SPECIES_KEYS
+
+    def __init__(self, **fields):
+        for name in _SPECIES_KEYS:
+            setattr(self, name, fields[name])
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, Any]) -> Optional["SpeciesRecord"]:
+        if tuple(payload) != _SPECIES_KEYS:
+            return None
+        fields = dict(payload)
+        if isinstance(fields["name"], str):
+            fields["name"] = sys.intern(fields["name"])
+        return cls(**fields)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in _SPECIES_KEYS}
+
+
+class TypeMembers:
+    """Lista de pokemon de un tipo: nombres internados e IDs en un array."""
+
+    __slots__ = ("names", "ids")
+
+    def __init__(self, names: Tuple[str, ...], ids: array):
+        self.names = names
+        self.ids = ids
+
+    @classmethod
+    def from_payload(cls, payload: List[Dict[str, Any]]) -> Optional["TypeMembers"]:
+        names, ids = [], array("I")
+        for member in payload:
+            if not isinstance(member, dict) or len(member) != 2 or not isinstance(member.get("name"), str):
+                return None
+            match = _POKEMON_URL_RE.match(str(member.get("url") or ""))
+            if match is None:
+                return None
+            names.append(sys.intern(member["name"]))
+            ids.append(int(match.group(1)))
+        return cls(tuple(names), ids)
+
+    def to_dict(self) -> List[Dict[str, Any]]:
+        return [{"name": name, "url": _POKEMON_URL.format(pokemon_id)} for name, pokemon_id in zip(self.names, self.ids)]
+
+
+_RECORD_TYPES = {
+    "pokemon": (dict, PokemonRecord),
+    "species": (dict, SpeciesRecord),
+    "type": (list, TypeMembers),
+}
+
+
+def compact(kind: str, payload: Any) -> Any:
+    # Si el payload no tiene la forma esperada se guarda tal cual
+    expected, record_type = _RECORD_TYPES.get(kind, (None, None))
+    if record_type is None or not isinstance(payload, expected):
+        return payload
+    record = record_type.from_payload(payload)
+    return payload if record is None else record
+
+
+def expand(value: Any) -> Any:
+    return value.to_dict() if isinstance(value, (PokemonRecord, SpeciesRecord, TypeMembers)) else value
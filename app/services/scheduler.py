@@ -0,0 +1,266 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Optional, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    # Menor valor = sale antes
+    INTERACTIVE = 0   # Peticiones de usuarios
+    SPRITE = 1        # Imágenes para los PDF
+    BACKGROUND = 2    # Precalentado, refresco del catálogo, revalidaciones
+
+
+_current_priority: ContextVar[Priority] = ContextVar("outbound_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def request_priority(priority: Priority):
+    # Todo lo que se pida a la PokeAPI dentro del bloque usa esta prioridad
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> Priority:
+    return _current_priority.get()
+
+
+class SchedulerTimeout(Exception):
+    """No hubo hueco para salir a la PokeAPI en el tiempo máximo de espera."""
+
+
+class _Waiter:
+    __slots__ = ("priority", "granted", "event", "loop", "future")
+
+    def __init__(self, priority: Priority):
+        self.priority = priority
+        self.granted = False
+        self.event: Optional[threading.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.future: Optional[asyncio.Future] = None
+
+    def wake(self) -> None:
+        if self.event is not None:
+            self.event.set()
+        elif self.future is not None:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self) -> None:
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class OutboundScheduler:
+    """Planificador central de las peticiones salientes.
+
+    - Token bucket (rate/s con ráfagas de burst) para respetar el uso justo de la PokeAPI.
+    - Cola por prioridad: lo interactivo siempre pasa antes.
+    - Lo de segundo plano solo puede ocupar background_share del límite de
+      concurrencia, así siempre queda hueco para los usuarios.
+    - Límite de concurrencia adaptativo (AIMD): sube poco a poco mientras la
+      latencia se mantiene y baja de golpe si se dispara o nos limitan.
+
+    Sirve tanto a hilos (slot) como a corutinas de cualquier event loop (aslot).
+    """
+
+    def __init__(self, rate: float = 50.0, burst: int = 50, min_concurrency: int = 4,
+                 max_concurrency: int = 64, background_share: float = 0.5,
+                 latency_tolerance: float = 2.0, max_wait: float = 30.0):
+        self.rate = rate
+        self.burst = burst
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.background_share = background_share
+        self.latency_tolerance = latency_tolerance
+        self.max_wait = max_wait
+
+        self._lock = threading.Lock()
+        self._queue: List[Tuple[int, int, _Waiter]] = []
+        self._sequence = itertools.count()
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self.limit = float(max(min_concurrency, max_concurrency // 2))
+        self.in_flight = 0
+        self._baseline: Optional[float] = None
+        self._smoothed: Optional[float] = None
+        self._decreased_at = 0.0
+
+    # --- token bucket ---
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _next_token_in(self, now: float) -> float:
+        if now < self._paused_until:
+            return self._paused_until - now
+        return max(0.0, (1 - self._tokens) / self.rate) if self.rate > 0 else 0.0
+
+    # --- cola ---
+
+    def _capacity_for(self, priority: Priority) -> int:
+        limit = int(self.limit)
+        if priority == Priority.INTERACTIVE:
+            return limit
+        return max(1, int(limit * self.background_share))
+
+    def _dispatch(self) -> None:
+        # Con el lock cogido: concede huecos en orden de prioridad
+        now = time.monotonic()
+        self._refill(now)
+        while self._queue and now >= self._paused_until:
+            waiter = self._queue[0][2]
+            if self.in_flight >= self._capacity_for(waiter.priority) or (self.rate > 0 and self._tokens < 1):
+                break
+            heapq.heappop(self._queue)
+            if self.rate > 0:
+                self._tokens -= 1
+            self.in_flight += 1
+            waiter.granted = True
+            waiter.wake()
+
+    def _enqueue(self, waiter: _Waiter) -> float:
+        with self._lock:
+            heapq.heappush(self._queue, (waiter.priority, next(self._sequence), waiter))
+            self._dispatch()
+            return self._next_token_in(time.monotonic())
+
+    def _poll(self, waiter: _Waiter) -> float:
+        # Se llama al despertar por tiempo (puede que ya haya tokens)
+        with self._lock:
+            if not waiter.granted:
+                self._dispatch()
+            return self._next_token_in(time.monotonic())
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        with self._lock:
+            if waiter.granted:
+                self.in_flight -= 1
+            else:
+                self._queue = [item for item in self._queue if item[2] is not waiter]
+                heapq.heapify(self._queue)
+            self._dispatch()
+
+    def release(self, latency: float, throttled: bool = False, retry_after: Optional[float] = None) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._adapt(latency, throttled, retry_after)
+            self._dispatch()
+
+    def _adapt(self, latency: float, throttled: bool, retry_after: Optional[float]) -> None:
+        now = time.monotonic()
+        if throttled:
+            # La PokeAPI nos pide parar: vaciamos el bucket y esperamos
+            self._tokens = 0.0
+            self._paused_until = max(self._paused_until, now + (retry_after or 1.0))
+
+        if self._baseline is None:
+            self._baseline = self._smoothed = latency
+        # Media móvil de la latencia frente a una referencia que sigue rápido
+        # a las bajadas y muy despacio a las subidas
+        self._smoothed = self._smoothed * 0.8 + latency * 0.2
+        self._baseline = min(latency, self._baseline * 0.99 + latency * 0.01)
+
+        too_slow = self._smoothed > self._baseline * self.latency_tolerance
+        if throttled or too_slow:
+            # Como mucho una bajada por ventana de latencia
+            if now - self._decreased_at >= self._baseline:
+                self.limit = max(self.min_concurrency, self.limit * 0.75)
+                self._decreased_at = now
+                logger.info(
+                    f"Concurrencia hacia la PokeAPI reducida a {int(self.limit)} "
+                    f"(latencia media {self._smoothed:.3f}s)"
+                )
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+    # --- API ---
+
+    @contextmanager
+    def slot(self, priority: Optional[Priority] = None):
+        waiter = _Waiter(priority if priority is not None else current_priority())
+        waiter.event = threading.Event()
+        deadline = time.monotonic() + self.max_wait
+        wait = self._enqueue(waiter)
+        while not waiter.granted:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._abandon(waiter)
+                raise SchedulerTimeout("Sin hueco para consultar la PokeAPI")
+            waiter.event.wait(min(remaining, wait or remaining))
+            waiter.event.clear()
+            wait = self._poll(waiter)
+
+        started = time.monotonic()
+        outcome = _Outcome()
+        try:
+            yield outcome
+        finally:
+            self.release(time.monotonic() - started, outcome.throttled, outcome.retry_after)
+
+    @asynccontextmanager
+    async def aslot(self, priority: Optional[Priority] = None):
+        waiter = _Waiter(priority if priority is not None else current_priority())
+        waiter.loop = asyncio.get_running_loop()
+        waiter.future = waiter.loop.create_future()
+        deadline = time.monotonic() + self.max_wait
+        wait = self._enqueue(waiter)
+        try:
+            while not waiter.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise SchedulerTimeout("Sin hueco para consultar la PokeAPI")
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), min(remaining, wait or remaining))
+                except asyncio.TimeoutError:
+                    pass
+                wait = self._poll(waiter)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+
+        started = time.monotonic()
+        outcome = _Outcome()
+        try:
+            yield outcome
+        finally:
+            self.release(time.monotonic() - started, outcome.throttled, outcome.retry_after)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "queued": len(self._queue),
+                "tokens": round(self._tokens, 2)
+            }
+
+
+class _Outcome:
+    """Lo que el que hace la petición cuenta al planificador (429, Retry-After)."""
+
+    __slots__ = ("throttled", "retry_after")
+
+    def __init__(self):
+        self.throttled = False
+        self.retry_after: Optional[float] = None
+
+    def record_response(self, status_code: int, headers) -> None:
+        if status_code == 429:
+            self.throttled = True
+            try:
+                self.retry_after = float(headers.get("Retry-After"))
+            except (TypeError, ValueError):
+                self.retry_after = None
@@ -0,0 +1,350 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterable, Optional
+
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+from reportlab.lib.utils import ImageReader
+
+from app.config import settings
+from app.services.cache import cache_lookups
+from app.services.catalog import Catalog
+from app.services.metrics import registry
+from app.services.pokeapi_service import get_catalog, outbound_scheduler
+from app.services.scheduler import OutboundScheduler, Priority, SchedulerTimeout
+
+logger = logging.getLogger(__name__)
+
+sprite_downloads = registry.counter(
+    "pokeapi_sprite_downloads_total", "Descargas de sprites por resultado (ok, error)", ("result",)
+)
+sprite_placeholders = registry.counter(
+    "pokeapi_sprite_placeholders_total", "Sprites sustituidos en un PDF por el genérico (timeout, error)", ("reason",)
+)
+
+# Descargas de sprites en paralelo para los PDF con varios pokemon
+_prefetch_executor = ThreadPoolExecutor(
+    max_workers=settings.SPRITE_PREFETCH_WORKERS, thread_name_prefix="sprite-prefetch"
+)
+_placeholder: Optional[ImageReader] = None
+
+
+def placeholder_image() -> ImageReader:
+    # Cuadrado gris para los sprites que no llegan a tiempo
+    global _placeholder
+    if _placeholder is None:
+        _placeholder = ImageReader(Image.new("RGBA", (96, 96), (220, 220, 220, 255)))
+    return _placeholder
+
+
+class SpriteStore:
+    """Sprites de los PDF por URL, compartidos por todos los generadores.
+
+    - Memoria: LRU de imágenes ya decodificadas (ImageReader), se reutilizan entre PDFs.
+    - Disco: ficheros direccionados por su SHA-256 (URLs con la misma imagen comparten fichero),
+      con tope de tamaño: se borran los menos usados, como en PdfCache.
+    - Si no están en ninguno: catálogo offline y, por último, la red a través del planificador.
+      Una URL que falla no se vuelve a pedir hasta pasados negative_ttl segundos.
+
+    En los procesos del pool de PDFs va con offline=True: el proceso web resuelve
+    los sprites (con su planificador y sus métricas) y se los pasa con preload().
+    """
+
+    def __init__(self, directory: Optional[str], memory_size: int = 256, catalog: Optional[Catalog] = None,
+                 scheduler: Optional[OutboundScheduler] = None, session: Optional[requests.Session] = None,
+                 timeout: float = 5.0, offline: bool = False, max_disk_bytes: int = 128 * 1024 * 1024,
+                 negative_ttl: float = 60.0):
+        self.directory = directory
+        self.memory_size = memory_size
+        self.catalog = catalog
+        self.scheduler = scheduler
+        self.timeout = timeout
+        self.offline = offline
+        self.max_disk_bytes = max_disk_bytes
+        self.negative_ttl = negative_ttl
+        self._session = session
+        self._images: "OrderedDict[str, ImageReader]" = OrderedDict()
+        # URL -> hasta cuándo (monotonic) no se vuelve a intentar
+        self._failed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_maxsize=settings.POKEAPI_MAX_CONNECTIONS_PER_HOST))
+            session.mount("http://", HTTPAdapter(pool_maxsize=settings.POKEAPI_MAX_CONNECTIONS_PER_HOST))
+            self._session = session
+        return self._session
+
+    def get_image(self, url: Optional[str]) -> Optional[ImageReader]:
+        """Imagen lista para drawImage, o None si no se pudo conseguir."""
+        if not url:
+            return None
+        image = self._from_memory(url)
+        if image is not None:
+            return image
+        return self._load(url)
+
+    def _load(self, url: str) -> Optional[ImageReader]:
+        content = self.get_bytes(url)
+        if content is None:
+            return None
+        return self._decode(url, content)
+
+    def _decode(self, url: str, content: bytes) -> Optional[ImageReader]:
+        try:
+            image = ImageReader(io.BytesIO(content))
+            # Decodificamos ya (una sola vez): ReportLab guarda los píxeles en el propio ImageReader
+            image.getRGBData()
+        except Exception as e:
+            logger.warning(f"Sprite no válido {url}: {e}")
+            return None
+
+        with self._lock:
+            self._images[url] = image
+            self._images.move_to_end(url)
+            while len(self._images) > self.memory_size:
+                self._images.popitem(last=False)
+        return image
+
+    def prefetch(self, urls: Iterable[Optional[str]], deadline: float) -> Dict[str, ImageReader]:
+        """Consigue varios sprites a la vez esperando como mucho deadline segundos.
+
+        Los que no llegan (o fallan) se devuelven como placeholder; las descargas
+        que siguen en marcha terminan igualmente y quedan en caché para la próxima.
+        """
+        images: Dict[str, ImageReader] = {}
+        pending = {}
+        for url in dict.fromkeys(u for u in urls if u):
+            image = self._from_memory(url)
+            if image is not None:
+                images[url] = image
+            else:
+                pending[_prefetch_executor.submit(self._load, url)] = url
+
+        done, _ = wait(pending, timeout=deadline)
+        for future, url in pending.items():
+            image = future.result() if future in done else None
+            if image is None:
+                sprite_placeholders.inc(reason="error" if future in done else "timeout")
+                logger.warning(f"Sprite sustituido por el genérico: {url}")
+                image = placeholder_image()
+            images[url] = image
+        return images
+
+    def fetch_many(self, urls: Iterable[Optional[str]], deadline: float) -> Dict[str, Optional[bytes]]:
+        """Bytes de varios sprites a la vez para el pool de PDFs (None si no llegan a tiempo)."""
+        pending = {_prefetch_executor.submit(self.get_bytes, url): url for url in dict.fromkeys(u for u in urls if u)}
+        done, _ = wait(pending, timeout=deadline)
+        contents: Dict[str, Optional[bytes]] = {}
+        for future, url in pending.items():
+            contents[url] = future.result() if future in done else None
+            if contents[url] is None:
+                # Se dibujará el genérico: se cuenta aquí porque el pool no exporta métricas
+                sprite_placeholders.inc(reason="error" if future in done else "timeout")
+        return contents
+
+    def preload(self, contents: Dict[str, Optional[bytes]]) -> None:
+        # Sprites que ya trae resueltos el proceso web (los que no llegaron se quedan fuera)
+        for url, content in contents.items():
+            with self._lock:
+                known = url in self._images
+            if content is not None and not known:
+                self._decode(url, content)
+
+    def _from_memory(self, url: str) -> Optional[ImageReader]:
+        with self._lock:
+            image = self._images.get(url)
+            if image is not None:
+                self._images.move_to_end(url)
+        cache_lookups.inc(tier="memory", resource="sprite", result="miss" if image is None else "hit")
+        return image
+
+    def get_bytes(self, url: str) -> Optional[bytes]:
+        content = self._read_disk(url)
+        cache_lookups.inc(tier="disk", resource="sprite", result="miss" if content is None else "hit")
+        if content is not None:
+            return content
+
+        if self.catalog is not None and self.catalog.available:
+            content = self.catalog.get_sprite(url)
+            cache_lookups.inc(tier="catalog", resource="sprite", result="miss" if content is None else "hit")
+        if content is None:
+            content = self._download(url)
+        if content is not None:
+            self._write_disk(url, content)
+        return content
+
+    def clear(self) -> None:
+        # Solo la memoria; el disco se puede borrar a mano sin riesgo
+        with self._lock:
+            self._images.clear()
+            self._failed.clear()
+
+    def _url_path(self, url: str) -> str:
+        return os.path.join(self.directory, "urls", hashlib.sha1(url.encode()).hexdigest())
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "blobs", digest[:2], digest)
+
+    def _read_disk(self, url: str) -> Optional[bytes]:
+        if not self.directory:
+            return None
+        try:
+            with open(self._url_path(url), encoding="ascii") as f:
+                digest = f.read().strip()
+        except OSError:
+            return None
+        blob_path = self._blob_path(digest)
+        try:
+            with open(blob_path, "rb") as f:
+                content = f.read()
+        except OSError:
+            # El recorte borró la imagen: fuera también el enlace
+            try:
+                os.unlink(self._url_path(url))
+            except OSError:
+                pass
+            return None
+        try:
+            # La fecha de modificación hace de "último uso" para el recorte
+            os.utime(blob_path)
+        except OSError:
+            pass
+        return content
+
+    def _write_disk(self, url: str, content: bytes) -> None:
+        if not self.directory:
+            return
+        digest = hashlib.sha256(content).hexdigest()
+        try:
+            blob_path = self._blob_path(digest)
+            created = not os.path.exists(blob_path)
+            if created:
+                _atomic_write(blob_path, content)
+            _atomic_write(self._url_path(url), digest.encode("ascii"))
+        except OSError as e:
+            # Sin disco seguimos funcionando, solo perdemos la caché
+            logger.warning(f"No se pudo guardar el sprite {url} en disco: {e}")
+            return
+        if created:
+            self._trim_disk()
+
+    def _trim_disk(self) -> None:
+        # El tamaño se mide siempre en el directorio: lo comparten todos los workers
+        # y un contador por proceso no ve lo que escriben los demás
+        with self._disk_lock:
+            blobs = sorted(self._blobs())
+            disk_size = sum(size for _, size, _ in blobs)
+            if disk_size <= self.max_disk_bytes:
+                return
+            # Borramos los menos usados hasta quedar en el 90% del tope
+            for _, size, path in blobs:
+                if disk_size <= self.max_disk_bytes * 0.9:
+                    break
+                try:
+                    os.unlink(path)
+                    disk_size -= size
+                except OSError:
+                    pass
+
+    def _blobs(self):
+        for root, _, files in os.walk(os.path.join(self.directory, "blobs")):
+            for name in files:
+                if name.startswith(".tmp-"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def _recently_failed(self, url: str) -> bool:
+        with self._lock:
+            retry_at = self._failed.get(url)
+            if retry_at is None:
+                return False
+            if time.monotonic() < retry_at:
+                return True
+            del self._failed[url]
+            return False
+
+    def _remember_failure(self, url: str) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._failed) >= self.memory_size:
+                self._failed = {u: retry_at for u, retry_at in self._failed.items() if retry_at > now}
+            self._failed[url] = now + self.negative_ttl
+
+    def _download(self, url: str) -> Optional[bytes]:
+        if self.offline:
+            return None
+        if self._recently_failed(url):
+            # Falló hace poco: ni red ni hueco en el planificador
+            cache_lookups.inc(tier="negative", resource="sprite", result="hit")
+            return None
+        try:
+            if self.scheduler is not None:
+                with self.scheduler.slot(Priority.SPRITE):
+                    response = self.session.get(url, timeout=self.timeout)
+            else:
+                response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+        except (requests.exceptions.RequestException, SchedulerTimeout) as e:
+            sprite_downloads.inc(result="error")
+            logger.warning(f"No se pudo descargar el sprite {url}: {e}")
+            # Con el planificador saturado la URL no tiene la culpa: solo se recuerdan los fallos de red
+            if self.negative_ttl > 0 and not isinstance(e, SchedulerTimeout):
+                self._remember_failure(url)
+            return None
+        sprite_downloads.inc(result="ok")
+        return response.content
+
+
+def _atomic_write(path: str, content: bytes) -> None:
+    # Varios workers pueden escribir el mismo fichero: escribir aparte y renombrar
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+_sprite_store: Optional[SpriteStore] = None
+
+
+def use_offline_sprites() -> None:
+    # Para los procesos del pool de PDFs: nunca salen a la red por su cuenta
+    get_sprite_store().offline = True
+
+
+def get_sprite_store() -> SpriteStore:
+    # Una por proceso, compartida por las fichas, los equipos y la Pokédex
+    global _sprite_store
+    if _sprite_store is None:
+        _sprite_store = SpriteStore(
+            settings.SPRITE_CACHE_DIR or None,
+            memory_size=settings.SPRITE_MEMORY_CACHE_SIZE,
+            catalog=get_catalog(),
+            scheduler=outbound_scheduler,
+            timeout=settings.SPRITE_TIMEOUT,
+            max_disk_bytes=settings.SPRITE_CACHE_MAX_MB * 1024 * 1024,
+            negative_ttl=settings.SPRITE_NEGATIVE_TTL
+        )
+    return _sprite_store
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import List, Dict, Any, Optional
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.models import PokedexEntry
+from app.services.scheduler import Priority, request_priority
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    """Estado del precalentado de cachés (lo consulta /ready)."""
+
+    def __init__(self):
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.warmed = 0
+        self.failed = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        duration = None
+        if self.started_at is not None:
+            duration = round((self.finished_at or time.time()) - self.started_at, 3)
+        return {
+            "status": "ready" if self.ready else "warming_up",
+            "warmed": self.warmed,
+            "failed": self.failed,
+            "duration_seconds": duration
+        }
+
+
+warmup_state = WarmupState()
+
+
+def popular_pokemon_ids(session: Session, limit: int) -> List[int]:
+    # Los pokemon que más aparecen en las Pokédex de los usuarios
+    statement = (
+        select(PokedexEntry.pokemon_id)
+        .group_by(PokedexEntry.pokemon_id)
+        .order_by(func.count(PokedexEntry.id).desc(), PokedexEntry.pokemon_id)
+        .limit(limit)
+    )
+    return list(session.exec(statement).all())
+
+
+def load_warmup_file(path: str) -> List[str]:
+    # Lista JSON (["pikachu", 25, ...]) o un ID/nombre por línea
+    if not path or not os.path.isfile(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    if path.endswith(".json"):
+        return [str(item) for item in json.loads(content)]
+    return [line.strip() for line in content.splitlines() if line.strip() and not line.startswith("#")]
+
+
+async def warm_up(service, identifiers: List[str], concurrency: int = 8,
+                  state: WarmupState = warmup_state) -> WarmupState:
+    """Precarga los alias y luego pokemon, especies, cadenas evolutivas y tipos con concurrencia limitada."""
+    state.ready = False
+    state.started_at = time.time()
+    state.finished_at = None
+    state.warmed = state.failed = 0
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    seen_types: set = set()
+
+    async def fetch(coro) -> Optional[Any]:
+        async with semaphore:
+            try:
+                result = await coro
+                state.warmed += 1
+                return result
+            except Exception as e:
+                state.failed += 1
+                logger.warning(f"Fallo en el precalentado: {e}")
+                return None
+
+    async def warm_one(identifier: str) -> None:
+        pokemon, species = await asyncio.gather(
+            fetch(service.get_pokemon(identifier)),
+            fetch(service.get_pokemon_species(identifier))
+        )
+        pending = []
+        if species and species.get("evolution_chain_url"):
+            pending.append(fetch(service.get_evolution_chain(species["evolution_chain_url"])))
+        for type_name in (pokemon or {}).get("types", []):
+            if type_name and type_name not in seen_types:
+                seen_types.add(type_name)
+                pending.append(fetch(service.get_pokemon_by_type(type_name)))
+        await asyncio.gather(*pending)
+
+    # Sin duplicados y en el orden dado (los más pedidos primero)
+    unique = list(dict.fromkeys(str(i).strip().lower() for i in identifiers if str(i).strip()))
+    # Por detrás de las peticiones de los usuarios en el planificador
+    with request_priority(Priority.BACKGROUND):
+        # Antes que nada los alias: así "pikachu" y "25" van a la misma clave de caché
+        try:
+            await service.preload_aliases()
+        except Exception as e:
+            logger.warning(f"No se pudieron precargar los alias: {e}")
+        await asyncio.gather(*[warm_one(identifier) for identifier in unique])
+
+    state.finished_at = time.time()
+    state.ready = True
+    logger.info(
+        f"Precalentado terminado: {len(unique)} pokemon, {state.warmed} recursos, "
+        f"{state.failed} fallos en {state.finished_at - state.started_at:.2f}s"
+    )
+    return state
@@ -1,3 +1,26 @@
+import os
+import socket
+import tempfile
+
+# Caché de la PokeAPI aislada para los tests (antes de importar la app)
+_pokeapi_tmp = tempfile.mkdtemp()
+os.environ.setdefault("POKEAPI_CACHE_PATH", os.path.join(_pokeapi_tmp, "pokeapi_cache.db"))
+os.environ.setdefault("POKEAPI_CATALOG_PATH", os.path.join(_pokeapi_tmp, "pokeapi_catalog.db"))
+os.environ.setdefault("POKEAPI_RETRY_BACKOFF", "0")
+os.environ.setdefault("SPRITE_CACHE_DIR", os.path.join(_pokeapi_tmp, "sprites"))
+os.environ.setdefault("PDF_RENDER_WORKERS", "0")
+os.environ.setdefault("PDF_CACHE_DIR", os.path.join(_pokeapi_tmp, "pdfs"))
+os.environ.setdefault("EXPORT_JOB_DIR", os.path.join(_pokeapi_tmp, "exports"))
+os.environ.setdefault("EXPORT_JOB_WORKERS", "0")
+
+# Sin POKEAPI_BASE_URL los tests van contra la PokeAPI falsa local (app/fake_pokeapi)
+_fake_pokeapi_port = None
+if "POKEAPI_BASE_URL" not in os.environ:
+    with socket.socket() as _sock:
+        _sock.bind(("127.0.0.1", 0))
+        _fake_pokeapi_port = _sock.getsockname()[1]
+    os.environ["POKEAPI_BASE_URL"] = f"http://127.0.0.1:{_fake_pokeapi_port}/api/v2"
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlmodel import create_engine, SQLModel, Session
@@ -5,6 +28,25 @@ from sqlmodel.pool import StaticPool
 from app.dependencies import limiter
 from app.main import app
 from app.database import get_session
+from app.services.pokeapi_service import get_shared_cache, circuit_breaker
+from app.fake_pokeapi import FakePokeAPIServer
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_pokeapi():
+    if _fake_pokeapi_port is None:
+        yield None
+        return
+    server = FakePokeAPIServer(port=_fake_pokeapi_port).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(autouse=True)
+def clear_pokeapi_cache():
+    yield
+    get_shared_cache().invalidate()
+    circuit_breaker.reset()
 
 
 @pytest.fixture(name="session")
@@ -99,3 +141,8 @@ def rate_limited_client_fixture(session: Session):
     app.dependency_overrides.clear()
     # Y lo volvemos a deshabilitar para el resto de tests
     app.state.limiter.enabled = False
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
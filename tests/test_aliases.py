@@ -0,0 +1,65 @@
+import json
+import httpx
+import pytest
+from pytest_mock import MockerFixture
+from app.services.aliases import AliasIndex, parse_resource_url
+from app.services.cache import MemoryCache
+from app.services.pokeapi_service import PokeAPIService, AsyncPokeAPIService
+from tests.test_pokeapi_service import MOCK_POKEMON_RAW
+
+MOCK_POKEMON_WITH_REFS = {
+    **MOCK_POKEMON_RAW,
+    "species": {"name": "pikachu", "url": "https://pokeapi.co/api/v2/pokemon-species/25/"},
+    "types": [{"type": {"name": "electric", "url": "https://pokeapi.co/api/v2/type/13/"}}],
+}
+
+
+def test_parse_resource_url():
+    assert parse_resource_url("https://pokeapi.co/api/v2/pokemon-species/25/") == ("species", 25)
+    assert parse_resource_url("https://pokeapi.co/api/v2/evolution-chain/10/") == ("evolution", 10)
+    assert parse_resource_url("https://pokeapi.co/api/v2/move/1/") is None
+
+
+def test_alias_index_learns_references_and_persists(tmp_path):
+    path = str(tmp_path / "aliases.db")
+    index = AliasIndex(path)
+    index.learn("pokemon", MOCK_POKEMON_WITH_REFS)
+
+    assert index.resolve("pokemon", "Pikachu") == 25
+    assert index.resolve("pokemon", " 25 ") == 25
+    assert index.resolve("type", "electric") == 13
+    assert index.resolve("species", "pikachu") == 25
+
+    # Otro worker lo ve sin hacer ninguna petición
+    assert AliasIndex(path).resolve("type", "ELECTRIC") == 13
+
+
+def test_name_case_and_numeric_lookups_share_one_upstream_call(mocker: MockerFixture):
+    response = mocker.Mock(status_code=200, headers={})
+    response.content = json.dumps(MOCK_POKEMON_WITH_REFS).encode()
+    get = mocker.patch("app.services.pokeapi_service.requests.Session.get", return_value=response)
+
+    service = PokeAPIService(cache=MemoryCache(), aliases=AliasIndex())
+    for identifier in ("pikachu", "Pikachu", "25", 25):
+        assert service.get_pokemon(identifier)["id"] == 25
+
+    assert get.call_count == 1
+    assert service.cache.get("pokemon:25") is not None
+
+
+@pytest.mark.anyio
+async def test_async_service_uses_canonical_id_in_url():
+    urls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        urls.append(request.url.path)
+        return httpx.Response(200, json=MOCK_POKEMON_WITH_REFS)
+
+    aliases = AliasIndex()
+    aliases.add([("pokemon", "pikachu", 25)])
+    service = AsyncPokeAPIService(transport=httpx.MockTransport(handler), cache=MemoryCache(), aliases=aliases)
+    await service.get_pokemon("PIKACHU")
+    await service.get_pokemon(25)
+    await service.aclose()
+
+    assert urls == ["/api/v2/pokemon/25"]
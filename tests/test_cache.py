@@ -0,0 +1,106 @@
+import json
+import time
+from pytest_mock import MockerFixture
+from app.config import settings
+from app.services.cache import CacheEntry, MemoryCache, SQLiteCache, TieredCache, SharedCache
+from app.services.pokeapi_service import PokeAPIService, AsyncPokeAPIService
+from tests.test_pokeapi_service import MOCK_POKEMON_RAW
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(maxsize=2)
+    cache.set(CacheEntry("a", 1, expires_at=time.time() + 60))
+    cache.set(CacheEntry("b", 2, expires_at=time.time() + 60))
+    cache.get("a")
+    cache.set(CacheEntry("c", 3, expires_at=time.time() + 60))
+
+    assert cache.get("a").payload == 1
+    assert cache.get("b") is None
+    assert cache.get("c").payload == 3
+
+
+def test_sqlite_cache_persists_between_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    SQLiteCache(path).set(CacheEntry("pokemon:25", {"name": "pikachu"}, time.time() + 60, etag='"abc"'))
+
+    entry = SQLiteCache(path).get("pokemon:25")
+    assert entry.payload == {"name": "pikachu"}
+    assert entry.etag == '"abc"'
+    assert entry.is_fresh
+
+
+def test_tiered_cache_backfills_upper_tier(tmp_path):
+    memory = MemoryCache()
+    disk = SQLiteCache(str(tmp_path / "cache.db"))
+    disk.set(CacheEntry("type:fire", ["charmander"], time.time() + 60))
+
+    cache = TieredCache([memory, disk])
+    assert cache.get("type:fire").payload == ["charmander"]
+    assert memory.get("type:fire").payload == ["charmander"]
+
+
+def test_tiered_cache_prefers_fresh_lower_tier_over_expired_upper(tmp_path):
+    memory = MemoryCache()
+    disk = SQLiteCache(str(tmp_path / "cache.db"))
+    memory.set(CacheEntry("pokemon:25", {"name": "old"}, time.time() - 10))
+    disk.set(CacheEntry("pokemon:25", {"name": "new"}, time.time() + 60))
+
+    cache = TieredCache([memory, disk])
+    assert cache.get("pokemon:25").payload == {"name": "new"}
+    assert memory.get("pokemon:25").is_fresh
+
+    # Si ninguna capa la tiene fresca, devuelve la que caduca más tarde
+    memory.set(CacheEntry("type:fire", ["old"], time.time() - 100))
+    disk.set(CacheEntry("type:fire", ["newer"], time.time() - 10))
+    assert cache.get("type:fire").payload == ["newer"]
+
+
+def test_sqlite_cache_delete_and_invalidate_swallow_errors(tmp_path, mocker: MockerFixture):
+    import sqlite3
+
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+    mocker.patch.object(cache, "_connection", side_effect=sqlite3.OperationalError("database is locked"))
+
+    cache.delete("pokemon:25")
+    cache.invalidate("pokemon:")
+    cache.clear()
+
+
+def test_service_revalidates_expired_entry_with_etag(mocker: MockerFixture, tmp_path):
+    first = mocker.Mock(status_code=200, headers={"ETag": '"v1"'})
+    first.content = json.dumps(MOCK_POKEMON_RAW).encode()
+    not_modified = mocker.Mock(status_code=304, headers={})
+    get = mocker.patch(
+        "app.services.pokeapi_service.requests.Session.get",
+        side_effect=[first, not_modified]
+    )
+
+    cache = SQLiteCache(str(tmp_path / "cache.db"))
+    service = PokeAPIService(cache=cache)
+    assert service.get_pokemon("pikachu")["name"] == "pikachu"
+
+    # Forzamos que caduque (fuera de la ventana stale-while-revalidate)
+    entry = cache.get("pokemon:25")
+    entry.expires_at = time.time() - settings.POKEAPI_STALE_WHILE_REVALIDATE - 1
+    cache.set(entry)
+
+    assert service.get_pokemon("pikachu")["id"] == 25
+    assert get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+    assert cache.get("pokemon:25").is_fresh
+
+
+def test_shared_cache_invalidation_reaches_other_workers(tmp_path):
+    path = str(tmp_path / "shared.db")
+    worker_a = SharedCache(MemoryCache(), SQLiteCache(path), sync_interval=0)
+    worker_b = SharedCache(MemoryCache(), SQLiteCache(path), sync_interval=0)
+
+    worker_a.set(CacheEntry("pokemon:25", {"name": "pikachu"}, time.time() + 60))
+    assert worker_b.get("pokemon:25").payload == {"name": "pikachu"}
+    assert worker_b.memory.get("pokemon:25") is not None
+
+    worker_a.invalidate("pokemon:")
+    assert worker_b.get("pokemon:25") is None
+
+
+def test_service_instances_share_the_default_cache():
+    assert PokeAPIService().cache is AsyncPokeAPIService().cache
@@ -0,0 +1,83 @@
+import json
+import pytest
+from pytest_mock import MockerFixture
+from requests.exceptions import ConnectionError
+from app.services.aliases import AliasIndex
+from app.services.cache import MemoryCache
+from app.services.catalog import Catalog, iter_dump
+from app.services.pokeapi_service import PokeAPIService
+from tests.test_pokeapi_service import MOCK_POKEMON_RAW
+
+MOCK_SPECIES_RAW = {
+    "id": 25,
+    "name": "pikachu",
+    "is_legendary": False,
+    "is_mythical": False,
+    "flavor_text_entries": [{"flavor_text": "Ratón\neléctrico", "language": {"name": "es"}}],
+    "evolution_chain": {"url": "https://pokeapi.co/api/v2/evolution-chain/10/"},
+}
+
+
+@pytest.fixture
+def api_data_dir(tmp_path):
+    # Misma estructura que el repositorio PokeAPI/api-data
+    for resource, raw in (("pokemon", MOCK_POKEMON_RAW), ("pokemon-species", MOCK_SPECIES_RAW)):
+        folder = tmp_path / "data" / "api" / "v2" / resource / "25"
+        folder.mkdir(parents=True)
+        (folder / "index.json").write_text(json.dumps(raw), encoding="utf-8")
+
+    sprite = tmp_path / "sprites" / "sprite.png"
+    sprite.parent.mkdir()
+    sprite.write_bytes(b"\x89PNG fake")
+    return tmp_path
+
+
+@pytest.fixture
+def offline_service(tmp_path):
+    return PokeAPIService(cache=MemoryCache(), aliases=AliasIndex(), catalog=Catalog(str(tmp_path / "catalog.db")))
+
+
+def test_iter_dump_supports_jsonl(tmp_path):
+    dump = tmp_path / "dump.jsonl"
+    dump.write_text(json.dumps({"resource": "pokemon-species", "data": MOCK_SPECIES_RAW}) + "\n", encoding="utf-8")
+
+    assert list(iter_dump(str(dump))) == [("species", MOCK_SPECIES_RAW)]
+
+
+def test_import_catalog_serves_reads_without_network(api_data_dir, offline_service, mocker: MockerFixture):
+    counts = offline_service.import_catalog(str(api_data_dir / "data"))
+    assert counts == {"pokemon": 1, "species": 1}
+
+    get = mocker.patch("app.services.pokeapi_service.requests.Session.get", side_effect=ConnectionError)
+    assert offline_service.get_pokemon("Pikachu")["stats"]["hp"] == 35
+    assert offline_service.get_pokemon_species(25)["description_es"] == "Ratón eléctrico"
+    assert get.call_count == 0
+
+
+def test_import_catalog_stores_sprites(api_data_dir, offline_service):
+    raw = {**MOCK_POKEMON_RAW, "sprites": {"front_default": "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprite.png"}}
+    dump = api_data_dir / "dump.json"
+    dump.write_text(json.dumps({"pokemon": [raw]}), encoding="utf-8")
+
+    counts = offline_service.import_catalog(str(dump), sprites_dir=str(api_data_dir / "sprites"))
+    assert counts["sprites"] == 1
+    assert offline_service.catalog.get_sprite(raw["sprites"]["front_default"]) == b"\x89PNG fake"
+
+
+def test_refresh_catalog_only_downloads_changed_resources(api_data_dir, offline_service, mocker: MockerFixture):
+    offline_service.import_catalog(str(api_data_dir / "data"))
+
+    changed = mocker.Mock(status_code=200, headers={"ETag": '"v2"'})
+    changed.content = json.dumps({**MOCK_POKEMON_RAW, "name": "pikachu-nuevo"}).encode()
+
+    def conditional_get(url, headers=None, **kwargs):
+        assert "If-Modified-Since" in headers
+        if "pokemon-species" in url:
+            return mocker.Mock(status_code=304, headers={})
+        return changed
+
+    mocker.patch("app.services.pokeapi_service.requests.Session.get", side_effect=conditional_get)
+    counts = offline_service.refresh_catalog(concurrency=2)
+
+    assert counts == {"unchanged": 1, "updated": 1, "failed": 0}
+    assert offline_service.get_pokemon(25)["name"] == "pikachu-nuevo"
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import time
+import pytest
+from fastapi import HTTPException
+from pytest_mock import MockerFixture
+from requests.exceptions import Timeout
+from app.config import settings
+from app.services.cache import CacheEntry, MemoryCache
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.pokeapi_service import AsyncPokeAPIService, PokeAPIService, track_stale_responses
+from app.services.scheduler import SchedulerTimeout
+from tests.test_pokeapi_service import MOCK_POKEMON_RAW
+
+
+def _ok_response(mocker: MockerFixture):
+    response = mocker.Mock(status_code=200, headers={})
+    response.content = json.dumps(MOCK_POKEMON_RAW).encode()
+    return response
+
+
+def test_breaker_opens_and_half_opens_after_timeout(mocker: MockerFixture):
+    clock = mocker.patch("app.services.circuit_breaker.time.monotonic", return_value=100.0)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0)
+
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    # Pasado el tiempo de espera deja pasar una única prueba
+    clock.return_value = 131.0
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_open_breaker_fails_fast_without_calling_pokeapi(mocker: MockerFixture):
+    get = mocker.patch("app.services.pokeapi_service.requests.Session.get", side_effect=Timeout)
+    service = PokeAPIService(cache=MemoryCache())
+    service.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        service.get_pokemon("pikachu")
+    assert exc_info.value.status_code == 408
+    assert get.call_count == settings.POKEAPI_RETRIES + 1
+
+    with pytest.raises(HTTPException) as exc_info:
+        service.get_pokemon("pikachu")
+    assert exc_info.value.status_code == 503
+    assert get.call_count == settings.POKEAPI_RETRIES + 1
+
+
+def test_request_is_retried_after_timeout(mocker: MockerFixture):
+    get = mocker.patch(
+        "app.services.pokeapi_service.requests.Session.get",
+        side_effect=[Timeout, _ok_response(mocker)]
+    )
+    service = PokeAPIService(cache=MemoryCache())
+
+    assert service.get_pokemon("pikachu")["name"] == "pikachu"
+    assert get.call_count == 2
+
+
+def test_expired_entry_is_served_when_pokeapi_fails(mocker: MockerFixture):
+    mocker.patch("app.services.pokeapi_service.requests.Session.get", side_effect=Timeout)
+    cache = MemoryCache()
+    expired_at = time.time() - settings.POKEAPI_STALE_WHILE_REVALIDATE - 60
+    cache.set(CacheEntry("pokemon:25", {"id": 25, "name": "pikachu"}, expires_at=expired_at))
+    service = PokeAPIService(cache=cache)
+
+    stale_keys = track_stale_responses()
+    assert service.get_pokemon("25")["name"] == "pikachu"
+    assert stale_keys == {"pokemon:25"}
+
+
+@pytest.mark.anyio
+async def test_async_revalidations_answered_with_304_keep_breaker_closed(fake_pokeapi):
+    from app.services.pokeapi_service import circuit_breaker
+
+    service = AsyncPokeAPIService(cache=MemoryCache())
+    ids = (1, 4, 25, 143)
+    for pokemon_id in ids:
+        await service.get_pokemon(pokemon_id)
+        await service.get_pokemon_species(pokemon_id)
+
+    not_modified = fake_pokeapi.app.state.stats["not_modified"]
+    # Varias rondas dentro de la ventana stale-while-revalidate: la PokeAPI responde 304
+    for _ in range(3):
+        for key in [f"{kind}:{i}" for kind in ("pokemon", "species") for i in ids]:
+            entry = service.cache.get(key)
+            entry.expires_at = time.time() - 1
+            service.cache.set(entry)
+        for pokemon_id in ids:
+            await service.get_pokemon(pokemon_id)
+            await service.get_pokemon_species(pokemon_id)
+        await asyncio.gather(*list(service._background))
+
+    assert fake_pokeapi.app.state.stats["not_modified"] == not_modified + 3 * 2 * len(ids)
+    assert circuit_breaker.state == CircuitBreaker.CLOSED
+    # Una consulta nueva (sin caché) no se encuentra el cortocircuito abierto
+    assert (await service.get_pokemon_by_type("fire"))
+    await service.aclose()
+
+
+def _half_open_breaker(mocker: MockerFixture) -> CircuitBreaker:
+    clock = mocker.patch("app.services.circuit_breaker.time.monotonic", return_value=100.0)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    breaker.record_failure()
+    clock.return_value = 131.0
+    return breaker
+
+
+def test_saturated_probe_releases_half_open_slot(mocker: MockerFixture):
+    service = PokeAPIService(cache=MemoryCache())
+    service.breaker = _half_open_breaker(mocker)
+    mocker.patch.object(service.scheduler, "slot", side_effect=SchedulerTimeout)
+
+    with pytest.raises(HTTPException) as exc_info:
+        service.get_pokemon("pikachu")
+    assert exc_info.value.status_code == 503
+
+    # Sin veredicto: sigue en half-open y la siguiente petición puede hacer de prueba
+    assert service.breaker.state == CircuitBreaker.HALF_OPEN
+    assert service.breaker.allow_request()
+
+
+@pytest.mark.anyio
+async def test_cancelled_async_probe_releases_half_open_slot(mocker: MockerFixture):
+    service = AsyncPokeAPIService(cache=MemoryCache())
+    service.breaker = _half_open_breaker(mocker)
+    started = asyncio.Event()
+
+    async def hang(*args, **kwargs):
+        started.set()
+        await asyncio.sleep(3600)
+
+    mocker.patch.object(service, "_send_once", side_effect=hang)
+    # La petición compartida del single-flight cancelada (p. ej. al apagar)
+    task = asyncio.ensure_future(service._send("https://pokeapi.co/api/v2/pokemon/pikachu"))
+    await started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert service.breaker.state == CircuitBreaker.HALF_OPEN
+    assert service.breaker.allow_request()
+
+
+
+def test_only_the_probe_owner_releases_it(mocker: MockerFixture):
+    clock = mocker.patch("app.services.circuit_breaker.time.monotonic", return_value=100.0)
+    service = PokeAPIService(cache=MemoryCache())
+    service.breaker = breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0)
+    probes = []
+
+    def meanwhile(*args, **kwargs):
+        # Mientras esta petición (entró con el circuito cerrado) espera, el
+        # circuito se abre y otra petición sale como prueba del half-open
+        breaker.record_failure()
+        clock.return_value = 131.0
+        probes.append(breaker.acquire()[1])
+        raise SchedulerTimeout
+
+    mocker.patch.object(service, "_send_once", side_effect=meanwhile)
+    with pytest.raises(HTTPException):
+        service.get_pokemon("pikachu")
+
+    # La prueba de la otra petición sigue en vuelo
+    assert probes[0] is not None
+    assert not breaker.allow_request()
+    breaker.release_probe(probes[0])
+    assert breaker.allow_request()
@@ -0,0 +1,133 @@
+import os
+from datetime import datetime, timedelta
+from unittest.mock import Mock
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from app.models import ExportJob, ExportJobCreate, User
+from app.services.export_jobs import export_queue, job_params
+
+
+def _add_pokemon(client: TestClient, auth_headers: dict, pokemon_id: int = 1):
+    response = client.post(
+        "/api/v1/pokedex/",
+        json={"pokemon_id": pokemon_id, "is_captured": True},
+        headers=auth_headers
+    )
+    assert response.status_code == 200
+
+
+def test_export_job_pokedex_done_and_download(client: TestClient, auth_headers: dict):
+    _add_pokemon(client, auth_headers)
+
+    response = client.post("/api/v1/exports/", json={"kind": "pokedex"}, headers=auth_headers)
+    assert response.status_code == 202
+    job = response.json()
+    # Con EXPORT_JOB_WORKERS=0 se genera dentro de la petición
+    assert job["status"] == "done"
+    assert job["download_url"] == f"/api/v1/exports/{job['id']}/download"
+
+    status_response = client.get(f"/api/v1/exports/{job['id']}", headers=auth_headers)
+    assert status_response.json()["status"] == "done"
+
+    download = client.get(job["download_url"], headers=auth_headers)
+    assert download.status_code == 200
+    assert download.headers["content-type"] == "application/pdf"
+    assert download.content.startswith(b"%PDF")
+    assert len(download.content) == job["size"]
+
+
+def test_export_job_pending_is_deduplicated(client: TestClient, auth_headers: dict, mocker):
+    # Pool "ocupado": los trabajos se quedan pendientes
+    mocker.patch.object(export_queue, "workers", 1)
+    mocker.patch.object(export_queue, "_executor", Mock())
+    mocker.patch.object(export_queue, "_pending", 0)
+
+    first = client.post("/api/v1/exports/", json={"kind": "pokedex", "captured": True}, headers=auth_headers)
+    second = client.post("/api/v1/exports/", json={"kind": "pokedex", "captured": True}, headers=auth_headers)
+    other = client.post("/api/v1/exports/", json={"kind": "pokedex", "favorite": True}, headers=auth_headers)
+
+    assert first.json()["status"] == "pending"
+    assert second.json()["id"] == first.json()["id"]
+    assert other.json()["id"] != first.json()["id"]
+    assert export_queue.executor.submit.call_count == 2
+
+    download = client.get(f"/api/v1/exports/{first.json()['id']}/download", headers=auth_headers)
+    assert download.status_code == 409
+
+
+def test_export_job_expires(client: TestClient, auth_headers: dict, session: Session):
+    job = client.post("/api/v1/exports/", json={"kind": "pokedex"}, headers=auth_headers).json()
+    db_job = session.get(ExportJob, job["id"])
+    path = db_job.path
+    assert os.path.exists(path)
+
+    db_job.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    session.add(db_job)
+    session.commit()
+
+    assert client.get(f"/api/v1/exports/{job['id']}", headers=auth_headers).status_code == 404
+    # Se limpian al crear el siguiente trabajo (y al arrancar)
+    assert export_queue.purge_expired(session) == 1
+    assert session.get(ExportJob, job["id"]) is None
+    assert not os.path.exists(path)
+
+
+def test_export_job_team_requires_own_team(client: TestClient, auth_headers: dict):
+    response = client.post("/api/v1/exports/", json={"kind": "team"}, headers=auth_headers)
+    assert response.status_code == 400
+
+    response = client.post("/api/v1/exports/", json={"kind": "team", "team_id": 9999}, headers=auth_headers)
+    assert response.status_code == 404
+
+
+def _active_job(session: Session, owner_id: int, worker_id: str, heartbeat_age: float,
+                captured: bool = None) -> ExportJob:
+    # Trabajo en marcha de otro worker, con su último latido hace heartbeat_age segundos
+    params = job_params(ExportJobCreate(kind="pokedex", captured=captured))
+    job = ExportJob(owner_id=owner_id, kind="pokedex", params=params, status="running", worker_id=worker_id,
+                    heartbeat_at=datetime.utcnow() - timedelta(seconds=heartbeat_age))
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def _owner_id(session: Session, test_user: dict) -> int:
+    return session.exec(select(User).where(User.username == test_user["username"])).one().id
+
+
+def test_recover_only_fails_jobs_of_dead_workers(session: Session, test_user: dict):
+    owner_id = _owner_id(session, test_user)
+    alive = _active_job(session, owner_id, "otro-worker:1:vivo", heartbeat_age=1, captured=True)
+    dead = _active_job(session, owner_id, "otro-worker:2:caido", heartbeat_age=export_queue.stale_after + 5)
+
+    export_queue.recover(session)
+    session.refresh(alive)
+    session.refresh(dead)
+
+    assert alive.status == "running"
+    assert dead.status == "failed"
+    assert "interrumpida" in dead.error
+
+
+def test_export_job_dedup_is_enforced_by_the_database(client: TestClient, auth_headers: dict,
+                                                      session: Session, test_user: dict, mocker):
+    owner_id = _owner_id(session, test_user)
+    running = _active_job(session, owner_id, "otro-worker:1:vivo", heartbeat_age=1)
+
+    # Un segundo trabajo activo igual no se puede insertar
+    with pytest.raises(IntegrityError):
+        _active_job(session, owner_id, "otro-worker:3:vivo", heartbeat_age=1)
+    session.rollback()
+
+    # Carrera entre workers: la consulta previa no lo ve (aún no existía), la BD sí
+    mocker.patch.object(export_queue, "_find_active", side_effect=[None, running])
+    response = client.post("/api/v1/exports/", json={"kind": "pokedex"}, headers=auth_headers)
+
+    assert response.json()["id"] == running.id
+    assert response.json()["status"] == "running"
+    assert export_queue._pending == 0
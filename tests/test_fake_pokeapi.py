@@ -0,0 +1,85 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.fake_pokeapi import FakePokeAPIConfig, create_app, parse_latency
+from app.services.cache import MemoryCache
+from app.services.pokeapi_service import PokeAPIService, AsyncPokeAPIService
+
+
+def test_fake_pokeapi_serves_fixtures_with_etag_and_sprites():
+    client = TestClient(create_app(FakePokeAPIConfig()))
+
+    response = client.get("/api/v2/pokemon/pikachu")
+    assert response.status_code == 200
+    assert response.json()["id"] == 25
+    assert response.json()["sprites"]["front_default"].startswith("http://testserver/sprites-repo/")
+
+    etag = response.headers["ETag"]
+    assert client.get("/api/v2/pokemon/25/", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/api/v2/pokemon/?limit=1").json()["results"][0]["name"] == "bulbasaur"
+    assert client.get("/api/v2/pokemon/missingno").status_code == 404
+    assert client.get("/sprites-repo/sprites/pokemon/25.png").content.startswith(b"\x89PNG")
+
+
+def test_fake_pokeapi_simulates_errors_and_throttling():
+    app = create_app(FakePokeAPIConfig(error_rate=1.0, error_status=500))
+    client = TestClient(app)
+    assert client.get("/api/v2/type/fire").status_code == 500
+
+    app.state.config = FakePokeAPIConfig(rate_limit=0.001, burst=2)
+    statuses = [client.get("/api/v2/type/fire").status_code for _ in range(3)]
+    assert statuses == [200, 200, 429]
+    assert app.state.stats["throttled"] == 1
+
+
+def test_parse_latency():
+    assert parse_latency("none")() == 0
+    assert parse_latency("fixed:50")() == 0.05
+    assert 0.02 <= parse_latency("uniform:20:80")() <= 0.08
+
+
+def test_service_revalidates_against_fake_pokeapi(fake_pokeapi):
+    service = PokeAPIService(cache=MemoryCache())
+    assert service.get_pokemon("snorlax")["stats"]["hp"] == 160
+
+    entry = service.cache.get("pokemon:143")
+    entry.expires_at = 0
+    service.cache.set(entry)
+    before = fake_pokeapi.app.state.stats["not_modified"]
+    assert service.get_pokemon("143")["name"] == "snorlax"
+    assert fake_pokeapi.app.state.stats["not_modified"] == before + 1
+
+
+@pytest.mark.anyio
+async def test_async_service_revalidates_against_fake_pokeapi(fake_pokeapi):
+    service = AsyncPokeAPIService(cache=MemoryCache())
+    assert (await service.get_pokemon("snorlax"))["stats"]["hp"] == 160
+
+    entry = service.cache.get("pokemon:143")
+    entry.expires_at = 0
+    service.cache.set(entry)
+    stats = fake_pokeapi.app.state.stats
+    requests_before, not_modified_before = stats["requests"], stats["not_modified"]
+
+    assert (await service.get_pokemon("143"))["name"] == "snorlax"
+    # Un 304 es una sola llamada (sin reintentos) y renueva el TTL
+    assert stats["requests"] == requests_before + 1
+    assert stats["not_modified"] == not_modified_before + 1
+    assert service.cache.get("pokemon:143").is_fresh
+    await service.aclose()
+
+
+@pytest.mark.anyio
+async def test_warm_up_preloads_aliases_so_names_and_ids_share_requests(fake_pokeapi, mocker):
+    from app.services.aliases import AliasIndex
+    from app.services.warmup import WarmupState, warm_up
+
+    service = AsyncPokeAPIService(cache=MemoryCache(), aliases=AliasIndex())
+    send = mocker.spy(service, "_send")
+
+    await warm_up(service, ["pikachu", "25"], state=WarmupState())
+    await service.aclose()
+
+    urls = [call.args[0] for call in send.call_args_list]
+    # 3 listados para los alias y un solo GET de pikachu (por nombre o por ID es la misma clave)
+    assert {url.rsplit("/", 2)[1] for url in urls if url.endswith("/")} == {"pokemon", "pokemon-species", "type"}
+    assert len([url for url in urls if url.rstrip("/").endswith(("/pokemon/pikachu", "/pokemon/25"))]) == 1
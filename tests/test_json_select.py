@@ -0,0 +1,65 @@
+import json
+import pytest
+from app.services.json_select import select_fields
+
+DOCUMENT = {
+    "id": 25,
+    "name": "pikachu",
+    "moves": [{"move": {"name": "thunder-shock"}, "details": [1, 2.5, True, None]}],
+    "sprites": {"front_default": "http://x/25.png", "other": {"note": "llaves } y [corchetes] \" escapados"}},
+    "types": [{"type": {"name": "electric"}}],
+    "game_indices": [],
+}
+
+
+def test_select_fields_keeps_only_requested_fields():
+    body = json.dumps(DOCUMENT, indent=2).encode()
+
+    result = select_fields(body, {"id": None, "sprites": {"front_default": None}, "types": None})
+
+    assert result == {
+        "id": 25,
+        "sprites": {"front_default": "http://x/25.png"},
+        "types": [{"type": {"name": "electric"}}]
+    }
+
+
+def test_select_fields_handles_non_object_and_invalid_json():
+    assert select_fields(b"[1, 2]", {"id": None}) == [1, 2]
+    with pytest.raises(ValueError):
+        select_fields(b'{"id": 25, "moves": [1, 2', {"id": None})
+
+
+@pytest.mark.parametrize("body", [
+    b"",
+    b"{",
+    b'{"id": 25,}',
+    b'{"id": 25 "name": "pikachu"}',
+    b'{"name": "pika',
+    b'{"id": 25} basura',
+    b'\xff\xfe{"id": 25}',
+])
+def test_select_fields_rejects_malformed_input(body):
+    with pytest.raises(ValueError):
+        select_fields(body, {"id": None})
+
+
+def test_select_fields_handles_escaped_strings_and_unicode_escapes():
+    body = (
+        b'{"moves": [{"note": "\\"}]{[\\\\"}], '
+        b'"name": "Nidoran\\u2640 \\"Caf\\u00e9\\" \\ud83d\\ude00", '
+        b'"genus": "Pok\xc3\xa9mon Rat\xc3\xb3n", '
+        b'"sprites": {"front_default": "a\\/b\\\\c", "other": "\\n"}}'
+    )
+
+    result = select_fields(body, {"name": None, "genus": None, "sprites": {"front_default": None}})
+
+    assert result == {
+        "name": 'Nidoran♀ "Café" 😀',
+        "genus": "Pokémon Ratón",
+        "sprites": {"front_default": "a/b\\c"},
+    }
+
+
+def test_select_fields_keeps_field_when_subspec_meets_non_object():
+    assert select_fields(b'{"sprites": null, "id": 1}', {"sprites": {"front_default": None}}) == {"sprites": None}
@@ -0,0 +1,78 @@
+import httpx
+import pytest
+import requests
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+
+from app.services.cache import MemoryCache
+from app.services.metrics import MetricsRegistry, registry
+from app.services.pokeapi_service import AsyncPokeAPIService, PokeAPIService
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latencia", ("resource",), buckets=(0.1, 1.0))
+    latency.observe(0.05, resource="pokemon")
+    latency.observe(0.5, resource="pokemon")
+
+    text = registry.render()
+
+    assert 'latency_seconds_bucket{resource="pokemon",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{resource="pokemon",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{resource="pokemon"} 2' in text
+
+
+def test_metrics_endpoint_counts_upstream_calls_and_cache_hits(client: TestClient, auth_headers: dict):
+    client.get("/api/v1/pokemon/pikachu", headers=auth_headers)
+    client.get("/api/v1/pokemon/pikachu", headers=auth_headers)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'pokeapi_lookups_total{resource="pokemon",source="upstream"}' in text
+    assert 'pokeapi_lookups_total{resource="pokemon",source="cache"}' in text
+    assert 'pokeapi_upstream_requests_total{resource="pokemon",status="200"}' in text
+    assert 'pokeapi_upstream_request_duration_seconds_count{resource="pokemon"}' in text
+    assert 'pokeapi_scheduler{stat="in_flight"}' in text
+
+
+def _upstream_errors(resource: str) -> dict:
+    errors = registry.get("pokeapi_upstream_errors_total")
+    return {error: errors.value(resource=resource, error=error) for error in ("network", "server_error")}
+
+
+def test_server_error_counts_as_a_single_error_class(mocker: MockerFixture):
+    response = mocker.Mock(status_code=503, headers={}, content=b"")
+    response.raise_for_status.side_effect = requests.HTTPError("503 Server Error", response=response)
+    get = mocker.patch("app.services.pokeapi_service.requests.Session.get", return_value=response)
+    mocker.patch("app.services.pokeapi_service.backoff_delay", return_value=0)
+    before = _upstream_errors("pokemon")
+
+    with pytest.raises(HTTPException):
+        PokeAPIService(cache=MemoryCache()).get_pokemon("pikachu")
+
+    after = _upstream_errors("pokemon")
+    assert after["server_error"] - before["server_error"] == get.call_count
+    assert after["network"] == before["network"]
+
+
+@pytest.mark.anyio
+async def test_async_server_error_counts_as_a_single_error_class(mocker: MockerFixture):
+    async def server_error(url, **kwargs):
+        return httpx.Response(503, request=httpx.Request("GET", url))
+
+    get = mocker.patch("app.services.pokeapi_service.httpx.AsyncClient.get", side_effect=server_error)
+    mocker.patch("app.services.pokeapi_service.backoff_delay", return_value=0)
+    service = AsyncPokeAPIService(cache=MemoryCache())
+    before = _upstream_errors("pokemon")
+
+    with pytest.raises(HTTPException):
+        await service.get_pokemon("pikachu")
+    await service.aclose()
+
+    after = _upstream_errors("pokemon")
+    assert after["server_error"] - before["server_error"] == get.call_count
+    assert after["network"] == before["network"]
@@ -0,0 +1,36 @@
+from app.services.name_index import NameIndex, build_from_listing
+
+
+ENTRIES = [(1, "bulbasaur"), (4, "charmander"), (5, "charmeleon"), (6, "charizard"), (25, "pikachu"), (26, "raichu")]
+
+
+def test_prefix_search_is_sorted_by_name():
+    index = NameIndex(ENTRIES)
+
+    matches = [index.entry(position) for position in index.search("char")]
+
+    assert matches == [(6, "charizard"), (4, "charmander"), (5, "charmeleon")]
+
+
+def test_substring_matches_come_after_prefix_matches():
+    index = NameIndex(ENTRIES)
+
+    names = [index.entry(position)[1] for position in index.search("chu")]
+
+    assert names == ["pikachu", "raichu"]
+
+
+def test_suggestions_for_misspelled_names():
+    index = NameIndex(ENTRIES)
+
+    assert index.search("pikachuu") == []
+    assert index.suggest("pikachuu")[0] == "pikachu"
+
+
+def test_build_from_listing_orders_by_id():
+    index = build_from_listing([
+        {"name": "pikachu", "url": "https://pokeapi.co/api/v2/pokemon-species/25/"},
+        {"name": "bulbasaur", "url": "https://pokeapi.co/api/v2/pokemon-species/1/"},
+    ])
+
+    assert index.listing(limit=10, offset=0) == [(1, "bulbasaur"), (25, "pikachu")]
@@ -0,0 +1,158 @@
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from app.services.metrics import registry
+from app.services.pdf_cache import PdfCache, RenderedPdf
+from app.services.pdf_render import PdfRenderer
+
+POKEMON = {"id": 25, "name": "pikachu", "sprite": None, "types": ["electric"],
+           "stats": {"hp": 35, "attack": 55, "defense": 40, "speed": 90}, "abilities": ["static"]}
+SPECIES = {"description_es": "Ratón eléctrico."}
+
+
+def test_process_pool_renders_card_pdf():
+    renderer = PdfRenderer(workers=1)
+    try:
+        content = renderer.render("card", pokemon=POKEMON, species=SPECIES)
+    finally:
+        renderer.shutdown()
+
+    assert content.startswith(b"%PDF")
+    assert registry.get("pdf_render_seconds").count(document="card") >= 1
+
+
+def test_full_queue_is_rejected_with_503():
+    renderer = PdfRenderer(workers=0, max_queue=0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        renderer.render("card", pokemon=POKEMON, species=SPECIES)
+
+    assert exc_info.value.status_code == 503
+
+
+def test_pdf_cache_evicts_least_recently_used(tmp_path):
+    cache = PdfCache(str(tmp_path), max_bytes=250)
+    first = cache.put(PdfCache.key("card", {"id": 1}), b"x" * 100)
+    cache.put(PdfCache.key("card", {"id": 2}), b"x" * 100)
+    os.utime(first, (0, 0))
+
+    cache.put(PdfCache.key("card", {"id": 3}), b"x" * 100)
+
+    assert cache.get(PdfCache.key("card", {"id": 1})) is None
+    assert RenderedPdf(None, path=cache.get(PdfCache.key("card", {"id": 3}))).read() == b"x" * 100
+
+
+def test_cached_pdf_survives_eviction_before_it_is_sent(tmp_path):
+    renderer = PdfRenderer(workers=0, cache=PdfCache(str(tmp_path)))
+    first = renderer.render_cached("card", pokemon=POKEMON, species=SPECIES)
+    cached = renderer.render_cached("card", pokemon=POKEMON, species=SPECIES)
+
+    # El recorte lo borra entre la búsqueda en la caché y la respuesta
+    for path in tmp_path.rglob("*.pdf"):
+        if PdfCache.SERVING_DIR not in path.parts:
+            path.unlink()
+
+    assert cached.etag == first.etag
+    assert cached.read() == first.read()
+    # El enlace propio de la respuesta se borra tras usarlo
+    assert not os.path.exists(cached.path)
+    assert not os.listdir(tmp_path / PdfCache.SERVING_DIR)
+
+
+def test_team_reuses_card_frame_and_embeds_each_sprite_once(mocker):
+    from PIL import Image
+    from reportlab.lib.utils import ImageReader
+    from app.services import pdf_documents
+
+    sprite = ImageReader(Image.new("RGB", (96, 96), (200, 30, 30)))
+    store = mocker.Mock()
+    store.prefetch.return_value = {"https://sprites/25.png": sprite}
+    mocker.patch.object(pdf_documents, "get_sprite_store", return_value=store)
+    entry = {"pokemon_id": 25, "pokemon_name": "pikachu", "pokemon_sprite": "https://sprites/25.png",
+             "pokemon_types": "electric", "nickname": None, "is_captured": True, "favorite": False,
+             "hp": 35, "attack": 55, "defense": 40, "speed": 90}
+
+    content = pdf_documents.render_team({"name": "Rayos", "description": None}, "ash", [entry] * 6)
+
+    # 6 mini-fichas + 6 en la alineación: un solo marco y una sola imagen en el PDF
+    assert content.count(b"/Subtype /Form") == 1
+    assert content.count(b"/Subtype /Image") == 1
+
+
+def test_compact_profile_downsamples_sprites_and_reports_bytes_saved(mocker):
+    from PIL import Image
+    from reportlab.lib.utils import ImageReader
+    from app.services import pdf_documents
+
+    # Sprite grande con ruido (como el artwork oficial): no se comprime solo
+    sprite = ImageReader(Image.effect_noise((475, 475), 64).convert("RGB"))
+    store = mocker.Mock()
+    store.get_image.return_value = sprite
+    mocker.patch.object(pdf_documents, "get_sprite_store", return_value=store)
+    pokemon = {**POKEMON, "sprite": "https://sprites/25.png"}
+    saved_before = registry.get("pdf_render_bytes_saved_total").value(document="card")
+
+    renderer = PdfRenderer(workers=0)
+    standard = renderer.render("card", pokemon=pokemon, species=SPECIES)
+    compact = renderer.render("card", pokemon=pokemon, species=SPECIES, profile="compact")
+
+    assert compact.startswith(b"%PDF")
+    assert len(compact) < len(standard) / 2
+    saved = registry.get("pdf_render_bytes_saved_total").value(document="card") - saved_before
+    assert saved > 0
+
+
+def test_profiles_only_differ_in_sprites(monkeypatch):
+    from reportlab import rl_config
+    from app.services import pdf_documents
+
+    # Los dos perfiles comprimen las páginas, pase lo que pase con rl_config
+    monkeypatch.setattr(rl_config, "pageCompression", 0)
+    standard = pdf_documents.render_pokemon_card(POKEMON, SPECIES)
+    compact = pdf_documents.render_pokemon_card(POKEMON, SPECIES, profile="compact")
+
+    assert b"/FlateDecode" in standard
+    assert standard == compact
+
+
+def test_process_pool_gets_sprites_from_web_process(tmp_path, fake_pokeapi):
+    # Los sprites los baja el proceso web (planificador y métricas compartidos), no el pool
+    sprite_base = fake_pokeapi.base_url.replace("/api/v2", "/sprites-repo")
+    urls = [f"{sprite_base}/pool-{tmp_path.name}/{pokemon_id}.png" for pokemon_id in (1, 4)]
+    cards = [{"pokemon": {**POKEMON, "sprite": url}, "species": SPECIES} for url in urls]
+    downloads_before = registry.get("pokeapi_sprite_downloads_total").value(result="ok")
+    requests_before = fake_pokeapi.app.state.stats["requests"]
+
+    renderer = PdfRenderer(workers=1, cache=PdfCache(str(tmp_path)))
+    try:
+        rendered = renderer.render_cached("deck", cards=cards)
+    finally:
+        renderer.shutdown()
+
+    # Con los dos sprites: no es un PDF degradado y se guarda en caché
+    assert rendered.etag is not None
+    assert b"/Subtype /Image" in rendered.read()
+    assert registry.get("pokeapi_sprite_downloads_total").value(result="ok") == downloads_before + 2
+    assert fake_pokeapi.app.state.stats["requests"] == requests_before + 2
+
+
+def test_render_wait_excludes_sprite_fetch(mocker):
+    import time
+    from concurrent.futures import Future
+    from app.services import pdf_render
+
+    def slow_fetch(document, kwargs):
+        time.sleep(0.3)
+        return {}
+
+    done = Future()
+    done.set_result((b"%PDF-1.4", 0.01, False, 0))
+    renderer = PdfRenderer(workers=1)
+    mocker.patch.object(renderer, "_fetch_sprites", side_effect=slow_fetch)
+    mocker.patch.object(renderer, "_submit", return_value=done)
+    observe = mocker.spy(pdf_render.render_wait_seconds, "observe")
+
+    assert renderer.render("card", pokemon=POKEMON, species=SPECIES) == b"%PDF-1.4"
+    assert observe.call_args.args[0] < 0.1
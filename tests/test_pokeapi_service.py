@@ -1,7 +1,13 @@
+import asyncio
+import json
+import time
 import pytest
+import httpx
 from fastapi import HTTPException
 from pytest_mock import MockerFixture
-from app.services.pokeapi_service import PokeAPIService
+from app.services.pokeapi_service import PokeAPIService, AsyncPokeAPIService
+from app.services.aliases import AliasIndex
+from app.services.cache import CacheEntry, MemoryCache
 
 # Datos Falsos (Mock Data)
 
@@ -37,9 +43,10 @@ def test_pokeapi_service_get_pokemon_success_and_transform(mocker: MockerFixture
     # Preparamos el mock
     mock_response = mocker.Mock()
     mock_response.status_code = 200
-    mock_response.json.return_value = MOCK_POKEMON_RAW
+    mock_response.headers = {}
+    mock_response.content = json.dumps(MOCK_POKEMON_RAW).encode()
 
-    mocker.patch("app.services.pokeapi_service.requests.get", return_value=mock_response)
+    mocker.patch("app.services.pokeapi_service.requests.Session.get", return_value=mock_response)
 
 
     service = PokeAPIService()
@@ -58,9 +65,10 @@ def test_pokeapi_service_handles_404(mocker: MockerFixture):
 
     mock_response = mocker.Mock()
     mock_response.status_code = 404
+    mock_response.headers = {}
 
     # Aplicamos el mock
-    mocker.patch("app.services.pokeapi_service.requests.get", return_value=mock_response)
+    mocker.patch("app.services.pokeapi_service.requests.Session.get", return_value=mock_response)
 
     service = PokeAPIService()
 
@@ -74,11 +82,131 @@ def test_pokeapi_service_handles_404(mocker: MockerFixture):
 def test_pokeapi_service_handles_timeout(mocker: MockerFixture):
 
     from requests.exceptions import Timeout
-    mocker.patch("app.services.pokeapi_service.requests.get", side_effect=Timeout)
+    mocker.patch("app.services.pokeapi_service.requests.Session.get", side_effect=Timeout)
 
     service = PokeAPIService()
     with pytest.raises(HTTPException) as e:
         service.get_pokemon("pikachu")
 
     assert e.value.status_code == 408
-    assert "tardó demasiado" in e.value.detail
\ No newline at end of file
+    assert "tardó demasiado" in e.value.detail
+
+
+# Servicio asíncrono (transporte simulado de httpx)
+
+@pytest.mark.anyio
+async def test_async_service_get_pokemon_reuses_client_and_cache():
+
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        return httpx.Response(200, json=MOCK_POKEMON_RAW)
+
+    service = AsyncPokeAPIService(transport=httpx.MockTransport(handler))
+    first = await service.get_pokemon("pikachu")
+    second = await service.get_pokemon("pikachu")
+    await service.aclose()
+
+    assert first["name"] == "pikachu"
+    assert first["stats"]["speed"] == 90
+    assert second == first
+    assert len(calls) == 1
+
+
+@pytest.mark.anyio
+async def test_async_service_handles_404_and_timeout():
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if "missingno" in str(request.url):
+            return httpx.Response(404)
+        raise httpx.ReadTimeout("timeout", request=request)
+
+    service = AsyncPokeAPIService(transport=httpx.MockTransport(handler))
+
+    with pytest.raises(HTTPException) as e:
+        await service.get_pokemon("missingno")
+    assert e.value.status_code == 404
+
+    with pytest.raises(HTTPException) as e:
+        await service.get_pokemon("pikachu")
+    assert e.value.status_code == 408
+    await service.aclose()
+
+
+
+MOCK_SPECIES_RAW = {
+    "id": 25,
+    "name": "pikachu",
+    "flavor_text_entries": [],
+    "evolution_chain": {"url": "https://pokeapi.co/api/v2/evolution-chain/10/"}
+}
+
+MOCK_EVOLUTION_RAW = {
+    "id": 10,
+    "chain": {
+        "species": {"name": "pichu"},
+        "evolves_to": [{"species": {"name": "pikachu"}, "evolves_to": []}]
+    }
+}
+
+
+@pytest.mark.anyio
+async def test_async_v2_document_is_parallel_and_cached():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if "evolution-chain" in request.url.path:
+            return httpx.Response(200, json=MOCK_EVOLUTION_RAW)
+        if "pokemon-species" in request.url.path:
+            return httpx.Response(200, json=MOCK_SPECIES_RAW)
+        return httpx.Response(200, json=MOCK_POKEMON_RAW)
+
+    aliases = AliasIndex()
+    service = AsyncPokeAPIService(transport=httpx.MockTransport(handler), cache=MemoryCache(), aliases=aliases)
+    document = await service.get_pokemon_with_evolution("pikachu")
+    assert document["pokemon"]["id"] == 25
+    assert document["evolution"]["chain"]
+    assert len(calls) == 3
+
+    # Segunda vez: el documento compuesto sale de la caché
+    assert await service.get_pokemon_with_evolution("25") == document
+    assert len(calls) == 3
+
+    # Ya conocemos especie -> cadena, así que la cadena no espera a la especie
+    assert aliases.evolution_chain_of(25) == 10
+    service.invalidate_cache("species", 25)
+    assert service.cache.get("v2:25") is None
+    await service.aclose()
+
+
+@pytest.mark.anyio
+async def test_async_v2_document_with_stale_parts_is_not_cached_outside_requests():
+    def handler(request: httpx.Request) -> httpx.Response:
+        if "evolution-chain" in request.url.path:
+            return httpx.Response(200, json=MOCK_EVOLUTION_RAW)
+        if "pokemon-species" in request.url.path:
+            return httpx.Response(200, json=MOCK_SPECIES_RAW)
+        return httpx.Response(200, json=MOCK_POKEMON_RAW)
+
+    service = AsyncPokeAPIService(transport=httpx.MockTransport(handler), cache=MemoryCache(), aliases=AliasIndex())
+    await service.get_pokemon("pikachu")
+    entry = service.cache.get("pokemon:25")
+    entry.expires_at = time.time() - 1
+    service.cache.set(entry)
+
+    # Como en el precalentado: sin track_stale_responses() de por medio
+    document = await service.get_pokemon_with_evolution("pikachu")
+    assert document["pokemon"]["id"] == 25
+    assert service.cache.get("v2:25") is None
+    await asyncio.gather(*list(service._background))
+    await service.aclose()
+
+
+def test_invalidating_unresolved_pokemon_name_drops_v2_documents():
+    service = PokeAPIService(cache=MemoryCache(), aliases=AliasIndex())
+    service.cache.set(CacheEntry("v2:25", {"pokemon": {"id": 25}}, time.time() + 60))
+
+    service.invalidate_cache("pokemon", "pikachu")
+    assert service.cache.get("v2:25") is None
@@ -204,4 +204,99 @@ def test_export_pokedex_pdf(
     assert response.headers["content-type"] == "application/pdf"
     assert "attachment; filename=" in response.headers["content-disposition"]
 
-    assert len(response.content) > 1000
\ No newline at end of file
+    assert len(response.content) > 1000
+
+def test_export_pokedex_pdf_stream(
+        client: TestClient,
+        auth_headers: dict,
+        session: Session,
+        mocker
+):
+    import re
+    import zlib
+    from app.config import settings
+
+    user = session.exec(select(User).where(User.username == "testuser_pokemon")).one()
+    for pokemon_id in range(1, 121):
+        session.add(PokedexEntry(
+            owner_id=user.id, pokemon_id=pokemon_id, pokemon_name=f"poke{pokemon_id:03d}",
+            pokemon_sprite="", favorite=pokemon_id % 2 == 0
+        ))
+    session.commit()
+    # Tandas pequeñas para recorrer varias páginas de la BD
+    mocker.patch.object(settings, "PDF_STREAM_CHUNK_SIZE", 7)
+
+    response = client.get("/api/v1/pokedex/export?stream=true", headers=auth_headers)
+    buffered = client.get("/api/v1/pokedex/export", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert "content-length" not in response.headers
+    pdf = response.content
+    assert pdf.startswith(b"%PDF") and pdf.rstrip().endswith(b"%%EOF")
+
+    # Mismas páginas que el PDF de ReportLab y todas las filas, en orden
+    page_pattern = re.compile(rb"/Type /Page\b(?!s)")
+    assert len(page_pattern.findall(pdf)) == len(page_pattern.findall(buffered.content)) == 4
+    text = b"".join(
+        zlib.decompress(stream) for stream in re.findall(rb"stream\n(.*?)\nendstream", pdf, re.S)
+    )
+    names = re.findall(rb"\((poke\d{3})\)", text)
+    assert names == [f"poke{i:03d}".encode() for i in range(1, 121)]
+
+
+def _pdf_text_objects(pdf: bytes) -> list:
+    """Por página, los textos dibujados como (x, y, bytes) con los streams ya descomprimidos."""
+    import base64
+    import re
+    import zlib
+
+    pages = []
+    for match in re.finditer(rb"(?<!end)stream\r?\n(.*?)\r?\n?endstream", pdf, re.S):
+        header = pdf[pdf.rfind(b" obj", 0, match.start()):match.start()]
+        data = match.group(1)
+        if b"ASCII85Decode" in header:
+            data = base64.a85decode(data[:-2])
+        if b"FlateDecode" in header:
+            data = zlib.decompress(data)
+        texts = []
+        # ReportLab posiciona con Tm y pdf_stream con Td; los tramos por fuente se juntan
+        for x, y, body in re.findall(rb"BT (?:1 0 0 1 )?([\d.]+) ([\d.]+) T[md] (.*?)ET", data, re.S):
+            runs = re.findall(rb"\(((?:\\.|[^\\)])*)\) Tj", body)
+            raw = re.sub(
+                rb"\\([0-7]{1,3}|.)",
+                lambda m: bytes([int(m.group(1), 8)]) if m.group(1).isdigit() else m.group(1),
+                b"".join(runs),
+            )
+            texts.append((float(x), float(y), raw))
+        pages.append(texts)
+    return pages
+
+
+def test_pokedex_pdf_stream_matches_reportlab_layout():
+    from app.services.pdf_documents import render_pokedex
+    from app.services.pdf_stream import stream_pokedex_pdf
+
+    entries = [
+        {
+            "pokemon_id": pokemon_id,
+            "pokemon_name": "Nidoran♀" if pokemon_id == 29 else f"poke{pokemon_id:03d}",
+            "nickname": "Café ★" if pokemon_id == 3 else ("日本" if pokemon_id == 50 else None),
+            "is_captured": pokemon_id % 2 == 0,
+            "favorite": pokemon_id % 4 == 0,
+        }
+        for pokemon_id in range(1, 90)
+    ]
+
+    streamed = _pdf_text_objects(b"".join(stream_pokedex_pdf("ash", entries)))
+    buffered = _pdf_text_objects(render_pokedex("ash", entries))
+
+    # Mismos saltos de página y mismas filas (posición y texto codificado)
+    assert [len(page) for page in streamed] == [len(page) for page in buffered]
+    assert len(streamed) == 3
+    for streamed_page, buffered_page in zip(streamed, buffered):
+        assert [text for _, _, text in streamed_page] == [text for _, _, text in buffered_page]
+        for (sx, sy, _), (bx, by, _) in zip(streamed_page, buffered_page):
+            assert (sx, sy) == pytest.approx((bx, by), abs=0.01)
+    # Lo que no está en WinAnsi va a ZapfDingbats como en ReportLab, no a "?"
+    assert not any(b"?" in text for page in streamed for _, _, text in page)
@@ -1,5 +1,8 @@
+import os
 from fastapi.testclient import TestClient
 from pytest_mock import MockerFixture
+from fastapi import HTTPException
+from app.config import settings
 
 # Grupo 1
 def test_get_pokemon_search_success(client: TestClient, auth_headers: dict):
@@ -14,6 +17,19 @@ def test_get_pokemon_search_success(client: TestClient, auth_headers: dict):
     assert data["results"][0]["name"] == "bulbasaur"
 
 
+def test_get_pokemon_search_by_name(client: TestClient, auth_headers: dict):
+    response = client.get("/api/v1/pokemon/search?q=char", headers=auth_headers)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["name"] for item in data["results"]] == ["charmander"]
+    assert data["results"][0]["id"] == 4
+
+    response = client.get("/api/v1/pokemon/search?q=pikachuu", headers=auth_headers)
+    assert response.json()["results"] == []
+    assert response.json()["suggestions"][0] == "pikachu"
+
+
 def test_get_pokemon_search_no_auth(client: TestClient):
 
     response = client.get("/api/v1/pokemon/search?limit=1")
@@ -89,6 +105,46 @@ def test_get_pokemon_card_success(client: TestClient, auth_headers: dict):
     assert len(response.content) > 1000
 
 
+def test_get_pokemon_card_is_cached_and_revalidated_with_etag(client: TestClient, auth_headers: dict):
+    first = client.get("/api/v1/pokemon/25/card", headers=auth_headers)
+    second = client.get("/api/v1/pokemon/25/card", headers=auth_headers)
+
+    etag = first.headers["etag"]
+    assert second.headers["etag"] == etag
+    assert second.content == first.content
+    # La segunda sale de la caché por un enlace propio, que se borra al terminar de enviarla
+    from app.services.pdf_render import pdf_renderer
+    assert not os.listdir(os.path.join(pdf_renderer.cache.directory, ".serving"))
+
+    response = client.get("/api/v1/pokemon/25/card", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_get_pokemon_cards_deck_and_zip(client: TestClient, auth_headers: dict):
+    import io
+    import re
+    import zipfile
+
+    deck = client.get("/api/v1/pokemon/cards?ids=25,1,25", headers=auth_headers)
+
+    assert deck.status_code == 200
+    assert deck.headers["content-type"] == "application/pdf"
+    assert "cartas.pdf" in deck.headers["content-disposition"]
+    # Una página por carta (sin repetidos)
+    assert len(re.findall(rb"/Type /Page\b(?!s)", deck.content)) == 2
+
+    archive = client.get("/api/v1/pokemon/cards?ids=25,1&format=zip", headers=auth_headers)
+    assert archive.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(archive.content)) as z:
+        assert z.namelist() == ["ficha_pikachu.pdf", "ficha_bulbasaur.pdf"]
+        # La misma ficha que el endpoint individual
+        single = client.get("/api/v1/pokemon/25/card", headers=auth_headers)
+        assert z.read("ficha_pikachu.pdf") == single.content
+
+    assert client.get("/api/v1/pokemon/cards", headers=auth_headers).status_code == 422
+
+
 def test_pokemon_endpoint_handles_generic_exception(client: TestClient, auth_headers: dict, mocker: MockerFixture):
 
     mocker.patch(
@@ -103,3 +159,61 @@ def test_pokemon_endpoint_handles_generic_exception(client: TestClient, auth_hea
 
     assert response.status_code == 500
     assert "Error interno del servidor" in response.json()["detail"]
+
+
+def test_get_pokemon_batch_reports_errors_inline(client: TestClient, auth_headers: dict, mocker: MockerFixture):
+
+    async def fake_get_pokemon(identifier):
+        if identifier == "missingno":
+            raise HTTPException(status_code=404, detail="Not found")
+        return {"id": int(identifier), "name": f"pokemon-{identifier}"}
+
+    get_pokemon = mocker.patch("app.routers.pokemon.poke_service.get_pokemon", side_effect=fake_get_pokemon)
+
+    response = client.get(
+        "/api/v1/pokemon/batch?ids=1,4,missingno,4",
+        headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == 3
+    assert data["errors"] == 1
+    assert [r["identifier"] for r in data["results"]] == ["1", "4", "missingno"]
+    assert data["results"][1]["pokemon"]["name"] == "pokemon-4"
+    assert data["results"][2]["error"]["status_code"] == 404
+    assert get_pokemon.call_count == 3
+
+
+def test_get_pokemon_batch_rejects_too_many_ids(client: TestClient, auth_headers: dict):
+    ids = ",".join(str(i) for i in range(1, settings.POKEMON_BATCH_MAX + 2))
+
+    response = client.get(f"/api/v1/pokemon/batch?ids={ids}", headers=auth_headers)
+
+    assert response.status_code == 422
+
+
+def test_get_pokemon_cards_zip_at_batch_max_fits_render_queue(client: TestClient, auth_headers: dict,
+                                                              mocker: MockerFixture):
+    import io
+    import zipfile
+    from app.services.pdf_render import pdf_renderer
+
+    async def fake_get_pokemon(identifier):
+        return {"id": int(identifier), "name": f"pokemon-{identifier}", "sprite": None, "types": ["normal"],
+                "stats": {"hp": 1, "attack": 1, "defense": 1, "speed": 1}, "abilities": []}
+
+    async def fake_get_species(identifier):
+        return {"description_es": f"Carta {identifier}."}
+
+    mocker.patch("app.routers.pokemon.poke_service.get_pokemon", side_effect=fake_get_pokemon)
+    mocker.patch("app.routers.pokemon.poke_service.get_pokemon_species", side_effect=fake_get_species)
+    # Más cartas (todas sin caché) que huecos en la cola de PDFs
+    mocker.patch.object(pdf_renderer, "max_queue", settings.POKEMON_BATCH_MAX // 2)
+    ids = ",".join(str(i) for i in range(1, settings.POKEMON_BATCH_MAX + 1))
+
+    response = client.get(f"/api/v1/pokemon/cards?ids={ids}&format=zip", headers=auth_headers)
+
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.content)) as z:
+        assert len(z.namelist()) == settings.POKEMON_BATCH_MAX
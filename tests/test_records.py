@@ -0,0 +1,46 @@
+import time
+from app.services.cache import CacheEntry, MemoryCache
+from app.services.records import PokemonRecord, TypeMembers, compact, expand
+
+POKEMON = {
+    "id": 25,
+    "name": "pikachu",
+    "sprite": "https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/25.png",
+    "types": ["electric"],
+    "stats": {"hp": 35, "attack": 55, "defense": 40, "speed": 90},
+    "abilities": ["static", "lightning-rod"]
+}
+
+TYPE_MEMBERS = [
+    {"name": "pikachu", "url": "https://pokeapi.co/api/v2/pokemon/25/"},
+    {"name": "raichu", "url": "https://pokeapi.co/api/v2/pokemon/26/"}
+]
+
+
+def test_records_round_trip_to_the_same_dicts():
+    record = compact("pokemon", POKEMON)
+    assert isinstance(record, PokemonRecord)
+    assert list(record.stats)[:3] == [35, 55, 40]
+    assert expand(record) == POKEMON
+
+    members = compact("type", TYPE_MEMBERS)
+    assert isinstance(members, TypeMembers)
+    assert expand(members) == TYPE_MEMBERS
+
+
+def test_unexpected_shapes_are_kept_as_they_are():
+    raw = {**POKEMON, "moves": []}
+    assert compact("pokemon", raw) is raw
+    assert compact("evolution", {"chain": ["pichu"]}) == {"chain": ["pichu"]}
+
+
+def test_memory_cache_stores_compact_records_and_returns_dicts():
+    cache = MemoryCache(compact_payloads=True)
+    cache.set(CacheEntry("pokemon:25", POKEMON, expires_at=time.time() + 60))
+
+    assert isinstance(cache._entries["pokemon:25"].payload, PokemonRecord)
+    entry = cache.get("pokemon:25")
+    assert entry.payload == POKEMON
+    # Cada lectura es una copia: modificarla no toca la caché
+    entry.payload["name"] = "otro"
+    assert cache.get("pokemon:25").payload["name"] == "pikachu"
@@ -0,0 +1,72 @@
+import threading
+import time
+import pytest
+from app.services.scheduler import OutboundScheduler, Priority, SchedulerTimeout, request_priority, current_priority
+
+
+def test_interactive_requests_go_before_background():
+    scheduler = OutboundScheduler(rate=0, min_concurrency=1, max_concurrency=1)
+    order = []
+
+    def worker(priority, name):
+        with scheduler.slot(priority):
+            order.append(name)
+
+    with scheduler.slot(Priority.INTERACTIVE):
+        threads = [threading.Thread(target=worker, args=(Priority.BACKGROUND, "background"))]
+        threads[0].start()
+        time.sleep(0.05)
+        threads.append(threading.Thread(target=worker, args=(Priority.INTERACTIVE, "interactive")))
+        threads[1].start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join(timeout=2)
+
+    assert order == ["interactive", "background"]
+
+
+def test_background_cannot_take_every_slot():
+    scheduler = OutboundScheduler(rate=0, min_concurrency=4, max_concurrency=4, background_share=0.5, max_wait=0.05)
+
+    with scheduler.slot(Priority.BACKGROUND), scheduler.slot(Priority.BACKGROUND):
+        with pytest.raises(SchedulerTimeout):
+            with scheduler.slot(Priority.BACKGROUND):
+                pass
+        # Los usuarios siguen teniendo hueco
+        with scheduler.slot(Priority.INTERACTIVE):
+            assert scheduler.in_flight == 3
+
+
+def test_token_bucket_limits_rate():
+    scheduler = OutboundScheduler(rate=20, burst=2)
+    started = time.monotonic()
+    for _ in range(4):
+        with scheduler.slot():
+            pass
+    # 2 de ráfaga + 2 a 20/s
+    assert time.monotonic() - started >= 0.09
+
+
+def test_concurrency_backs_off_when_throttled_and_recovers():
+    scheduler = OutboundScheduler(rate=0, min_concurrency=2, max_concurrency=16)
+    initial = scheduler.limit
+
+    with scheduler.slot() as outcome:
+        outcome.record_response(429, {"Retry-After": "0"})
+    assert scheduler.limit < initial
+
+    for _ in range(20):
+        with scheduler.slot():
+            pass
+    assert scheduler.limit > scheduler.min_concurrency
+
+
+@pytest.mark.anyio
+async def test_async_slots_and_priority_context():
+    scheduler = OutboundScheduler(rate=0)
+    with request_priority(Priority.BACKGROUND):
+        assert current_priority() == Priority.BACKGROUND
+        async with scheduler.aslot():
+            assert scheduler.in_flight == 1
+    assert current_priority() == Priority.INTERACTIVE
+    assert scheduler.in_flight == 0
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from fastapi import HTTPException
+from pytest_mock import MockerFixture
+from app.services.cache import MemoryCache
+from app.services.pokeapi_service import PokeAPIService, AsyncPokeAPIService
+from app.services.singleflight import SingleFlight
+from tests.test_pokeapi_service import MOCK_POKEMON_RAW
+
+
+def test_singleflight_shares_result_between_threads():
+    flight = SingleFlight()
+    calls = []
+    results = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "pikachu"
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == ["pikachu"] * 8
+    assert flight.in_flight() == 0
+
+
+def test_service_coalesces_concurrent_lookups_and_errors(mocker: MockerFixture):
+    def slow_get(url, **kwargs):
+        time.sleep(0.1)
+        return mocker.Mock(status_code=404, headers={})
+
+    get = mocker.patch("app.services.pokeapi_service.requests.Session.get", side_effect=slow_get)
+    service = PokeAPIService(cache=MemoryCache())
+    errors = []
+
+    def lookup():
+        try:
+            service.get_pokemon("missingno")
+        except HTTPException as e:
+            errors.append(e.status_code)
+
+    threads = [threading.Thread(target=lookup) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert get.call_count == 1
+    assert errors == [404] * 5
+
+
+@pytest.mark.anyio
+async def test_async_service_coalesces_concurrent_lookups():
+    calls = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json=MOCK_POKEMON_RAW)
+
+    service = AsyncPokeAPIService(transport=httpx.MockTransport(handler), cache=MemoryCache())
+    results = await asyncio.gather(*[service.get_pokemon("pikachu") for _ in range(10)])
+    await service.aclose()
+
+    assert len(calls) == 1
+    assert all(r["name"] == "pikachu" for r in results)
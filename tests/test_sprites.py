@@ -0,0 +1,116 @@
+import hashlib
+import os
+import time
+from unittest.mock import Mock
+
+import requests
+
+from app.fake_pokeapi import _placeholder_png
+from app.services.sprites import SpriteStore, placeholder_image
+
+PNG = _placeholder_png("sprite")
+
+
+def _session(content: bytes = PNG) -> Mock:
+    response = Mock(content=content)
+    response.raise_for_status.return_value = None
+    return Mock(get=Mock(return_value=response))
+
+
+def test_decoded_sprite_is_reused_without_network(tmp_path):
+    session = _session()
+    store = SpriteStore(str(tmp_path), session=session)
+
+    first = store.get_image("http://sprites/25.png")
+    second = store.get_image("http://sprites/25.png")
+
+    assert first is not None and first is second
+    assert session.get.call_count == 1
+
+
+def test_disk_tier_is_content_addressed_and_survives_restarts(tmp_path):
+    store = SpriteStore(str(tmp_path), session=_session())
+    store.get_image("http://sprites/25.png")
+    store.get_image("http://sprites/shiny/25.png")
+
+    blobs = [f for _, _, files in os.walk(tmp_path / "blobs") for f in files]
+    assert len(blobs) == 1
+
+    offline = SpriteStore(str(tmp_path), session=Mock(get=Mock(side_effect=AssertionError("sin red"))))
+    assert offline.get_image("http://sprites/25.png") is not None
+
+
+def test_failed_download_returns_none(tmp_path):
+    session = Mock(get=Mock(side_effect=requests.exceptions.ConnectionError("caído")))
+    store = SpriteStore(str(tmp_path), session=session)
+
+    assert store.get_image("http://sprites/25.png") is None
+
+
+def test_prefetch_fetches_concurrently_and_uses_placeholder_after_deadline(tmp_path):
+    def slow_get(url, timeout):
+        time.sleep(0.5 if "slow" in url else 0.1)
+        return _session().get(url)
+
+    store = SpriteStore(str(tmp_path), session=Mock(get=Mock(side_effect=slow_get)))
+    urls = [f"http://sprites/{i}.png" for i in range(4)] + ["http://sprites/slow.png", None]
+
+    started = time.monotonic()
+    images = store.prefetch(urls, deadline=0.3)
+
+    assert time.monotonic() - started < 0.4
+    assert images["http://sprites/slow.png"] is placeholder_image()
+    assert all(images[url] is not placeholder_image() for url in urls[:4])
+
+
+def test_failed_download_is_not_retried_until_negative_ttl_expires(tmp_path, mocker):
+    clock = mocker.patch("app.services.sprites.time.monotonic", return_value=100.0)
+    session = Mock(get=Mock(side_effect=requests.exceptions.ConnectionError("caído")))
+    store = SpriteStore(str(tmp_path), session=session, negative_ttl=60.0)
+
+    assert store.get_image("http://sprites/25.png") is None
+    assert store.get_image("http://sprites/25.png") is None
+    assert session.get.call_count == 1
+
+    clock.return_value = 161.0
+    session.get.side_effect = None
+    session.get.return_value = _session().get.return_value
+    assert store.get_image("http://sprites/25.png") is not None
+    assert session.get.call_count == 2
+
+
+def test_disk_tier_trims_least_recently_used_blobs(tmp_path):
+    contents = {i: _placeholder_png(f"sprite-{i}", size=32) for i in range(3)}
+    session = Mock(get=Mock(side_effect=lambda url, timeout: Mock(content=contents[int(url[-5])])))
+    size = len(contents[0])
+    store = SpriteStore(str(tmp_path), session=session, max_disk_bytes=size * 2 + size // 2)
+
+    store.get_bytes("http://sprites/0.png")
+    store.get_bytes("http://sprites/1.png")
+    # El 0 se ha usado hace más tiempo
+    os.utime(store._blob_path(hashlib.sha256(contents[0]).hexdigest()), (0, 0))
+
+    store.get_bytes("http://sprites/2.png")
+
+    assert session.get.call_count == 3
+    assert store.get_bytes("http://sprites/2.png") == contents[2]
+    assert store.get_bytes("http://sprites/1.png") == contents[1]
+    assert session.get.call_count == 3
+    # El menos usado se borró del disco y se vuelve a descargar
+    assert store.get_bytes("http://sprites/0.png") == contents[0]
+    assert session.get.call_count == 4
+
+
+def test_disk_cap_is_shared_by_workers_using_the_same_directory(tmp_path):
+    contents = {i: _placeholder_png(f"sprite-{i}", size=32) for i in range(4)}
+    session = Mock(get=Mock(side_effect=lambda url, timeout: Mock(content=contents[int(url[-5])])))
+    size = len(contents[0])
+    cap = size * 2 + size // 2
+    # Dos workers con el mismo directorio
+    workers = [SpriteStore(str(tmp_path), session=session, max_disk_bytes=cap) for _ in range(2)]
+
+    for i in range(4):
+        workers[i % 2].get_bytes(f"http://sprites/{i}.png")
+
+    on_disk = sum(size for _, size, _ in workers[0]._blobs())
+    assert on_disk <= cap
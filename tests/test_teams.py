@@ -291,3 +291,35 @@ def test_export_pdf_handles_generic_exception(client: TestClient, auth_headers:
     assert response.status_code == 500
     assert "Error al generar el PDF" in response.json()["detail"]
 
+
+
+def test_team_cards_load_team_and_members_in_one_query(client: TestClient, auth_headers: dict, session: Session,
+                                                       captured_pokemon_id: int, uncaptured_pokemon_id: int):
+    from sqlalchemy import event
+    from app.routers.pokemon import _team_card_identifiers
+
+    team = Team(name="Cartas", trainer_id=1)
+    session.add(team)
+    session.commit()
+    session.refresh(team)
+    session.add(TeamMember(team_id=team.id, pokedex_entry_id=uncaptured_pokemon_id, position=2))
+    session.add(TeamMember(team_id=team.id, pokedex_entry_id=captured_pokemon_id, position=1))
+    session.commit()
+    user = session.get(User, 1)
+    team_id = team.id
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(session.get_bind(), "before_cursor_execute", listener)
+    try:
+        identifiers, name = _team_card_identifiers(session, team_id, user)
+    finally:
+        event.remove(session.get_bind(), "before_cursor_execute", listener)
+
+    assert identifiers == ["25", "143"]
+    assert name == "equipo_Cartas"
+    assert len(statements) == 1
+
+    response = client.get(f"/api/v1/pokemon/cards?team_id={team_id}", headers=auth_headers)
+    assert response.status_code == 200
+    assert "equipo_Cartas.pdf" in response.headers["content-disposition"]
@@ -0,0 +1,55 @@
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+from app.models import PokedexEntry
+from app.services.warmup import WarmupState, warm_up, popular_pokemon_ids, load_warmup_file, warmup_state
+
+
+def _entry(owner_id: int, pokemon_id: int) -> PokedexEntry:
+    return PokedexEntry(owner_id=owner_id, pokemon_id=pokemon_id, pokemon_name=f"p{pokemon_id}", pokemon_sprite="")
+
+
+def test_popular_pokemon_ids_orders_by_count(session: Session):
+    session.add_all([_entry(1, 25), _entry(2, 25), _entry(3, 25), _entry(1, 4), _entry(2, 4), _entry(1, 7)])
+    session.commit()
+
+    assert popular_pokemon_ids(session, limit=2) == [25, 4]
+
+
+def test_load_warmup_file(tmp_path):
+    path = tmp_path / "warmup.txt"
+    path.write_text("# favoritos\npikachu\n\n150\n")
+
+    assert load_warmup_file(str(path)) == ["pikachu", "150"]
+    assert load_warmup_file(str(tmp_path / "no-existe.txt")) == []
+
+
+@pytest.mark.anyio
+async def test_warm_up_prefetches_related_resources(mocker):
+    service = mocker.Mock()
+    service.preload_aliases = mocker.AsyncMock()
+    service.get_pokemon = mocker.AsyncMock(return_value={"name": "pikachu", "types": ["electric"]})
+    service.get_pokemon_species = mocker.AsyncMock(return_value={"evolution_chain_url": "https://x/evolution-chain/10/"})
+    service.get_evolution_chain = mocker.AsyncMock(return_value={"chain": []})
+    service.get_pokemon_by_type = mocker.AsyncMock(side_effect=HTTPException(status_code=503))
+
+    state = await warm_up(service, ["pikachu", "PIKACHU", "25"], concurrency=2, state=WarmupState())
+
+    assert state.ready
+    service.preload_aliases.assert_awaited_once()
+    assert service.get_pokemon.await_count == 2
+    # El tipo solo se pide una vez
+    service.get_pokemon_by_type.assert_awaited_once_with("electric")
+    assert state.failed == 1
+    assert state.warmed == 6
+
+
+def test_ready_endpoint_reflects_warmup(client: TestClient, mocker):
+    mocker.patch.object(warmup_state, "ready", False)
+    assert client.get("/ready").status_code == 503
+
+    mocker.patch.object(warmup_state, "ready", True)
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"